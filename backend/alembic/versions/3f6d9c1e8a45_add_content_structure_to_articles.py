@@ -0,0 +1,29 @@
+"""add content_structure to articles
+
+Revision ID: 3f6d9c1e8a45
+Revises: e8b3f0d6a217
+Create Date: 2026-10-19 15:21:09.617342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f6d9c1e8a45'
+down_revision: Union[str, Sequence[str], None] = 'e8b3f0d6a217'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('articles', sa.Column('content_structure', postgresql.JSONB(astext_type=sa.Text()), nullable=True, comment='正文解析结果缓存（正文修改时清空）'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('articles', 'content_structure')
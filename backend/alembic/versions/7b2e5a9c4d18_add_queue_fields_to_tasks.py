@@ -0,0 +1,39 @@
+"""add queue fields to tasks
+
+Revision ID: 7b2e5a9c4d18
+Revises: 3f6d9c1e8a45
+Create Date: 2026-10-19 16:48:22.903114
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7b2e5a9c4d18'
+down_revision: Union[str, Sequence[str], None] = '3f6d9c1e8a45'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('tasks', sa.Column('payload', postgresql.JSONB(astext_type=sa.Text()), nullable=True, comment='任务参数'))
+    op.add_column('tasks', sa.Column('available_at', sa.DateTime(), nullable=False, server_default=sa.text("(now() at time zone 'utc')"), comment='可被领取的时间（重试退避）'))
+    op.add_column('tasks', sa.Column('locked_by', sa.String(length=100), nullable=True, comment='领取该任务的 worker'))
+    op.add_column('tasks', sa.Column('locked_until', sa.DateTime(), nullable=True, comment='租约到期时间，过期后可被其他 worker 重新领取'))
+    op.add_column('tasks', sa.Column('heartbeat_at', sa.DateTime(), nullable=True, comment='最近一次心跳时间'))
+    op.create_index('ix_tasks_queue', 'tasks', ['status', 'priority', 'available_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_tasks_queue', table_name='tasks')
+    op.drop_column('tasks', 'heartbeat_at')
+    op.drop_column('tasks', 'locked_until')
+    op.drop_column('tasks', 'locked_by')
+    op.drop_column('tasks', 'available_at')
+    op.drop_column('tasks', 'payload')
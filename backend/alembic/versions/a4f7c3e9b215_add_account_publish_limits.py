@@ -0,0 +1,36 @@
+"""add account publish limits
+
+Revision ID: a4f7c3e9b215
+Revises: e5a8b2c6f013
+Create Date: 2026-10-19 22:03:18.640291
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a4f7c3e9b215'
+down_revision: Union[str, Sequence[str], None] = 'e5a8b2c6f013'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('accounts', sa.Column('daily_quota', sa.Integer(), nullable=False, server_default='0', comment='每日发布配额，0 表示使用全局默认值'))
+    op.add_column('accounts', sa.Column('cooldown_minutes', sa.Integer(), nullable=False, server_default='0', comment='两次发布最小间隔(分钟)，0 表示使用全局默认值'))
+    op.add_column('accounts', sa.Column('consecutive_failures', sa.Integer(), nullable=False, server_default='0', comment='连续发布失败次数'))
+    op.add_column('accounts', sa.Column('last_failure_at', sa.DateTime(), nullable=True, comment='最近一次发布失败时间'))
+    op.create_index('ix_articles_account_published_at', 'articles', ['account_id', 'published_at'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_articles_account_published_at', table_name='articles')
+    op.drop_column('accounts', 'last_failure_at')
+    op.drop_column('accounts', 'consecutive_failures')
+    op.drop_column('accounts', 'cooldown_minutes')
+    op.drop_column('accounts', 'daily_quota')
@@ -0,0 +1,44 @@
+"""workflow progress integer
+
+Revision ID: b7d2e9a4c518
+Revises: a4f7c3e9b215
+Create Date: 2026-10-19 23:12:46.507193
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2e9a4c518'
+down_revision: Union[str, Sequence[str], None] = 'a4f7c3e9b215'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.alter_column(
+        'workflow_sessions', 'progress',
+        existing_type=sa.String(length=10),
+        type_=sa.Integer(),
+        nullable=False,
+        server_default='0',
+        existing_comment='进度百分比',
+        postgresql_using="COALESCE(NULLIF(progress, '')::integer, 0)",
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.alter_column(
+        'workflow_sessions', 'progress',
+        existing_type=sa.Integer(),
+        type_=sa.String(length=10),
+        nullable=True,
+        server_default=None,
+        existing_comment='进度百分比',
+        postgresql_using='progress::text',
+    )
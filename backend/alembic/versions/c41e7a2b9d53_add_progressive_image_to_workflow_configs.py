@@ -0,0 +1,32 @@
+"""add progressive image fields to workflow_configs
+
+Revision ID: c41e7a2b9d53
+Revises: 9a97fb68e6f6
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c41e7a2b9d53'
+down_revision: Union[str, Sequence[str], None] = '9a97fb68e6f6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('workflow_configs', sa.Column('enable_progressive_image', sa.Boolean(), nullable=False, server_default=sa.false(), comment='是否启用封面优先的渐进式生图'))
+    op.add_column('workflow_configs', sa.Column('progressive_image_cutoff', sa.Integer(), nullable=False, server_default='60', comment='封面生成后等待正文插图的时长（秒）'))
+    op.add_column('workflow_configs', sa.Column('enable_background_image', sa.Boolean(), nullable=False, server_default=sa.true(), comment='截止后是否在后台继续生成剩余插图'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('workflow_configs', 'enable_background_image')
+    op.drop_column('workflow_configs', 'progressive_image_cutoff')
+    op.drop_column('workflow_configs', 'enable_progressive_image')
@@ -0,0 +1,35 @@
+"""add draft inventory
+
+Revision ID: c9d4e1f7a320
+Revises: 7b2e5a9c4d18
+Create Date: 2026-10-19 18:05:41.512377
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c9d4e1f7a320'
+down_revision: Union[str, Sequence[str], None] = '7b2e5a9c4d18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('articles', sa.Column('inventory', sa.Boolean(), nullable=False, server_default=sa.false(), comment='是否为定时任务预生成的库存稿件（按内容类型+账号取用）'))
+    op.create_index('ix_articles_inventory', 'articles', ['inventory', 'content_type', 'account_id', 'status'], unique=False)
+    op.add_column('scheduled_tasks', sa.Column('inventory_target', sa.Integer(), nullable=False, server_default='0', comment='预生成库存目标数，0 表示不启用（触发时现生成现发布）'))
+    op.add_column('scheduled_tasks', sa.Column('inventory_stats', postgresql.JSONB(astext_type=sa.Text()), nullable=True, comment='库存统计: {low_watermark, pops, stockouts, last_pop_at}'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scheduled_tasks', 'inventory_stats')
+    op.drop_column('scheduled_tasks', 'inventory_target')
+    op.drop_index('ix_articles_inventory', table_name='articles')
+    op.drop_column('articles', 'inventory')
@@ -0,0 +1,39 @@
+"""add scheduler state
+
+Revision ID: d3a8f5c1e694
+Revises: b7d2e9a4c518
+Create Date: 2026-10-20 10:26:41.583190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd3a8f5c1e694'
+down_revision: Union[str, Sequence[str], None] = 'b7d2e9a4c518'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('scheduler_state',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('paused', sa.Boolean(), nullable=False, server_default=sa.false(), comment='是否暂停所有定时任务（leader 同步时执行）'),
+    sa.Column('leader_instance_id', sa.String(length=200), nullable=True, comment='当前 leader 实例'),
+    sa.Column('leader_heartbeat_at', sa.DateTime(), nullable=True, comment='leader 最近一次上报时间(UTC)'),
+    sa.Column('active_tasks', sa.Integer(), nullable=False, server_default='0', comment='leader 调度器中的任务数'),
+    sa.Column('pending_jobs', sa.Integer(), nullable=False, server_default='0', comment='leader 调度器中等待触发的任务数'),
+    sa.Column('created_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.Column('updated_at', sa.DateTime(), nullable=False, server_default=sa.func.now()),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute("INSERT INTO scheduler_state (id) VALUES (1)")
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('scheduler_state')
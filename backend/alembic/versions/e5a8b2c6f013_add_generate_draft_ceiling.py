@@ -0,0 +1,28 @@
+"""add generate draft ceiling
+
+Revision ID: e5a8b2c6f013
+Revises: c9d4e1f7a320
+Create Date: 2026-10-19 21:14:07.284615
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a8b2c6f013'
+down_revision: Union[str, Sequence[str], None] = 'c9d4e1f7a320'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('scheduled_tasks', sa.Column('draft_ceiling', sa.Integer(), nullable=False, server_default='0', comment='就绪草稿上限，达到后跳过本次生成；0 表示使用全局默认值'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('scheduled_tasks', 'draft_ceiling')
@@ -0,0 +1,29 @@
+"""add publish_bundle to articles
+
+Revision ID: e8b3f0d6a217
+Revises: c41e7a2b9d53
+Create Date: 2026-10-19 14:05:47.283916
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e8b3f0d6a217'
+down_revision: Union[str, Sequence[str], None] = 'c41e7a2b9d53'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('articles', sa.Column('publish_bundle', postgresql.JSONB(astext_type=sa.Text()), nullable=True, comment='预构建的发布包（DOCX、发布用图片、标签）'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('articles', 'publish_bundle')
@@ -16,6 +16,7 @@ from app.schemas.account import (
     AccountStatusCheck,
 )
 from app.services.publisher import publisher
+from app.services.account_selector import account_selector
 
 router = APIRouter(prefix="/accounts", tags=["账号管理"])
 
@@ -65,6 +66,12 @@ async def list_accounts(
     return AccountListResponse(items=items, total=total or 0)
 
 
+@router.get("/publish-status", summary="账号发布状态")
+async def get_publish_status(db: AsyncSession = Depends(get_db)):
+    """各账号今日发布数、配额、冷却和是否可用"""
+    return {"items": await account_selector.get_status(db)}
+
+
 @router.get("/{account_id}", response_model=AccountResponse, summary="账号详情")
 async def get_account(
     account_id: UUID,
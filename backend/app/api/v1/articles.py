@@ -1,15 +1,15 @@
 from typing import Optional
 from uuid import UUID
 import json
-import os
 from datetime import datetime
-from fastapi import APIRouter, Depends, Query
-from fastapi.responses import FileResponse
+from urllib.parse import quote
+from fastapi import APIRouter, Depends, Query, Header
+from fastapi.responses import FileResponse, Response, StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from app.core.database import get_db
-from app.core.exceptions import NotFoundException, AppException
+from app.core.exceptions import NotFoundException, AppException, AccountUnavailableException
 from app.models import Article, ArticleStatus, Account
 from app.models.prompt import ContentType
 from app.schemas.article import (
@@ -19,10 +19,15 @@ from app.schemas.article import (
     ArticleListResponse,
 )
 from app.services.publisher import publisher
-from app.services.docx_generator import docx_generator
+from app.services.account_selector import account_selector
+from app.services.docx_cache import docx_cache
+from app.services.docx_render_service import docx_render_service
+from app.services.publish_bundle import publish_bundle_service
 
 router = APIRouter(prefix="/articles", tags=["文章管理"])
 
+DOCX_MEDIA_TYPE = "application/vnd.openxmlformats-officedocument.wordprocessingml.document"
+
 
 @router.post("", response_model=ArticleResponse, summary="创建文章")
 async def create_article(
@@ -36,6 +41,7 @@ async def create_article(
         account_id=data.account_id,
         status=ArticleStatus.DRAFT,
     )
+    article.refresh_structure()
 
     db.add(article)
     await db.commit()
@@ -114,10 +120,16 @@ async def update_article(
     update_data = data.model_dump(exclude_unset=True)
     for field, value in update_data.items():
         setattr(article, field, value)
+    if "content" in update_data:
+        article.refresh_structure()
 
     await db.commit()
     await db.refresh(article)
 
+    # 已定稿的文章修改后在后台重建发布包
+    if article.publish_bundle and not publish_bundle_service.get_valid(article):
+        publish_bundle_service.schedule(str(article.id))
+
     return article
 
 
@@ -135,6 +147,7 @@ async def delete_article(
 
     await db.delete(article)
     await db.commit()
+    await publish_bundle_service.remove(str(article_id))
 
     return {"message": "删除成功"}
 
@@ -168,83 +181,73 @@ async def publish_article(
         raise AppException("账号 Cookie 未配置,请先配置账号 Cookie")
 
     # 更新状态为发布中
+    previous_status = article.status
     article.status = ArticleStatus.PUBLISHING
     article.error_message = None
     await db.commit()
     await db.refresh(article)
 
-    # 执行发布
-    docx_path = None
+    # 执行发布（手动发布不受配额和冷却限制，但与其他发布共用账号锁）
     try:
-        # 解析 Cookie (假设存储为 JSON 字符串)
-        try:
-            cookies = json.loads(account.cookies)
-        except json.JSONDecodeError:
-            raise AppException("账号 Cookie 格式错误")
-
-        # 根据内容类型选择发布方式
-        is_weitoutiao = article.content_type == ContentType.WEITOUTIAO
-
-        if is_weitoutiao:
-            # 微头条发布（可选使用 DOCX 导入）
-            docx_path = docx_generator.create_article_docx(
-                title="",  # 微头条没有标题
-                content=article.content,
-                images=article.images if article.images else None,
-                article_id=str(article.id),
-            )
-
-            publish_result = await publisher.publish_weitoutiao(
-                content=article.content,
-                cookies=cookies,
-                images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                docx_path=docx_path,
-                tags=article.tags if article.tags else None,
-            )
-        else:
-            # 文章发布（使用 DOCX 导入方式）
-            docx_path = docx_generator.create_article_docx(
-                title=article.title,
-                content=article.content,
-                images=article.images if article.images else None,
-                article_id=str(article.id),
-            )
-
-            publish_result = await publisher.publish_to_toutiao(
-                title=article.title,
-                content=article.content,
-                cookies=cookies,
-                images=article.images if article.images else None,
-                docx_path=docx_path,
-                tags=article.tags if article.tags else None,
-            )
-
-        # 发布成功
-        if publish_result["success"]:
-            article.status = ArticleStatus.PUBLISHED
-            article.publish_url = publish_result.get("url", "")
-            article.published_at = datetime.utcnow()
-            article.error_message = None
-
-            # 更新账号最后发布时间
-            account.last_publish_at = datetime.utcnow()
-        else:
-            article.status = ArticleStatus.FAILED
-            article.error_message = publish_result.get("message", "发布失败")
-
+        async with account_selector.lease(db, account.id, enforce_limits=False) as account:
+            # 解析 Cookie (假设存储为 JSON 字符串)
+            try:
+                cookies = json.loads(account.cookies)
+            except json.JSONDecodeError:
+                raise AppException("账号 Cookie 格式错误")
+
+            # 获取发布包（定稿时已预构建，内容变化后才会重新构建）
+            bundle = await publish_bundle_service.ensure(db, article)
+
+            # 根据内容类型选择发布方式
+            is_weitoutiao = article.content_type == ContentType.WEITOUTIAO
+
+            if is_weitoutiao:
+                # 微头条发布（可选使用 DOCX 导入）
+                publish_result = await publisher.publish_weitoutiao(
+                    content=article.content,
+                    cookies=cookies,
+                    images=[img["path"] for img in bundle["images"]],
+                    docx_path=bundle["docx_path"],
+                    tags=bundle["tags"] or None,
+                    account_id=account.id,
+                )
+            else:
+                # 文章发布（使用 DOCX 导入方式）
+                publish_result = await publisher.publish_to_toutiao(
+                    title=article.title,
+                    content=article.content,
+                    cookies=cookies,
+                    images=[img["path"] for img in bundle["images"]] or None,
+                    docx_path=bundle["docx_path"],
+                    tags=bundle["tags"] or None,
+                    account_id=account.id,
+                )
+
+            # 更新账号最后发布时间 / 连续失败次数
+            await account_selector.record_result(account, publish_result["success"])
+
+            # 发布成功
+            if publish_result["success"]:
+                article.status = ArticleStatus.PUBLISHED
+                article.publish_url = publish_result.get("url", "")
+                article.published_at = datetime.utcnow()
+                article.error_message = None
+            else:
+                article.status = ArticleStatus.FAILED
+                article.error_message = publish_result.get("message", "发布失败")
+            # 释放账号锁前提交
+            await db.commit()
+
+    except AccountUnavailableException:
+        # 账号被占用，未实际发布，恢复原状态
+        article.status = previous_status
+        await db.commit()
+        raise
     except Exception as e:
         # 发布失败
         article.status = ArticleStatus.FAILED
         article.error_message = str(e)
-    finally:
-        # 清理临时 DOCX 文件
-        if docx_path:
-            try:
-                import os
-                if os.path.exists(docx_path):
-                    os.remove(docx_path)
-            except:
-                pass  # 忽略清理错误
 
     await db.commit()
     await db.refresh(article)
@@ -256,31 +259,63 @@ async def publish_article(
 async def preview_docx(
     article_id: UUID,
     db: AsyncSession = Depends(get_db),
+    if_none_match: Optional[str] = Header(None),
 ):
-    """生成并下载文章的 DOCX 预览文件"""
+    """生成并下载文章的 DOCX 预览文件（内容未变化时返回 304）"""
     result = await db.execute(select(Article).where(Article.id == article_id))
     article = result.scalar_one_or_none()
 
     if not article:
         raise NotFoundException("Article")
 
-    # 生成 DOCX 文件
-    docx_path = docx_generator.create_preview_docx(
-        title=article.title,
-        content=article.content,
-        images=article.images if article.images else None,
-        article_id=str(article.id),
-    )
+    images = article.images if article.images else None
+    key = docx_cache.make_key(article.title, article.content, images)
+    etag = f'"{key}"'
 
-    if not os.path.exists(docx_path):
-        raise AppException("DOCX 文件生成失败")
+    # 客户端已持有相同内容的文件时无需渲染
+    if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+        return Response(status_code=304, headers={"ETag": etag})
 
     # 生成安全的文件名
     safe_title = "".join(c for c in article.title if c.isalnum() or c in " _-")[:50]
     filename = f"{safe_title or 'article'}.docx"
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+
+    # 已有缓存文件（如发布或编辑阶段生成过）时直接返回
+    cached_path = docx_cache.get(key)
+    if cached_path:
+        return FileResponse(
+            path=cached_path,
+            filename=filename,
+            media_type=DOCX_MEDIA_TYPE,
+            headers=headers,
+        )
+
+    # 否则在内存中渲染并分块返回，不落盘
+    data, _ = await docx_render_service.render_bytes(
+        title=article.title,
+        content=article.content,
+        images=images,
+    )
+    headers["Content-Length"] = str(len(data))
+    headers["Content-Disposition"] = _content_disposition(filename)
 
-    return FileResponse(
-        path=docx_path,
-        filename=filename,
-        media_type="application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    return StreamingResponse(
+        _iter_chunks(data),
+        media_type=DOCX_MEDIA_TYPE,
+        headers=headers,
     )
+
+
+def _content_disposition(filename: str) -> str:
+    """附件文件名（非 ASCII 时按 RFC 5987 编码）"""
+    quoted = quote(filename)
+    if quoted != filename:
+        return f"attachment; filename*=utf-8''{quoted}"
+    return f'attachment; filename="{filename}"'
+
+
+def _iter_chunks(data: bytes, chunk_size: int = 64 * 1024):
+    view = memoryview(data)
+    for offset in range(0, len(view), chunk_size):
+        yield view[offset:offset + chunk_size]
@@ -1,11 +1,13 @@
 """仪表盘统计 API"""
 
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from app.core.database import get_db
 from app.models import Article, ArticleStatus, Account
+from app.services.docx_render_service import docx_render_service
+from app.services.scheduler.backpressure import draft_backpressure
 
 router = APIRouter(prefix="/dashboard", tags=["仪表盘"])
 
@@ -37,3 +39,18 @@ async def get_dashboard_stats(
         "draft_count": draft_count or 0,
         "account_count": account_count or 0,
     }
+
+
+@router.get("/docx-metrics", summary="获取 DOCX 渲染统计")
+async def get_docx_metrics():
+    """获取 DOCX 渲染耗时、排队和缓存统计"""
+    return docx_render_service.get_metrics()
+
+
+@router.get("/throughput", summary="获取生成与发布吞吐")
+async def get_throughput(
+    days: int = Query(7, ge=1, le=90),
+    db: AsyncSession = Depends(get_db),
+):
+    """近 N 天每日生成、发布和因草稿积压跳过的数量，以及当前就绪草稿数"""
+    return await draft_backpressure.get_throughput(db, days)
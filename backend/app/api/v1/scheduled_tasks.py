@@ -7,7 +7,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from app.core.database import get_db
-from app.models import ScheduledTask, Task
+from app.models import ScheduledTask, Task, TaskStatus
 from app.schemas.scheduled_task import (
     ScheduledTaskCreate,
     ScheduledTaskUpdate,
@@ -17,7 +17,12 @@ from app.schemas.scheduled_task import (
     ScheduledTaskLogsResponse,
     SchedulerStatusResponse,
 )
-from app.services.scheduler import scheduler_service
+from app.services.scheduler import scheduler_service, scheduler_leader, task_queue
+from app.services.scheduler.inventory import draft_inventory
+from app.services.scheduler.state import scheduler_state
+from app.services.scheduler.planner import load_planner
+from app.services.artifact_gc import artifact_gc
+from app.services.resource_pools import resource_pools
 
 router = APIRouter(prefix="/scheduled-tasks", tags=["定时任务"])
 
@@ -42,6 +47,8 @@ async def create_scheduled_task(
         publish_mode=data.publish_mode,
         publish_batch_size=data.publish_batch_size,
         publish_order=data.publish_order,
+        inventory_target=data.inventory_target,
+        draft_ceiling=data.draft_ceiling,
         is_active=data.is_active,
     )
     db.add(task)
@@ -182,6 +189,29 @@ async def trigger_scheduled_task(
     return {"message": "已触发执行"}
 
 
+@router.post("/{task_id}/cancel")
+async def cancel_scheduled_task_runs(
+    task_id: UUID,
+    db: AsyncSession = Depends(get_db),
+):
+    """取消该定时任务排队中和执行中的队列任务（含库存补货任务）"""
+    task = await db.get(ScheduledTask, task_id)
+    if not task:
+        raise HTTPException(status_code=404, detail="定时任务不存在")
+
+    result = await db.execute(
+        select(Task).where(
+            Task.scheduled_task_id == task_id,
+            Task.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING]),
+        )
+    )
+    jobs = list(result.scalars().all())
+    for job in jobs:
+        await task_queue.cancel(db, job)
+
+    return {"message": f"已取消 {len(jobs)} 个任务", "cancelled": len(jobs)}
+
+
 @router.get("/{task_id}/logs", response_model=ScheduledTaskLogsResponse)
 async def get_scheduled_task_logs(
     task_id: UUID,
@@ -230,20 +260,66 @@ scheduler_router = APIRouter(prefix="/scheduler", tags=["调度器"])
 
 
 @scheduler_router.get("/status", response_model=SchedulerStatusResponse)
-async def get_scheduler_status():
-    """获取调度器状态"""
-    return scheduler_service.get_status()
+async def get_scheduler_status(db: AsyncSession = Depends(get_db)):
+    """
+    获取调度器状态与草稿库存
+
+    running / paused / 任务数来自 leader 写入数据库的上报，与请求落在哪个进程无关；
+    instance_id / is_leader 为处理本次请求的进程。
+    """
+    return {
+        **await scheduler_state.get_status(db),
+        **scheduler_leader.get_status(),
+        "inventory": await draft_inventory.get_status(db),
+    }
 
 
 @scheduler_router.post("/pause")
-async def pause_scheduler():
-    """暂停所有任务"""
-    await scheduler_service.pause_all()
+async def pause_scheduler(db: AsyncSession = Depends(get_db)):
+    """暂停所有任务（写入数据库，由 leader 在下次检查时执行；本进程为 leader 时立即执行）"""
+    await scheduler_state.set_paused(db, True)
+    if scheduler_leader.is_leader:
+        scheduler_service.set_paused(True)
     return {"message": "已暂停"}
 
 
 @scheduler_router.post("/resume")
-async def resume_scheduler():
-    """恢复所有任务"""
-    await scheduler_service.resume_all()
+async def resume_scheduler(db: AsyncSession = Depends(get_db)):
+    """恢复所有任务（写入数据库，由 leader 在下次检查时执行；本进程为 leader 时立即执行）"""
+    await scheduler_state.set_paused(db, False)
+    if scheduler_leader.is_leader:
+        scheduler_service.set_paused(False)
     return {"message": "已恢复"}
+
+
+@scheduler_router.get("/queue")
+async def get_queue_stats(db: AsyncSession = Depends(get_db)):
+    """获取任务队列状态"""
+    return await task_queue.get_stats(db)
+
+
+@scheduler_router.get("/forecast")
+async def get_load_forecast(
+    hours: int = Query(24, ge=1, le=168),
+    db: AsyncSession = Depends(get_db),
+):
+    """预测未来各时间槽的任务数与资源负载（含负载规划的顺延）"""
+    return await load_planner.forecast(db, hours)
+
+
+@scheduler_router.get("/resources")
+async def get_resource_pools():
+    """获取当前进程各资源池的占用与排队情况"""
+    return resource_pools.stats()
+
+
+@scheduler_router.post("/gc")
+async def run_artifact_gc():
+    """立即执行一轮产物清理"""
+    return await artifact_gc.run_once()
+
+
+@scheduler_router.get("/gc")
+async def get_artifact_gc_report():
+    """获取最近一轮产物清理结果"""
+    return artifact_gc.last_report or {}
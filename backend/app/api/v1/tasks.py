@@ -6,9 +6,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy import select, func
 
 from app.core.database import get_db
-from app.core.exceptions import NotFoundException
+from app.core.exceptions import AppException, NotFoundException
 from app.models import Task, TaskStatus, TaskType
 from app.schemas.task import TaskResponse, TaskListResponse
+from app.services.scheduler import task_queue
 
 router = APIRouter(prefix="/tasks", tags=["任务管理"])
 
@@ -76,16 +77,20 @@ async def retry_task(
         raise NotFoundException("Task")
 
     if task.status != TaskStatus.FAILED:
-        raise ValueError("只能重试失败的任务")
+        raise AppException("只能重试失败的任务")
 
     task.status = TaskStatus.PENDING
     task.retry_count += 1
     task.error_message = None
     task.started_at = None
     task.completed_at = None
+    task.available_at = datetime.utcnow()
+    task.locked_by = None
+    task.locked_until = None
 
     await db.commit()
     await db.refresh(task)
+    task_queue.notify()
 
     return task
 
@@ -103,11 +108,9 @@ async def cancel_task(
         raise NotFoundException("Task")
 
     if task.status not in [TaskStatus.PENDING, TaskStatus.RUNNING]:
-        raise ValueError("只能取消等待中或运行中的任务")
+        raise AppException("只能取消等待中或运行中的任务")
 
-    task.status = TaskStatus.CANCELLED
-    task.completed_at = datetime.utcnow()
-
-    await db.commit()
+    # 本进程执行中的任务立即中断，其他 worker 在下一次心跳时中断
+    await task_queue.cancel(db, task)
 
     return {"message": "任务已取消"}
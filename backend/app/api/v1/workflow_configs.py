@@ -27,6 +27,9 @@ async def get_or_create_config(db: AsyncSession, content_type: ContentType) -> W
             enable_optimize=True,
             enable_image_gen=True,
             enable_auto_publish=False,
+            enable_progressive_image=False,
+            progressive_image_cutoff=60,
+            enable_background_image=True,
             custom_topic="",
         )
         db.add(config)
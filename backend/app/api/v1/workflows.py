@@ -1,14 +1,20 @@
 """工作流 API 路由"""
 
+import asyncio
+import json
 from uuid import UUID
-from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.config import settings
+from app.core.database import get_db, AsyncSessionLocal
 from app.core.exceptions import AIServiceException
 from app.models.workflow_session import WorkflowMode
 from app.models.prompt import ContentType
 from app.services.workflow import workflow_engine, conversation_mgr
+from app.services.workflow.events import workflow_events, TERMINAL_EVENTS
+from app.services.workflow.progress import progress_tracker
 from app.schemas.workflow import (
     WorkflowCreateRequest,
     WorkflowCreateResponse,
@@ -147,7 +153,7 @@ async def get_session_status(
     db: AsyncSession = Depends(get_db),
 ):
     """
-    查询会话状态（用于轮询）
+    查询会话状态（用于轮询，浏览器支持时优先使用 /events 推送）
 
     返回当前会话的状态、进度和结果。
     """
@@ -160,6 +166,72 @@ async def get_session_status(
         raise HTTPException(status_code=500, detail=str(e))
 
 
+async def _read_status_event(session_id: UUID) -> dict:
+    """从数据库读取会话状态并转换为事件（会话不在本进程执行时使用）"""
+    async with AsyncSessionLocal() as db:
+        status = await workflow_engine.get_session_status(db=db, session_id=session_id)
+
+    data = {"session_id": status["session_id"], "stage": status["stage"], "progress": status["progress"]}
+    if status["status"] == "completed":
+        return {"event": "completed", "data": {**data, "article_id": status["article_id"], **(status["result"] or {})}}
+    if status["status"] == "failed":
+        return {"event": "failed", "data": {**data, "error": status["error"]}}
+    return {"event": "progress", "data": data}
+
+
+def _format_event(message: dict) -> str:
+    return f"event: {message['event']}\ndata: {json.dumps(message['data'], ensure_ascii=False)}\n\n"
+
+
+@router.get("/sessions/{session_id}/events")
+async def stream_session_events(session_id: UUID, request: Request):
+    """
+    订阅会话进度（SSE）
+
+    连接后先发送一次当前状态，之后推送 stage / progress 事件，
+    收到 completed / failed 后服务端关闭连接。
+    会话在本进程内执行时直接转发引擎事件，不读数据库；
+    否则（其他进程执行或尚未开始）每个心跳间隔读库一次，状态变化时推送。
+    """
+    initial = progress_tracker.get_event(session_id)
+    if initial is None:
+        try:
+            initial = await _read_status_event(session_id)
+        except AIServiceException as e:
+            raise HTTPException(status_code=404, detail=str(e))
+
+    async def stream():
+        async with workflow_events.subscribe(session_id) as queue:
+            last = progress_tracker.get_event(session_id) or initial
+            yield _format_event(last)
+            if last["event"] in TERMINAL_EVENTS:
+                return
+
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=settings.WORKFLOW_EVENTS_HEARTBEAT)
+                except asyncio.TimeoutError:
+                    if await request.is_disconnected():
+                        return
+                    message = None
+                    if not progress_tracker.is_live(session_id):
+                        message = await _read_status_event(session_id)
+                    if message is None or message == last:
+                        yield ": ping\n\n"
+                        continue
+
+                yield _format_event(message)
+                last = message
+                if message["event"] in TERMINAL_EVENTS:
+                    return
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get("/sessions/{session_id}", response_model=WorkflowDetailResponse)
 async def get_session_detail(
     session_id: UUID,
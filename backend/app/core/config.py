@@ -1,3 +1,4 @@
+import tempfile
 from pathlib import Path
 from typing import Literal
 from pydantic_settings import BaseSettings
@@ -27,11 +28,76 @@ class Settings(BaseSettings):
     BROWSER_SCREENSHOT_DIR: str = str(BASE_DIR / "static" / "screenshots")  # 截图保存目录
     BROWSER_VIEWPORT_WIDTH: int = 1920  # 浏览器视口宽度
     BROWSER_VIEWPORT_HEIGHT: int = 1080  # 浏览器视口高度
+    BROWSER_MAX_SESSIONS: int = 2  # 同时运行的浏览器会话上限
+    BROWSER_SESSIONS_PER_ACCOUNT: int = 1  # 每个账号同时运行的浏览器会话上限
+
+    # 发布账号配置
+    ACCOUNT_DAILY_PUBLISH_QUOTA: int = 20  # 每个账号每天的默认发布配额（0 不限制）
+    ACCOUNT_PUBLISH_COOLDOWN_MINUTES: int = 10  # 同一账号两次发布之间的默认间隔（分钟）
+    ACCOUNT_MAX_CONSECUTIVE_FAILURES: int = 3  # 连续发布失败达到该次数后暂停使用该账号
+    ACCOUNT_FAILURE_PAUSE_MINUTES: int = 60  # 连续失败后的暂停时长（分钟）
+    ACCOUNT_LOCK_NAMESPACE: int = 7301002  # 账号锁使用的 advisory lock 命名空间
+    ACCOUNT_LOCK_WAIT: int = 120  # 指定账号正在发布时最多等待的时间（秒）
+    ACCOUNT_LOCK_POLL_INTERVAL: float = 2.0  # 等待账号锁的轮询间隔（秒）
 
     # 调度器配置
-    SCHEDULER_MAX_CONCURRENT: int = 3  # 最大并发任务数
+    SCHEDULER_ENABLED: bool = True  # API 进程是否参与调度器选主（部署独立 worker 时设为 False）
+    SCHEDULER_MAX_CONCURRENT: int = 3  # API 进程内队列的最大并发任务数
     SCHEDULER_RETRY_COUNT: int = 3  # 失败重试次数
-    SCHEDULER_RETRY_DELAY: int = 300  # 重试间隔（秒）
+    SCHEDULER_RETRY_DELAY: int = 300  # 重试间隔（秒），第 N 次重试等待 DELAY * 2^(N-1)
+    SCHEDULER_LEADER_LOCK_ID: int = 7301001  # 调度器选主使用的 advisory lock 键
+    SCHEDULER_LEADER_INTERVAL: int = 15  # 选主检查与定时任务同步间隔（秒）
+    SCHEDULER_PLAN_SLOT_MINUTES: int = 10  # 负载规划槽位长度（分钟）
+    SCHEDULER_PLAN_HORIZON_HOURS: int = 24  # 负载规划与预测的时间范围（小时）
+    SCHEDULER_PLAN_MAX_DELAY_MINUTES: int = 30  # cron / 固定间隔任务因槽位已满最多顺延的时间（分钟）
+    GENERATE_DRAFT_CEILING: int = 100  # 生成任务默认的就绪草稿上限，达到后跳过生成（0 不限制）
+    DRAFT_COUNT_CACHE_TTL: int = 60  # 就绪草稿数缓存时间（秒）
+
+    # 任务队列配置
+    QUEUE_WORKER_ENABLED: bool = True  # API 进程是否消费任务队列（部署独立 worker 时设为 False）
+    WORKER_CONCURRENCY: int = 3  # 独立 worker 进程（python -m app.worker）的队列并发数
+    QUEUE_POLL_INTERVAL: float = 2.0  # 空闲时轮询间隔（秒）
+    QUEUE_VISIBILITY_TIMEOUT: int = 600  # 租约时长（秒），worker 失联超过该时间后任务可被重新领取
+    QUEUE_HEARTBEAT_INTERVAL: int = 30  # 心跳（续租）间隔（秒）
+    QUEUE_DRAIN_TIMEOUT: int = 60  # 停机时等待执行中任务到达检查点的时间（秒），超时后中断并放回队列
+
+    # 工作流进度配置
+    WORKFLOW_EVENTS_HEARTBEAT: int = 15  # SSE 心跳间隔（秒）；会话不在本进程执行时按该间隔回退读库
+    WORKFLOW_PROGRESS_FLUSH_INTERVAL: int = 30  # 执行中进度落盘的最长间隔（秒），阶段完成时总会落盘
+
+    # LLM 配置
+    LLM_MAX_CONCURRENT: int = 4  # 进程内同时进行的 LLM 请求上限
+
+    # 图片生成配置
+    IMAGE_MAX_CONCURRENT: int = 3  # 进程内同时进行的生图请求上限
+    IMAGE_REQUEST_TIMEOUT: int = 300  # 单次生图请求超时（秒）
+    IMAGE_STAGE_BUDGET: int = 600  # 全自动模式图片阶段总时长预算（秒）
+    IMAGE_HEDGE_ENABLED: bool = True  # 超过 p95 耗时后是否发起对冲请求
+    IMAGE_HEDGE_MIN_SAMPLES: int = 5  # 计算 p95 所需的最少样本数
+    IMAGE_HEDGE_DEFAULT_DELAY: int = 120  # 样本不足时发起对冲请求前的等待（秒）
+
+    # DOCX 生成配置
+    DOCX_RENDERER: Literal["native", "pandoc"] = "native"  # native: 进程内渲染; pandoc: 调用 pandoc 转换
+    DOCX_REFERENCE_DOC: str = ""  # 自定义参考模板（.docx，定义正文/标题样式），为空时使用内置样式
+    DOCX_CACHE_DIR: str = str(Path(tempfile.gettempdir()) / "toutiao_docx_cache")  # 渲染缓存目录
+    DOCX_CACHE_MAX_MB: int = 512  # 渲染缓存总大小上限（MB）
+    DOCX_CACHE_MAX_ENTRIES: int = 500  # 渲染缓存文件数上限
+    DOCX_RENDER_WORKERS: int = 2  # 渲染进程数
+    DOCX_RENDER_QUEUE_SIZE: int = 8  # 排队中的渲染任务上限（超出返回 503）
+    DOCX_RENDER_TIMEOUT: int = 120  # 单次渲染超时（秒）
+
+    # 发布包配置
+    PUBLISH_IMAGE_MAX_WIDTH: int = 1280  # 发布用图片的最大宽度（像素），超出时等比缩小
+    PUBLISH_IMAGE_QUALITY: int = 85  # 缩小后 JPEG 质量
+    PUBLISH_PREFETCH_WINDOW: int = 2  # 批量发布时提前构建发布包的文章数
+
+    # 产物清理配置
+    GC_ENABLED: bool = True  # 是否启用后台清理
+    GC_INTERVAL_MINUTES: int = 60  # 清理间隔（分钟）
+    GC_BATCH_SIZE: int = 200  # 每轮检查的图片目录 / 发布包目录数
+    GC_IMAGE_RETENTION_HOURS: int = 24  # 未被引用的图片保留时长（小时）
+    GC_TEMP_RETENTION_HOURS: int = 24  # 临时 DOCX 文件保留时长（小时）
+    GC_SCREENSHOT_RETENTION_HOURS: int = 168  # 错误截图保留时长（小时）
 
     class Config:
         env_file = ".env"
@@ -44,3 +44,35 @@ class PublishException(AppException):
             detail=detail,
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR
         )
+
+
+class ServiceBusyException(AppException):
+    def __init__(self, detail: str = "Service busy, please retry later"):
+        super().__init__(
+            detail=detail,
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE
+        )
+
+
+class AccountUnavailableException(AppException):
+    def __init__(self, detail: str = "No publish account available"):
+        super().__init__(
+            detail=detail,
+            status_code=status.HTTP_409_CONFLICT
+        )
+
+
+class TaskSkippedException(AppException):
+    def __init__(self, detail: str = "Task skipped"):
+        super().__init__(
+            detail=detail,
+            status_code=status.HTTP_409_CONFLICT
+        )
+
+
+class TaskInterruptedException(AppException):
+    def __init__(self, detail: str = "Task interrupted"):
+        super().__init__(
+            detail=detail,
+            status_code=status.HTTP_409_CONFLICT
+        )
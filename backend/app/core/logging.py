@@ -0,0 +1,28 @@
+import logging
+import sys
+
+import structlog
+
+
+def setup_logging():
+    """配置标准 logging 与 structlog（API 与 worker 进程共用）"""
+    # 配置 Python 标准 logging（必须在 structlog 之前）
+    logging.basicConfig(
+        format="%(message)s",
+        stream=sys.stdout,
+        level=logging.INFO,
+    )
+
+    # 配置 structlog
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            structlog.stdlib.add_logger_name,
+            structlog.stdlib.add_log_level,
+            structlog.processors.TimeStamper(fmt="%Y-%m-%d %H:%M:%S"),
+            structlog.dev.ConsoleRenderer(colors=True)  # 开发环境用可读格式
+        ],
+        wrapper_class=structlog.stdlib.BoundLogger,
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+    )
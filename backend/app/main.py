@@ -1,7 +1,6 @@
 from contextlib import asynccontextmanager
 import sys
 import asyncio
-import logging
 from pathlib import Path
 
 # Windows + Python 3.14 事件循环兼容性修复
@@ -14,29 +13,14 @@ from fastapi.staticfiles import StaticFiles
 import structlog
 
 from app.core.config import settings
+from app.core.logging import setup_logging
 from app.api.v1 import api_router
-from app.services.scheduler import scheduler_service
+from app.services.scheduler import scheduler_leader, task_queue
+from app.services.artifact_gc import artifact_gc
+from app.services.docx_render_service import docx_render_service
+from app.services.workflow.stages.image import drain_background_renders
 
-# 配置 Python 标准 logging（必须在 structlog 之前）
-logging.basicConfig(
-    format="%(message)s",
-    stream=sys.stdout,
-    level=logging.INFO,
-)
-
-# 配置 structlog
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.processors.TimeStamper(fmt="%Y-%m-%d %H:%M:%S"),
-        structlog.dev.ConsoleRenderer(colors=True)  # 开发环境用可读格式
-    ],
-    wrapper_class=structlog.stdlib.BoundLogger,
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-)
+setup_logging()
 
 logger = structlog.get_logger()
 
@@ -45,11 +29,25 @@ logger = structlog.get_logger()
 async def lifespan(app: FastAPI):
     """应用生命周期管理"""
     logger.info("application_startup", app_name=settings.APP_NAME)
-    # 启动调度器
-    await scheduler_service.start()
+    # 参与调度器选主（只有 leader 进程运行调度器）；部署独立 worker 时关闭
+    if settings.SCHEDULER_ENABLED:
+        await scheduler_leader.start()
+    # 启动任务队列 worker；部署独立 worker 时关闭
+    if settings.QUEUE_WORKER_ENABLED:
+        await task_queue.start()
+    # 启动产物清理
+    await artifact_gc.start()
     yield
-    # 停止调度器
-    await scheduler_service.stop()
+    # 停止产物清理
+    await artifact_gc.stop()
+    # 停止任务队列 worker（执行中的任务在检查点中断后放回队列）
+    await task_queue.stop()
+    # 退出选主，leader 进程停止调度器并释放锁
+    await scheduler_leader.stop()
+    # 等待后台插图生成写入，超时后取消
+    await drain_background_renders()
+    # 关闭 DOCX 渲染进程池
+    docx_render_service.shutdown()
     logger.info("application_shutdown")
 
 
@@ -7,6 +7,7 @@ from app.models.ai_config import AIConfig, AIConfigType
 from app.models.workflow_session import WorkflowSession, WorkflowMode, WorkflowStage
 from app.models.conversation_message import ConversationMessage
 from app.models.workflow_config import WorkflowConfig
+from app.models.scheduler_state import SchedulerState
 from app.models.scheduled_task import (
     ScheduledTask,
     ScheduledTaskType,
@@ -35,6 +36,7 @@ __all__ = [
     "WorkflowStage",
     "ConversationMessage",
     "WorkflowConfig",
+    "SchedulerState",
     "ScheduledTask",
     "ScheduledTaskType",
     "ScheduleMode",
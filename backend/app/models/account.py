@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Text, Enum, DateTime
+from sqlalchemy import Column, String, Text, Enum, DateTime, Integer
 from sqlalchemy.orm import relationship
 import enum
 
@@ -24,6 +24,10 @@ class Account(Base, UUIDMixin, TimestampMixin):
     cookies = Column(Text, nullable=True, comment="登录Cookie(加密)")
     status = Column(Enum(AccountStatus), default=AccountStatus.ACTIVE, comment="状态")
     last_publish_at = Column(DateTime, nullable=True, comment="最后发布时间")
+    daily_quota = Column(Integer, default=0, nullable=False, comment="每日发布配额，0 表示使用全局默认值")
+    cooldown_minutes = Column(Integer, default=0, nullable=False, comment="两次发布最小间隔(分钟)，0 表示使用全局默认值")
+    consecutive_failures = Column(Integer, default=0, nullable=False, comment="连续发布失败次数")
+    last_failure_at = Column(DateTime, nullable=True, comment="最近一次发布失败时间")
     avatar_url = Column(String(500), nullable=True, comment="头像URL")
 
     # Relationships
@@ -1,10 +1,11 @@
-from sqlalchemy import Column, String, Text, Enum, Integer, DateTime, ForeignKey
+from sqlalchemy import Column, String, Text, Enum, Integer, DateTime, Boolean, ForeignKey, Index
 from sqlalchemy.dialects.postgresql import UUID, JSONB
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, validates
 import enum
 
 from app.models.base import Base, UUIDMixin, TimestampMixin
 from app.models.prompt import ContentType
+from app.models.article_document import ArticleDocument
 
 
 class ArticleStatus(str, enum.Enum):
@@ -19,15 +20,18 @@ class Article(Base, UUIDMixin, TimestampMixin):
 
     title = Column(String(100), nullable=False, comment="文章标题")
     content = Column(Text, nullable=False, comment="文章内容")
+    content_structure = Column(JSONB, nullable=True, comment="正文解析结果缓存（正文修改时清空）")
     content_type = Column(Enum(ContentType), default=ContentType.ARTICLE, nullable=False, comment="内容类型: article-文章, weitoutiao-微头条")
     cover_url = Column(String(500), nullable=True, comment="封面图URL")
     images = Column(JSONB, default=list, comment="文章图片列表")
     image_prompts = Column(JSONB, default=list, comment="图片生成提示词")
     tags = Column(JSONB, default=list, comment="文章标签列表")
+    publish_bundle = Column(JSONB, nullable=True, comment="预构建的发布包（DOCX、发布用图片、标签）")
 
     status = Column(Enum(ArticleStatus), default=ArticleStatus.DRAFT, comment="状态")
 
     account_id = Column(UUID(as_uuid=True), ForeignKey("accounts.id"), nullable=True, comment="关联账号")
+    inventory = Column(Boolean, default=False, nullable=False, comment="是否为定时任务预生成的库存稿件（按内容类型+账号取用）")
 
     ai_model = Column(String(50), nullable=True, comment="使用的AI模型")
     token_usage = Column(Integer, default=0, comment="Token消耗")
@@ -44,3 +48,40 @@ class Article(Base, UUIDMixin, TimestampMixin):
         back_populates="article",
         cascade="all, delete-orphan"
     )
+
+    __table_args__ = (
+        Index("ix_articles_inventory", "inventory", "content_type", "account_id", "status"),
+        Index("ix_articles_account_published_at", "account_id", "published_at"),
+    )
+
+    @validates("content")
+    def _invalidate_structure(self, key, value):
+        """正文变化时清空结构缓存"""
+        if value != self.content:
+            self.content_structure = None
+            self._document = None
+        return value
+
+    @property
+    def document(self) -> ArticleDocument:
+        """
+        正文结构（段落编号、标题、图片锚点）
+
+        优先使用 content_structure 缓存，缺失或过期时在进程内解析（不写回，缓存由 refresh_structure 填充）
+        """
+        doc = getattr(self, "_document", None)
+        if doc is not None and doc.content == (self.content or ""):
+            return doc
+        if ArticleDocument.is_current(self.content, self.content_structure):
+            doc = ArticleDocument(self.content, self.content_structure["blocks"])
+        else:
+            doc = ArticleDocument.parse(self.content)
+        self._document = doc
+        return doc
+
+    def refresh_structure(self) -> ArticleDocument:
+        """写入正文后调用：将解析结果写入 content_structure（随本次提交保存）"""
+        doc = self.document
+        if not ArticleDocument.is_current(self.content, self.content_structure):
+            self.content_structure = doc.to_dict()
+        return doc
@@ -0,0 +1,145 @@
+"""
+文章结构模型
+
+将 Markdown 正文按行解析为块（标题、段落、列表、引用、空行），并编号正文段落。
+段落编号规则全局统一：每个非空、非标题行是一个正文段落，
+与图片位置 after_paragraph:N、编辑阶段的「第N段」、DOCX 渲染一致。
+
+解析结果以 to_dict() 形式缓存在 articles.content_structure，由写入正文的一方调用
+Article.refresh_structure() 填充，正文修改时失效；Article.document 只读取缓存，不回写。
+只有正文字符串的调用方（渲染、发布）通过 ArticleDocument.parse 复用进程内缓存。
+"""
+
+import hashlib
+import re
+from functools import lru_cache
+
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)\s*#*\s*$")
+BULLET_RE = re.compile(r"^[-*+]\s+(.*)$")
+QUOTE_RE = re.compile(r"^>\s?(.*)$")
+AFTER_PARAGRAPH_PREFIX = "after_paragraph:"
+
+# 结构格式或解析规则变化时递增，使已保存的 content_structure 失效
+STRUCTURE_VERSION = 1
+
+
+def content_hash(content: str) -> str:
+    return hashlib.sha1((content or "").encode("utf-8")).hexdigest()
+
+
+def _parse_line(line: str) -> dict:
+    stripped = line.strip()
+    if not stripped:
+        return {"type": "blank", "text": ""}
+    match = HEADING_RE.match(stripped)
+    if match:
+        return {"type": "heading", "text": match.group(2), "level": len(match.group(1))}
+    if stripped.startswith("#"):
+        # 只有井号的行按标题处理，不计入正文段落
+        return {"type": "heading", "text": stripped.lstrip("#").strip(), "level": 1}
+    match = BULLET_RE.match(stripped)
+    if match:
+        return {"type": "bullet", "text": match.group(1)}
+    match = QUOTE_RE.match(stripped)
+    if match:
+        return {"type": "quote", "text": match.group(1)}
+    return {"type": "paragraph", "text": stripped}
+
+
+class ArticleDocument:
+    """
+    解析后的文章结构
+
+    Attributes:
+        lines: 原文按行拆分
+        blocks: [{"type", "text", "line", "level"?, "paragraph"?}]，
+                正文段落块带 1 起始的 paragraph 编号
+        paragraph_lines: 第 N 个正文段落所在的行号（下标 N-1），用于 O(1) 定位
+    """
+
+    def __init__(self, content: str, blocks: list[dict] | None = None):
+        self.content = content or ""
+        self.lines = self.content.split("\n")
+        self.blocks = blocks if blocks is not None else self._parse()
+        self.paragraph_lines = [b["line"] for b in self.blocks if "paragraph" in b]
+
+    def _parse(self) -> list[dict]:
+        blocks = []
+        paragraph = 0
+        for index, line in enumerate(self.lines):
+            block = _parse_line(line)
+            block["line"] = index
+            if block["type"] not in ("blank", "heading"):
+                paragraph += 1
+                block["paragraph"] = paragraph
+            blocks.append(block)
+        return blocks
+
+    @classmethod
+    def parse(cls, content: str) -> "ArticleDocument":
+        """解析正文（相同内容复用进程内缓存）"""
+        return _parse_cached(content or "")
+
+    @staticmethod
+    def is_current(content: str, data: dict | None) -> bool:
+        """content_structure 是否与当前正文和解析规则一致"""
+        return bool(
+            data
+            and data.get("version") == STRUCTURE_VERSION
+            and data.get("hash") == content_hash(content)
+        )
+
+    def to_dict(self) -> dict:
+        return {
+            "version": STRUCTURE_VERSION,
+            "hash": content_hash(self.content),
+            "blocks": self.blocks,
+        }
+
+    @property
+    def paragraph_count(self) -> int:
+        return len(self.paragraph_lines)
+
+    @property
+    def headings(self) -> list[dict]:
+        return [b for b in self.blocks if b["type"] == "heading"]
+
+    def paragraph_text(self, number: int) -> str | None:
+        """第 N 个正文段落的原始文本（超出范围返回 None）"""
+        if number < 1 or number > self.paragraph_count:
+            return None
+        return self.lines[self.paragraph_lines[number - 1]]
+
+    def replace_paragraph(self, number: int, text: str) -> str:
+        """替换第 N 个正文段落，返回新的正文"""
+        if number < 1 or number > self.paragraph_count:
+            return self.content
+        lines = list(self.lines)
+        lines[self.paragraph_lines[number - 1]] = text
+        return "\n".join(lines)
+
+    def nonblank_lines(self) -> list[str]:
+        """按顺序返回所有非空行（逐行输入编辑器时使用）"""
+        return [self.lines[b["line"]] for b in self.blocks if b["type"] != "blank"]
+
+    def anchor(self, position: str) -> int | None:
+        """解析 after_paragraph:N，返回有效的段落编号，无效或越界返回 None"""
+        if not isinstance(position, str) or not position.startswith(AFTER_PARAGRAPH_PREFIX):
+            return None
+        try:
+            number = int(position[len(AFTER_PARAGRAPH_PREFIX):])
+        except ValueError:
+            return None
+        return number if 1 <= number <= self.paragraph_count else None
+
+    def normalize_position(self, position) -> str:
+        """规范化图片位置：cover / end / 有效的 after_paragraph:N，其余归为 end"""
+        if position in ("cover", "end"):
+            return position
+        number = self.anchor(position)
+        return f"{AFTER_PARAGRAPH_PREFIX}{number}" if number else "end"
+
+
+@lru_cache(maxsize=128)
+def _parse_cached(content: str) -> ArticleDocument:
+    return ArticleDocument(content)
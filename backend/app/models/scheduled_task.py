@@ -126,6 +126,27 @@ class ScheduledTask(Base, UUIDMixin, TimestampMixin):
         comment="发布顺序: oldest/newest/random"
     )
 
+    # 库存配置（仅生成并发布任务）
+    inventory_target = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="预生成库存目标数，0 表示不启用（触发时现生成现发布）"
+    )
+    inventory_stats = Column(
+        JSONB,
+        nullable=True,
+        comment="库存统计: {low_watermark, pops, stockouts, last_pop_at}"
+    )
+
+    # 背压配置（仅生成任务）
+    draft_ceiling = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="就绪草稿上限，达到后跳过本次生成；0 表示使用全局默认值"
+    )
+
     # 状态
     is_active = Column(
         Boolean,
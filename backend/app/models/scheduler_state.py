@@ -0,0 +1,40 @@
+from sqlalchemy import Column, Integer, String, Boolean, DateTime
+from .base import Base, TimestampMixin
+
+
+class SchedulerState(Base, TimestampMixin):
+    """调度器状态表 - 单行，跨进程共享的暂停开关与 leader 上报的状态"""
+
+    __tablename__ = "scheduler_state"
+
+    # 固定为 1
+    id = Column(Integer, primary_key=True, default=1)
+
+    paused = Column(
+        Boolean,
+        default=False,
+        nullable=False,
+        comment="是否暂停所有定时任务（leader 同步时执行）"
+    )
+    leader_instance_id = Column(
+        String(200),
+        nullable=True,
+        comment="当前 leader 实例"
+    )
+    leader_heartbeat_at = Column(
+        DateTime,
+        nullable=True,
+        comment="leader 最近一次上报时间(UTC)"
+    )
+    active_tasks = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="leader 调度器中的任务数"
+    )
+    pending_jobs = Column(
+        Integer,
+        default=0,
+        nullable=False,
+        comment="leader 调度器中等待触发的任务数"
+    )
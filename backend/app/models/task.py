@@ -1,5 +1,6 @@
-from sqlalchemy import Column, String, Text, Enum, Integer, DateTime, ForeignKey
-from sqlalchemy.dialects.postgresql import UUID
+from datetime import datetime
+from sqlalchemy import Column, String, Text, Enum, Integer, DateTime, ForeignKey, Index
+from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
 
@@ -41,7 +42,18 @@ class Task(Base, UUIDMixin, TimestampMixin):
     started_at = Column(DateTime, nullable=True, comment="开始时间")
     completed_at = Column(DateTime, nullable=True, comment="完成时间")
 
+    # 队列字段
+    payload = Column(JSONB, nullable=True, comment="任务参数")
+    available_at = Column(DateTime, default=datetime.utcnow, nullable=False, comment="可被领取的时间（重试退避）")
+    locked_by = Column(String(100), nullable=True, comment="领取该任务的 worker")
+    locked_until = Column(DateTime, nullable=True, comment="租约到期时间，过期后可被其他 worker 重新领取")
+    heartbeat_at = Column(DateTime, nullable=True, comment="最近一次心跳时间")
+
     # Relationships
     article = relationship("Article", back_populates="tasks")
     account = relationship("Account", back_populates="tasks")
     scheduled_task = relationship("ScheduledTask", backref="execution_logs")
+
+    __table_args__ = (
+        Index("ix_tasks_queue", "status", "priority", "available_at"),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Boolean, Enum as SQLEnum
+from sqlalchemy import Column, String, Boolean, Integer, Enum as SQLEnum
 from .base import Base, UUIDMixin, TimestampMixin
 from .prompt import ContentType
 
@@ -42,6 +42,26 @@ class WorkflowConfig(Base, UUIDMixin, TimestampMixin):
         comment="是否启用自动发布"
     )
 
+    # 渐进式生图：先同步生成封面，正文插图在截止时间内完成的随文章发布
+    enable_progressive_image = Column(
+        Boolean,
+        default=False,
+        nullable=False,
+        comment="是否启用封面优先的渐进式生图"
+    )
+    progressive_image_cutoff = Column(
+        Integer,
+        default=60,
+        nullable=False,
+        comment="封面生成后等待正文插图的时长（秒）"
+    )
+    enable_background_image = Column(
+        Boolean,
+        default=True,
+        nullable=False,
+        comment="截止后是否在后台继续生成剩余插图"
+    )
+
     # 可选：自定义话题内容
     custom_topic = Column(
         String(500),
@@ -1,6 +1,6 @@
 """工作流会话模型"""
 
-from sqlalchemy import Column, String, ForeignKey, Enum as SQLEnum, Text
+from sqlalchemy import Column, ForeignKey, Enum as SQLEnum, Text, Integer
 from sqlalchemy.dialects.postgresql import UUID, JSONB
 from sqlalchemy.orm import relationship
 import enum
@@ -62,8 +62,9 @@ class WorkflowSession(Base, UUIDMixin, TimestampMixin):
         comment="错误信息"
     )
     progress = Column(
-        String(10),
-        default="0",
+        Integer,
+        default=0,
+        nullable=False,
         comment="进度百分比"
     )
 
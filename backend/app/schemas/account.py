@@ -20,6 +20,8 @@ class AccountUpdate(BaseModel):
     nickname: Optional[str] = Field(None, max_length=100)
     cookies: Optional[str] = None
     status: Optional[AccountStatus] = None
+    daily_quota: Optional[int] = Field(None, ge=0, le=500, description="每日发布配额，0 使用全局默认值")
+    cooldown_minutes: Optional[int] = Field(None, ge=0, le=1440, description="两次发布最小间隔(分钟)，0 使用全局默认值")
 
 
 class AccountResponse(AccountBase):
@@ -27,6 +29,10 @@ class AccountResponse(AccountBase):
     uid: str
     status: AccountStatus
     last_publish_at: Optional[datetime]
+    daily_quota: int = 0
+    cooldown_minutes: int = 0
+    consecutive_failures: int = 0
+    last_failure_at: Optional[datetime] = None
     avatar_url: Optional[str]
     created_at: datetime
     updated_at: datetime
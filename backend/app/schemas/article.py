@@ -36,6 +36,8 @@ class ArticleResponse(ArticleBase):
     images: List[Any]
     image_prompts: List[Any]
     tags: List[str]
+    publish_bundle: Optional[dict] = None
+    inventory: bool = False
     status: ArticleStatus
     account_id: Optional[UUID]
     ai_model: Optional[str]
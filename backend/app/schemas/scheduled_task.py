@@ -58,6 +58,12 @@ class ScheduledTaskCreate(BaseModel):
         default="oldest", description="发布顺序"
     )
 
+    # 库存配置
+    inventory_target: int = Field(default=0, ge=0, le=20, description="预生成库存目标数，0 表示不启用")
+
+    # 背压配置
+    draft_ceiling: int = Field(default=0, ge=0, le=10000, description="就绪草稿上限，0 表示使用全局默认值")
+
     is_active: bool = Field(default=True, description="是否启用")
 
 
@@ -80,6 +86,9 @@ class ScheduledTaskUpdate(BaseModel):
     publish_batch_size: Optional[int] = Field(default=None, ge=1)
     publish_order: Optional[Literal["oldest", "newest", "random"]] = None
 
+    inventory_target: Optional[int] = Field(default=None, ge=0, le=20)
+    draft_ceiling: Optional[int] = Field(default=None, ge=0, le=10000)
+
     is_active: Optional[bool] = None
 
 
@@ -106,6 +115,10 @@ class ScheduledTaskResponse(BaseModel):
     publish_batch_size: int
     publish_order: str
 
+    inventory_target: int
+    inventory_stats: Optional[dict] = None
+    draft_ceiling: int = 0
+
     is_active: bool
     last_run_at: Optional[datetime]
     next_run_at: Optional[datetime]
@@ -148,8 +161,29 @@ class ScheduledTaskLogsResponse(BaseModel):
     total: int
 
 
+class InventoryStatusResponse(BaseModel):
+    """草稿库存状态（同一内容类型+账号的任务共享 ready / producing）"""
+    scheduled_task_id: UUID
+    name: str
+    content_type: str
+    account_id: Optional[UUID]
+    target: int
+    ready: int
+    producing: int
+    low_watermark: Optional[int] = Field(default=None, description="取用后剩余库存的历史最低值")
+    pops: int
+    stockouts: int = Field(description="库存为空、回退为现生成的次数")
+    last_pop_at: Optional[datetime]
+
+
 class SchedulerStatusResponse(BaseModel):
     """调度器状态响应"""
     running: bool
+    paused: bool = False
     active_tasks: int
     pending_jobs: int
+    leader_instance_id: Optional[str] = None
+    leader_heartbeat_at: Optional[datetime] = None
+    instance_id: str
+    is_leader: bool
+    inventory: list[InventoryStatusResponse] = []
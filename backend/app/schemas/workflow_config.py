@@ -1,4 +1,4 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
 from typing import Optional
 from uuid import UUID
 from datetime import datetime
@@ -11,6 +11,9 @@ class WorkflowConfigBase(BaseModel):
     enable_optimize: bool = True
     enable_image_gen: bool = True
     enable_auto_publish: bool = False
+    enable_progressive_image: bool = False
+    progressive_image_cutoff: int = Field(default=60, ge=0, le=600)
+    enable_background_image: bool = True
     custom_topic: str = ""
 
 
@@ -25,6 +28,9 @@ class WorkflowConfigUpdate(BaseModel):
     enable_optimize: Optional[bool] = None
     enable_image_gen: Optional[bool] = None
     enable_auto_publish: Optional[bool] = None
+    enable_progressive_image: Optional[bool] = None
+    progressive_image_cutoff: Optional[int] = Field(default=None, ge=0, le=600)
+    enable_background_image: Optional[bool] = None
     custom_topic: Optional[str] = None
 
 
@@ -0,0 +1,274 @@
+"""
+发布账号选择 - 在可用账号之间分摊发布并保证同一账号串行
+
+所有发布入口（全自动工作流、定时发布、手动发布）都通过 lease() 获取账号：
+- 未指定账号时，在可用账号中选最久未发布的（当天发布数少的优先）；
+- 可用条件：状态正常且有 Cookie、未达每日配额、已过发布冷却、未处于连续失败后的暂停期；
+- 租用期间持有该账号的 Postgres advisory lock（绑定一条专用连接），
+  多个 worker 进程不会同时操作同一账号的浏览器；
+- 配额与冷却在持锁后复查，等锁期间上一次发布产生的冷却同样生效；
+- 发布结束后在释放锁前调用 record_result()，经持锁连接立即提交最后发布时间与连续失败次数。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import AsyncIterator
+from uuid import UUID
+import structlog
+from sqlalchemy import select, func, text, update
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.exceptions import AccountUnavailableException
+from app.models import Account, AccountStatus, Article
+
+logger = structlog.get_logger()
+
+
+def _today_start_utc() -> datetime:
+    """本地当天零点对应的 UTC 时间（发布时间以 UTC 存储，配额按本地自然日计算）"""
+    now = datetime.now()
+    return now.replace(hour=0, minute=0, second=0, microsecond=0) - (now - datetime.utcnow())
+
+
+class AccountSelector:
+    """发布账号选择器"""
+
+    def __init__(self):
+        # 本进程持有的账号锁连接
+        self._held: dict[UUID, AsyncConnection] = {}
+
+    def daily_quota(self, account: Account) -> int:
+        return account.daily_quota or settings.ACCOUNT_DAILY_PUBLISH_QUOTA
+
+    def cooldown(self, account: Account) -> timedelta:
+        return timedelta(minutes=account.cooldown_minutes or settings.ACCOUNT_PUBLISH_COOLDOWN_MINUTES)
+
+    async def published_today(self, db: AsyncSession) -> dict[UUID, int]:
+        result = await db.execute(
+            select(Article.account_id, func.count(Article.id))
+            .where(Article.published_at >= _today_start_utc(), Article.account_id.isnot(None))
+            .group_by(Article.account_id)
+        )
+        return dict(result.all())
+
+    def unavailable_reason(
+        self,
+        account: Account,
+        published_today: int,
+        now: datetime,
+        check_cooldown: bool = True,
+    ) -> str | None:
+        """账号不可用的原因，可用时返回 None（now 为 UTC）"""
+        if account.status != AccountStatus.ACTIVE:
+            return "账号状态异常"
+        if not account.cookies:
+            return "未配置 Cookie"
+
+        if (
+            account.consecutive_failures >= settings.ACCOUNT_MAX_CONSECUTIVE_FAILURES
+            and account.last_failure_at
+            and now - account.last_failure_at < timedelta(minutes=settings.ACCOUNT_FAILURE_PAUSE_MINUTES)
+        ):
+            return f"连续发布失败 {account.consecutive_failures} 次，暂停中"
+
+        quota = self.daily_quota(account)
+        if quota > 0 and published_today >= quota:
+            return f"今日已发布 {published_today} 篇，达到配额 {quota}"
+
+        if check_cooldown and account.last_publish_at and now - account.last_publish_at < self.cooldown(account):
+            return "发布冷却中"
+
+        return None
+
+    async def _recheck(self, db: AsyncSession, account: Account, check_cooldown: bool) -> str | None:
+        """持锁后重新读取账号并检查可用性（等锁期间上一次发布可能已更新发布时间和当日发布数）"""
+        await db.refresh(account)
+        counts = await self.published_today(db)
+        return self.unavailable_reason(account, counts.get(account.id, 0), datetime.utcnow(), check_cooldown)
+
+    async def _candidates(self, db: AsyncSession, check_cooldown: bool) -> list[Account]:
+        """可用账号，最久未发布的在前（持锁后还需复查）"""
+        result = await db.execute(select(Account).where(Account.status == AccountStatus.ACTIVE))
+        counts = await self.published_today(db)
+        now = datetime.utcnow()
+
+        accounts = [
+            account for account in result.scalars().all()
+            if self.unavailable_reason(account, counts.get(account.id, 0), now, check_cooldown) is None
+        ]
+        accounts.sort(key=lambda a: (a.last_publish_at or datetime.min, counts.get(a.id, 0)))
+        return accounts
+
+    # ==================== 账号锁 ====================
+
+    async def _try_lock(self, account_id: UUID) -> AsyncConnection | None:
+        """尝试获取账号锁，成功时返回持锁连接"""
+        conn = await engine.connect()
+        try:
+            locked = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:namespace, hashtext(:key))"),
+                {"namespace": settings.ACCOUNT_LOCK_NAMESPACE, "key": str(account_id)},
+            )
+            await conn.commit()
+        except Exception:
+            await conn.invalidate()
+            raise
+
+        if not locked:
+            await conn.close()
+            return None
+        return conn
+
+    async def _unlock(self, conn: AsyncConnection, account_id: UUID):
+        try:
+            await conn.execute(
+                text("SELECT pg_advisory_unlock(:namespace, hashtext(:key))"),
+                {"namespace": settings.ACCOUNT_LOCK_NAMESPACE, "key": str(account_id)},
+            )
+            await conn.commit()
+            await conn.close()
+        except Exception as e:
+            # 解锁失败时丢弃连接，会话级锁随连接释放
+            logger.warning("account_unlock_failed", account_id=str(account_id), error=str(e))
+            await conn.invalidate()
+
+    # ==================== 租用 ====================
+
+    @asynccontextmanager
+    async def lease(
+        self,
+        db: AsyncSession,
+        account_id: UUID | None = None,
+        enforce_limits: bool = True,
+        wait: float | None = None,
+        check_cooldown: bool = True,
+    ) -> AsyncIterator[Account]:
+        """
+        租用一个发布账号，退出时释放账号锁
+
+        配额与冷却在持锁后复查，排队等锁的发布不会绕过上一次发布留下的冷却。
+        调用方应在退出前调用 record_result() 并提交文章的发布结果，保证下一个持锁者读到最新状态。
+
+        Args:
+            db: 数据库会话（返回的账号属于该会话）
+            account_id: 指定账号；不指定时自动选择可用账号
+            enforce_limits: 是否检查配额、冷却与失败暂停（手动发布不检查）
+            wait: 指定账号正被其他发布占用时最多等待的秒数（默认 ACCOUNT_LOCK_WAIT）
+            check_cooldown: 是否检查发布冷却（同一次批量发布中的后续文章不检查）
+
+        Raises:
+            AccountUnavailableException: 没有可用账号，或指定账号不可用 / 等待超时
+        """
+        conn = None
+        if account_id is None:
+            for candidate in await self._candidates(db, check_cooldown):
+                conn = await self._try_lock(candidate.id)
+                if conn is None:
+                    continue
+                if await self._recheck(db, candidate, check_cooldown) is None:
+                    account = candidate
+                    break
+                await self._unlock(conn, candidate.id)
+                conn = None
+            else:
+                raise AccountUnavailableException("没有可用的发布账号（均达到配额、冷却中或正在发布）")
+        else:
+            account = await db.get(Account, account_id)
+            if not account:
+                raise AccountUnavailableException("发布账号不存在")
+
+            async def check() -> str | None:
+                if enforce_limits:
+                    return await self._recheck(db, account, check_cooldown)
+                return None if account.status == AccountStatus.ACTIVE and account.cookies else "发布账号不可用"
+
+            # 先检查一次，明显不可用时不必等锁
+            if reason := await check():
+                raise AccountUnavailableException(f"{account.nickname}: {reason}")
+
+            deadline = asyncio.get_running_loop().time() + (settings.ACCOUNT_LOCK_WAIT if wait is None else wait)
+            while (conn := await self._try_lock(account.id)) is None:
+                if asyncio.get_running_loop().time() >= deadline:
+                    raise AccountUnavailableException(f"{account.nickname}: 账号正在发布中，请稍后重试")
+                await asyncio.sleep(settings.ACCOUNT_LOCK_POLL_INTERVAL)
+
+            if reason := await check():
+                await self._unlock(conn, account.id)
+                raise AccountUnavailableException(f"{account.nickname}: {reason}")
+
+        self._held[account.id] = conn
+        logger.info("account_leased", account_id=str(account.id), nickname=account.nickname)
+        try:
+            yield account
+        finally:
+            self._held.pop(account.id, None)
+            await self._unlock(conn, account.id)
+
+    async def record_result(self, account: Account, success: bool):
+        """
+        记录一次发布结果
+
+        通过持锁连接立即提交，不依赖调用方的事务；释放账号锁前账号状态已落盘。
+        """
+        now = datetime.utcnow()
+        if success:
+            account.last_publish_at = now
+            account.consecutive_failures = 0
+        else:
+            account.consecutive_failures = (account.consecutive_failures or 0) + 1
+            account.last_failure_at = now
+
+        conn = self._held.get(account.id)
+        if conn is None:
+            return
+        await conn.execute(
+            update(Account)
+            .where(Account.id == account.id)
+            .values(
+                last_publish_at=account.last_publish_at,
+                consecutive_failures=account.consecutive_failures,
+                last_failure_at=account.last_failure_at,
+            )
+        )
+        await conn.commit()
+
+    # ==================== 状态 ====================
+
+    async def get_status(self, db: AsyncSession) -> list[dict]:
+        """各账号今日发布数、配额、冷却与可用状态"""
+        result = await db.execute(select(Account).order_by(Account.created_at))
+        counts = await self.published_today(db)
+        # 当前持有账号锁（正在发布）的账号
+        publishing = set((await db.execute(
+            text(
+                "SELECT a.id FROM accounts a JOIN pg_locks l "
+                "ON l.locktype = 'advisory' AND l.granted AND l.objsubid = 2 "
+                "AND l.classid = CAST(:namespace AS oid) "
+                "AND l.objid = CAST(hashtext(CAST(a.id AS text))::bigint & 4294967295 AS oid)"
+            ),
+            {"namespace": settings.ACCOUNT_LOCK_NAMESPACE},
+        )).scalars().all())
+
+        now = datetime.utcnow()
+        items = []
+        for account in result.scalars().all():
+            published = counts.get(account.id, 0)
+            cooldown_until = account.last_publish_at + self.cooldown(account) if account.last_publish_at else None
+            items.append({
+                "account_id": str(account.id),
+                "nickname": account.nickname,
+                "published_today": published,
+                "daily_quota": self.daily_quota(account),
+                "cooldown_until": cooldown_until.isoformat() if cooldown_until and cooldown_until > now else None,
+                "consecutive_failures": account.consecutive_failures,
+                "publishing": account.id in publishing,
+                "unavailable_reason": self.unavailable_reason(account, published, now),
+            })
+        return items
+
+
+# 全局实例
+account_selector = AccountSelector()
@@ -7,6 +7,7 @@ from sqlalchemy import select
 from app.core.exceptions import AIServiceException
 from app.models.prompt import Prompt, PromptType
 from app.models.ai_config import AIConfig, AIConfigType
+from app.services.resource_pools import resource_pools
 
 logger = structlog.get_logger()
 
@@ -53,15 +54,16 @@ async def generate_article(
 
     try:
         print(f"[DEBUG] model={config.model}, api_url={config.api_url}")
-        response = await client.chat.completions.create(
-            model=config.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.7,
-            response_format={"type": "json_object"},
-        )
+        async with resource_pools.llm.acquire():
+            response = await client.chat.completions.create(
+                model=config.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.7,
+                response_format={"type": "json_object"},
+            )
         print(f"[DEBUG] response type={type(response)}, response={str(response)[:200]}")
 
         content = response.choices[0].message.content
@@ -98,15 +100,16 @@ async def humanize_article(db: AsyncSession, title: str, content: str) -> dict:
     user_prompt = f"请改写以下文章：\n\n标题：{title}\n\n正文：{content}"
 
     try:
-        response = await client.chat.completions.create(
-            model=config.model,
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": user_prompt},
-            ],
-            temperature=0.8,
-            response_format={"type": "json_object"},
-        )
+        async with resource_pools.llm.acquire():
+            response = await client.chat.completions.create(
+                model=config.model,
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": user_prompt},
+                ],
+                temperature=0.8,
+                response_format={"type": "json_object"},
+            )
 
         content = response.choices[0].message.content
         # 清理 markdown 代码块
@@ -132,11 +135,12 @@ async def test_connection(db: AsyncSession, config_type: AIConfigType) -> bool:
     try:
         config = await _get_ai_config(db, config_type)
         client = AsyncOpenAI(api_key=config.api_key, base_url=config.api_url or None)
-        await client.chat.completions.create(
-            model=config.model,
-            messages=[{"role": "user", "content": "Hello"}],
-            max_tokens=10,
-        )
+        async with resource_pools.llm.acquire():
+            await client.chat.completions.create(
+                model=config.model,
+                messages=[{"role": "user", "content": "Hello"}],
+                max_tokens=10,
+            )
         return True
     except Exception as e:
         logger.error("ai_connection_test_failed", error=str(e))
@@ -0,0 +1,273 @@
+"""产物清理服务 - 回收孤立图片、过期发布包、临时 DOCX 和截图文件"""
+
+import asyncio
+import os
+import shutil
+import time
+from pathlib import Path
+from uuid import UUID
+import structlog
+from sqlalchemy import select
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Article
+from app.services.docx_cache import docx_cache
+from app.services.docx_generator import docx_generator
+from app.services.image_gen import IMAGES_DIR
+from app.services.publish_bundle import BUNDLES_DIR
+
+logger = structlog.get_logger()
+
+
+class ArtifactGarbageCollector:
+    """
+    产物清理服务
+
+    定期增量扫描 static/images/{article_id} 目录，每轮只检查 GC_BATCH_SIZE 个目录
+    （目录列表在一遍扫描开始时列出一次，之后各轮按批次取用），
+    用一次批量查询比对文章的 images 字段，删除超过保留期且未被引用的图片；
+    static/bundles/{article_id} 目录同样增量扫描，删除已删除文章的发布包、
+    与文章当前 publish_bundle 指纹不一致的旧发布包和构建中断残留的临时目录；
+    同时按保留期清理临时 DOCX、渲染残留文件和错误截图。
+    """
+
+    def __init__(self):
+        self._task: asyncio.Task | None = None
+        self._pending: dict[Path, list[str]] = {}  # 根目录 -> 本遍尚未检查的目录名
+        self.last_report: dict | None = None
+
+    async def start(self):
+        """启动后台清理循环"""
+        if not settings.GC_ENABLED or self._task:
+            return
+        self._task = asyncio.create_task(self._loop())
+        logger.info("artifact_gc_started", interval_minutes=settings.GC_INTERVAL_MINUTES)
+
+    async def stop(self):
+        """停止后台清理循环"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("artifact_gc_stopped")
+
+    async def _loop(self):
+        while True:
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error("artifact_gc_failed", error=str(e))
+            await asyncio.sleep(settings.GC_INTERVAL_MINUTES * 60)
+
+    async def run_once(self) -> dict:
+        """
+        执行一轮清理
+
+        Returns:
+            dict: {"dirs_scanned": int, "files_deleted": int, "bytes_reclaimed": int}
+        """
+        report = {"dirs_scanned": 0, "files_deleted": 0, "bytes_reclaimed": 0}
+
+        await self._collect_images(report)
+        await self._collect_bundles(report)
+
+        now = time.time()
+        await asyncio.to_thread(
+            self._sweep_dir,
+            docx_generator.temp_dir,
+            "*.docx",
+            now - settings.GC_TEMP_RETENTION_HOURS * 3600,
+            report,
+        )
+        await asyncio.to_thread(
+            self._sweep_dir,
+            docx_cache.cache_dir,
+            ".*.tmp",
+            now - settings.GC_TEMP_RETENTION_HOURS * 3600,
+            report,
+        )
+        await asyncio.to_thread(
+            self._sweep_dir,
+            Path(settings.BROWSER_SCREENSHOT_DIR),
+            "*.png",
+            now - settings.GC_SCREENSHOT_RETENTION_HOURS * 3600,
+            report,
+        )
+
+        self.last_report = {**report, "finished_at": time.strftime("%Y-%m-%d %H:%M:%S")}
+        logger.info("artifact_gc_completed", **report)
+        return report
+
+    def _next_dirs(self, root: Path) -> list[Path]:
+        """
+        取 root 下的下一批子目录
+
+        一遍扫描开始时用 os.scandir 列出一次（按目录项类型判断，不逐个 stat），之后各轮从该列表中取用，
+        全部检查完后下一轮重新列出；期间新建的目录在下一遍检查，已删除的目录直接跳过。
+        """
+        pending = self._pending.get(root)
+        if not pending:
+            try:
+                with os.scandir(root) as entries:
+                    pending = [entry.name for entry in entries if entry.is_dir()]
+            except FileNotFoundError:
+                return []
+            self._pending[root] = pending
+
+        batch = pending[-settings.GC_BATCH_SIZE:]
+        del pending[-settings.GC_BATCH_SIZE:]
+        return [root / name for name in batch if (root / name).is_dir()]
+
+    @staticmethod
+    def _article_ids(dirs: list[Path]) -> list[UUID]:
+        article_ids = []
+        for d in dirs:
+            try:
+                article_ids.append(UUID(d.name))
+            except ValueError:
+                continue
+        return article_ids
+
+    async def _collect_images(self, report: dict):
+        """清理未被任何文章引用的图片"""
+        dirs = await asyncio.to_thread(self._next_dirs, IMAGES_DIR)
+        if not dirs:
+            return
+
+        article_ids = self._article_ids(dirs)
+
+        # 一次查询取回本批目录对应文章的图片引用
+        referenced: dict[str, set[str]] = {}
+        if article_ids:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Article.id, Article.images).where(Article.id.in_(article_ids))
+                )
+                for article_id, images in result.all():
+                    referenced[str(article_id)] = {
+                        Path(img["path"]).name
+                        for img in (images or [])
+                        if isinstance(img, dict) and img.get("path")
+                    }
+
+        cutoff = time.time() - settings.GC_IMAGE_RETENTION_HOURS * 3600
+        await asyncio.to_thread(self._sweep_image_dirs, dirs, referenced, cutoff, report)
+
+    def _sweep_image_dirs(
+        self,
+        dirs: list[Path],
+        referenced: dict[str, set[str]],
+        cutoff: float,
+        report: dict,
+    ):
+        for d in dirs:
+            report["dirs_scanned"] += 1
+            keep = referenced.get(d.name, set())
+            for file_path in d.iterdir():
+                if file_path.is_file() and file_path.name not in keep:
+                    self._delete_if_older(file_path, cutoff, report)
+
+            # 文章已删除且目录已清空时移除目录
+            if d.name not in referenced:
+                try:
+                    d.rmdir()
+                except OSError:
+                    pass
+
+    async def _collect_bundles(self, report: dict):
+        """清理已删除文章的发布包、旧指纹的发布包和构建残留的临时目录"""
+        dirs = await asyncio.to_thread(self._next_dirs, BUNDLES_DIR)
+        if not dirs:
+            return
+
+        article_ids = self._article_ids(dirs)
+
+        # 一次查询取回本批目录对应文章当前的发布包指纹
+        current: dict[str, str | None] = {}
+        if article_ids:
+            async with AsyncSessionLocal() as db:
+                result = await db.execute(
+                    select(Article.id, Article.publish_bundle["fingerprint"].astext)
+                    .where(Article.id.in_(article_ids))
+                )
+                for article_id, fingerprint in result.all():
+                    current[str(article_id)] = fingerprint
+
+        now = time.time()
+        await asyncio.to_thread(
+            self._sweep_bundle_dirs,
+            dirs,
+            current,
+            now - settings.GC_IMAGE_RETENTION_HOURS * 3600,
+            now - settings.GC_TEMP_RETENTION_HOURS * 3600,
+            report,
+        )
+
+    def _sweep_bundle_dirs(
+        self,
+        dirs: list[Path],
+        current: dict[str, str | None],
+        cutoff: float,
+        tmp_cutoff: float,
+        report: dict,
+    ):
+        for d in dirs:
+            report["dirs_scanned"] += 1
+            fingerprint = current.get(d.name)
+            for bundle_dir in d.iterdir():
+                if not bundle_dir.is_dir():
+                    continue
+                if bundle_dir.name.startswith("."):
+                    # 构建中断残留的临时目录
+                    self._delete_tree_if_older(bundle_dir, tmp_cutoff, report)
+                elif bundle_dir.name != fingerprint:
+                    # 文章已删除或指纹已变化；保留期内的可能是预取中尚未写入文章的发布包
+                    self._delete_tree_if_older(bundle_dir, cutoff, report)
+
+            if d.name not in current:
+                try:
+                    d.rmdir()
+                except OSError:
+                    pass
+
+    def _sweep_dir(self, directory: Path, pattern: str, cutoff: float, report: dict):
+        if not directory.exists():
+            return
+        for file_path in directory.glob(pattern):
+            if file_path.is_file():
+                self._delete_if_older(file_path, cutoff, report)
+
+    def _delete_tree_if_older(self, directory: Path, cutoff: float, report: dict):
+        try:
+            if directory.stat().st_mtime >= cutoff:
+                return
+            files = [p.stat() for p in directory.rglob("*") if p.is_file()]
+            shutil.rmtree(directory)
+            report["files_deleted"] += len(files)
+            report["bytes_reclaimed"] += sum(stat.st_size for stat in files)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("artifact_gc_delete_failed", path=str(directory), error=str(e))
+
+    def _delete_if_older(self, file_path: Path, cutoff: float, report: dict):
+        try:
+            stat = file_path.stat()
+            if stat.st_mtime >= cutoff:
+                return
+            file_path.unlink()
+            report["files_deleted"] += 1
+            report["bytes_reclaimed"] += stat.st_size
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("artifact_gc_delete_failed", path=str(file_path), error=str(e))
+
+
+# 全局实例
+artifact_gc = ArtifactGarbageCollector()
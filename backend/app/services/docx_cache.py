@@ -0,0 +1,163 @@
+"""DOCX 渲染缓存 - 按文章内容哈希复用已生成的文档"""
+
+import hashlib
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+import structlog
+
+from app.core.config import settings
+from app.services.docx_renderer import RENDERER_VERSION, reference_fingerprint
+
+logger = structlog.get_logger()
+
+
+class DocxCache:
+    """
+    DOCX 渲染缓存
+
+    以 (标题, 正文, 图片路径与位置, 渲染器版本) 的哈希为键保存生成的文件，
+    总大小和文件数超过上限时按最近最少使用（文件修改时间，命中时刷新）淘汰。
+    API 与 worker 进程共用缓存目录：进程内索引只是加速，未命中时以磁盘上的文件为准，
+    淘汰按目录的实际内容计算，上限对整个目录生效而不是每个进程各算一份。
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int, max_entries: int):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, int] = OrderedDict()  # key -> 文件大小
+        self._total_bytes = 0
+        self._loaded = False
+
+    def _ensure_loaded(self):
+        """首次访问时按目录内容建立索引（渲染子进程不会触发）"""
+        if self._loaded:
+            return
+        self._sync()
+
+    def _scan(self) -> list[tuple[float, int, str]]:
+        """列出缓存目录中的文件，按修改时间从旧到新排序：[(mtime, size, key)]"""
+        files = []
+        with os.scandir(self.cache_dir) as entries:
+            for entry in entries:
+                if not entry.name.endswith(".docx"):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                files.append((stat.st_mtime, stat.st_size, entry.name[:-len(".docx")]))
+        files.sort()
+        return files
+
+    def _sync(self):
+        """以目录内容重建索引，并淘汰最久未使用的文件直到满足上限（调用方持有锁）"""
+        files = self._scan()
+        total = sum(size for _, size, _ in files)
+        evicted = 0
+        while files and (len(files) > self.max_entries or total > self.max_bytes):
+            _, size, key = files.pop(0)
+            total -= size
+            try:
+                self.path_for(key).unlink()
+                evicted += 1
+            except FileNotFoundError:
+                pass
+        if evicted:
+            logger.info("docx_cache_evicted", count=evicted, entries=len(files), bytes=total)
+
+        self._entries = OrderedDict((key, size) for _, size, key in files)
+        self._total_bytes = total
+        self._loaded = True
+
+    @staticmethod
+    def make_key(title: str, content: str, images: list | None) -> str:
+        """计算缓存键（图片以路径、位置和文件修改时间标识，并包含渲染器版本和参考模板）"""
+        image_keys = []
+        for img in images or []:
+            path = img.get("path", "")
+            try:
+                mtime = os.path.getmtime(path) if path else 0
+            except OSError:
+                mtime = 0
+            image_keys.append([path, img.get("position", "end"), mtime])
+
+        payload = json.dumps(
+            {
+                "renderer": f"{settings.DOCX_RENDERER}:{RENDERER_VERSION}",
+                "reference": reference_fingerprint(),
+                "title": title or "",
+                "content": content or "",
+                "images": image_keys,
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def path_for(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.docx"
+
+    def get(self, key: str) -> str | None:
+        """
+        命中时返回文件路径并刷新访问时间
+
+        索引中没有的键再检查磁盘（可能由其他进程渲染），存在时纳入索引。
+        """
+        file_path = self.path_for(key)
+        try:
+            size = file_path.stat().st_size
+        except FileNotFoundError:
+            size = None
+        with self._lock:
+            self._ensure_loaded()
+            if size is None:
+                self._total_bytes -= self._entries.pop(key, 0)
+                return None
+            self._total_bytes += size - self._entries.pop(key, 0)
+            self._entries[key] = size
+        try:
+            os.utime(file_path)
+        except OSError:
+            pass
+        return str(file_path)
+
+    def put(self, key: str, doc) -> str:
+        """保存文档到缓存（先写临时文件再原子替换）"""
+        tmp_path = self.temp_path(key)
+        doc.save(tmp_path)
+        return self.adopt(key, tmp_path)
+
+    def temp_path(self, key: str) -> str:
+        """缓存目录内的临时文件路径（与缓存文件同盘，可原子替换）"""
+        return str(self.cache_dir / f".{key}.{uuid.uuid4().hex[:8]}.tmp")
+
+    def adopt(self, key: str, src_path: str) -> str:
+        """将已写好的文件纳入缓存"""
+        file_path = self.path_for(key)
+        os.replace(src_path, file_path)
+
+        with self._lock:
+            # 其他进程也在写入同一目录，按目录实际内容淘汰
+            self._sync()
+        return str(file_path)
+
+    def stats(self) -> dict:
+        """缓存目录的实际统计（包括其他进程写入的文件）"""
+        files = self._scan()
+        return {"entries": len(files), "bytes": sum(size for _, size, _ in files)}
+
+
+# 全局实例
+docx_cache = DocxCache(
+    settings.DOCX_CACHE_DIR,
+    max_bytes=settings.DOCX_CACHE_MAX_MB * 1024 * 1024,
+    max_entries=settings.DOCX_CACHE_MAX_ENTRIES,
+)
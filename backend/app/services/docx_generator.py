@@ -2,7 +2,7 @@
 DOCX 文件生成工具
 
 用于将 Markdown 格式的文章内容（含图片）转换为 Word 文档格式
-使用 pypandoc 处理 Markdown 格式转换
+默认使用进程内的原生渲染器，可通过 DOCX_RENDERER=pandoc 切换为 pypandoc 转换
 """
 
 import os
@@ -18,6 +18,10 @@ from docx.shared import Pt, Inches, Cm
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 from docx.oxml.ns import qn
 
+from app.core.config import settings
+from app.services.docx_cache import docx_cache
+from app.services.docx_renderer import get_reference_doc, markdown_docx_renderer
+
 logger = structlog.get_logger()
 
 
@@ -151,18 +155,6 @@ class DocxGenerator:
 
         return organized
 
-    def _count_content_paragraphs(self, content: str) -> int:
-        """统计 Markdown 内容中的段落数（排除标题和空行）"""
-        lines = content.split('\n')
-        count = 0
-        for line in lines:
-            line = line.strip()
-            # 跳过空行和标题
-            if not line or line.startswith('#'):
-                continue
-            count += 1
-        return count
-
     def _convert_md_to_docx(self, title: str, content: str) -> str:
         """
         使用 pypandoc 将 Markdown 转换为 DOCX
@@ -186,45 +178,33 @@ class DocxGenerator:
         temp_path = str(self.temp_dir / f"temp_{uuid.uuid4().hex[:8]}.docx")
 
         try:
-            # 使用 hard_line_breaks 扩展，让所有换行都被保留
+            # 使用 hard_line_breaks 扩展，让所有换行都被保留；字体由参考模板的样式提供
             pypandoc.convert_text(
                 full_md,
                 'docx',
                 format='markdown+hard_line_breaks',
                 outputfile=temp_path,
+                extra_args=[f"--reference-doc={get_reference_doc()}"],
             )
             return temp_path
         except Exception as e:
             logger.error("pypandoc_convert_failed", error=str(e))
             raise
 
-    def create_article_docx(
-        self,
-        title: str,
-        content: str,
-        images: list = None,
-        article_id: str = None,
-    ) -> str:
-        """
-        创建文章 DOCX 文件（含图片）
-
-        Args:
-            title: 文章标题
-            content: Markdown 格式的文章正文
-            images: 图片列表 [{"path": str, "position": str, "prompt": str}, ...]
-            article_id: 文章ID (用于文件名)
-
-        Returns:
-            str: DOCX 文件的完整路径
-        """
-        images = images or []
-
+    def _build_with_pandoc(self, title: str, content: str, images: list) -> Document:
+        """使用 pypandoc 转换后再插入图片（DOCX_RENDERER=pandoc 时使用）"""
         # 1. 使用 pypandoc 转换 Markdown 为 DOCX
         temp_docx_path = self._convert_md_to_docx(title, content)
 
         # 2. 打开生成的 DOCX
         doc = Document(temp_docx_path)
 
+        # 清理临时文件
+        try:
+            os.remove(temp_docx_path)
+        except:
+            pass
+
         # 3. 组织图片
         organized_images = self._organize_images_by_position(images)
 
@@ -266,39 +246,71 @@ class DocxGenerator:
         for img in organized_images["end"]:
             self._add_image_to_doc(doc, img["path"], width_inches=5.0)
 
-        # 8. 应用中文字体样式
-        for para in doc.paragraphs:
-            for run in para.runs:
-                if not para.style.name.startswith('Heading'):
-                    run.font.size = Pt(12)
-                    self._set_chinese_font(run, "宋体")
-                else:
-                    self._set_chinese_font(run, "黑体")
-
-        # 9. 生成最终文件名
-        if article_id:
-            filename = f"article_{article_id}.docx"
-        else:
-            filename = f"article_{uuid.uuid4().hex[:8]}.docx"
-
-        # 10. 保存最终文件
-        file_path = self.temp_dir / filename
-        doc.save(str(file_path))
+        return doc
 
-        # 清理临时文件
-        try:
-            os.remove(temp_docx_path)
-        except:
-            pass
+    def _build_document(self, title: str, content: str, images: list) -> Document:
+        """按 DOCX_RENDERER 配置构建文档对象"""
+        if settings.DOCX_RENDERER == "pandoc":
+            return self._build_with_pandoc(title, content, images)
+        # 单遍构建：解析 Markdown 的同时放置图片
+        return markdown_docx_renderer.render(
+            title, content, self._organize_images_by_position(images)
+        )
+
+    def render_cached(
+        self,
+        title: str,
+        content: str,
+        images: list = None,
+    ) -> tuple[str, str]:
+        """
+        渲染 DOCX（内容未变化时直接复用缓存文件）
+
+        Returns:
+            tuple: (DOCX 文件路径, 缓存键)，缓存键可直接用作 ETag
+        """
+        images = images or []
+        key = docx_cache.make_key(title, content, images)
+
+        cached_path = docx_cache.get(key)
+        if cached_path:
+            logger.info("docx_cache_hit", key=key[:12], title=(title or "")[:30])
+            return cached_path, key
+
+        doc = self._build_document(title, content, images)
+        file_path = docx_cache.put(key, doc)
 
         logger.info(
             "docx_created",
-            path=str(file_path),
-            title=title[:30],
+            path=file_path,
+            title=(title or "")[:30],
             image_count=len(images),
         )
+        return file_path, key
 
-        return str(file_path)
+    def create_article_docx(
+        self,
+        title: str,
+        content: str,
+        images: list = None,
+        article_id: str = None,
+    ) -> str:
+        """
+        创建文章 DOCX 文件（含图片）
+
+        生成的文件由渲染缓存统一管理，调用方不应删除
+
+        Args:
+            title: 文章标题
+            content: Markdown 格式的文章正文
+            images: 图片列表 [{"path": str, "position": str, "prompt": str}, ...]
+            article_id: 文章ID (仅用于日志)
+
+        Returns:
+            str: DOCX 文件的完整路径
+        """
+        file_path, _ = self.render_cached(title, content, images)
+        return file_path
 
     def create_preview_docx(
         self,
@@ -0,0 +1,279 @@
+"""
+DOCX 异步渲染服务
+
+将 DOCX 构建（Markdown 解析、图片嵌入、保存）放到独立进程池执行，避免阻塞事件循环；
+排队任务数超过上限时直接拒绝（503），相同内容的并发请求合并为一次渲染
+"""
+
+import asyncio
+import io
+import multiprocessing
+import os
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import structlog
+
+from app.core.config import settings
+from app.core.exceptions import AppException, ServiceBusyException
+from app.services.docx_cache import docx_cache
+
+logger = structlog.get_logger()
+
+
+def _render_to_file(title: str, content: str, images: list, out_path: str) -> str:
+    """在子进程中构建 DOCX 并写入指定路径"""
+    from app.services.docx_generator import docx_generator
+
+    doc = docx_generator._build_document(title, content, images)
+    doc.save(out_path)
+    return out_path
+
+
+def _render_to_bytes(title: str, content: str, images: list) -> bytes:
+    """在子进程中构建 DOCX 并序列化到内存"""
+    from app.services.docx_generator import docx_generator
+
+    buffer = io.BytesIO()
+    docx_generator._build_document(title, content, images).save(buffer)
+    return buffer.getvalue()
+
+
+class _RenderMetrics:
+    """渲染耗时与计数统计"""
+
+    def __init__(self, max_samples: int = 200):
+        self._durations: deque[float] = deque(maxlen=max_samples)
+        self.rendered = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.rejected = 0
+        self.failed = 0
+        self.cancelled = 0
+
+    def record(self, seconds: float):
+        self.rendered += 1
+        self._durations.append(seconds)
+
+    def percentile(self, q: float) -> float | None:
+        if not self._durations:
+            return None
+        ordered = sorted(self._durations)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+    def snapshot(self) -> dict:
+        avg = sum(self._durations) / len(self._durations) if self._durations else None
+        return {
+            "rendered": self.rendered,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "rejected": self.rejected,
+            "failed": self.failed,
+            "cancelled": self.cancelled,
+            "avg_ms": round(avg * 1000, 1) if avg is not None else None,
+            "p50_ms": self._ms(self.percentile(0.5)),
+            "p95_ms": self._ms(self.percentile(0.95)),
+        }
+
+    @staticmethod
+    def _ms(seconds: float | None) -> float | None:
+        return round(seconds * 1000, 1) if seconds is not None else None
+
+
+class DocxRenderService:
+    """DOCX 异步渲染服务"""
+
+    def __init__(self):
+        self._pool: ProcessPoolExecutor | None = None
+        self._inflight: dict[str, asyncio.Task] = {}  # 缓存键 -> 渲染中的任务
+        self._waiters: dict[str, int] = {}  # 缓存键 -> 等待该任务的调用方数量
+        self._pending = 0
+        self.metrics = _RenderMetrics()
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn：不继承父进程的事件循环和数据库连接
+            self._pool = ProcessPoolExecutor(
+                max_workers=settings.DOCX_RENDER_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+            logger.info("docx_render_pool_started", workers=settings.DOCX_RENDER_WORKERS)
+        return self._pool
+
+    async def render(
+        self,
+        title: str,
+        content: str,
+        images: list = None,
+    ) -> tuple[str, str]:
+        """
+        渲染 DOCX（优先复用缓存）
+
+        Returns:
+            tuple: (DOCX 文件路径, 缓存键)
+
+        Raises:
+            ServiceBusyException: 排队任务已满
+            AppException: 渲染失败或超时
+        """
+        images = images or []
+        key = docx_cache.make_key(title, content, images)
+
+        cached_path = docx_cache.get(key)
+        if cached_path:
+            self.metrics.cache_hits += 1
+            return cached_path, key
+
+        return await self._submit(key, self._render_file(key, title, content, images)), key
+
+    async def render_bytes(
+        self,
+        title: str,
+        content: str,
+        images: list = None,
+    ) -> tuple[bytes, str]:
+        """
+        渲染 DOCX 到内存（不写文件、不进入缓存，用于预览下载）
+
+        Returns:
+            tuple: (DOCX 内容, 缓存键)
+        """
+        images = images or []
+        key = docx_cache.make_key(title, content, images)
+        return await self._submit(f"bytes:{key}", self._render_bytes(key, title, content, images)), key
+
+    async def generate(self, title: str, content: str, images: list = None) -> str:
+        """渲染 DOCX 并返回文件路径"""
+        file_path, _ = await self.render(title, content, images)
+        return file_path
+
+    async def _submit(self, job_key: str, job):
+        """
+        提交渲染任务：相同任务合并等待，排队已满时拒绝
+
+        Raises:
+            ServiceBusyException: 排队任务已满
+        """
+        # 相同内容正在渲染时直接等待其结果
+        task = self._inflight.get(job_key)
+        if task is not None:
+            job.close()
+            self.metrics.coalesced += 1
+        else:
+            if self._pending >= settings.DOCX_RENDER_QUEUE_SIZE:
+                job.close()
+                self.metrics.rejected += 1
+                logger.warning("docx_render_rejected", pending=self._pending)
+                raise ServiceBusyException("文档渲染繁忙，请稍后重试")
+
+            self._pending += 1
+            task = asyncio.ensure_future(job)
+            self._inflight[job_key] = task
+            task.add_done_callback(lambda _: self._finish(job_key))
+
+        self._waiters[job_key] = self._waiters.get(job_key, 0) + 1
+        try:
+            return await asyncio.shield(task)
+        except asyncio.CancelledError:
+            # 最后一个等待者取消时一并取消渲染（尚未开始的任务会从进程池队列移除）
+            if self._waiters[job_key] == 1 and not task.done():
+                task.cancel()
+                self.metrics.cancelled += 1
+            raise
+        finally:
+            self._waiters[job_key] -= 1
+            if not self._waiters[job_key]:
+                del self._waiters[job_key]
+
+    def _finish(self, job_key: str):
+        """任务结束（含开始前被取消）时释放排队名额"""
+        self._inflight.pop(job_key, None)
+        self._pending -= 1
+
+    async def _execute(self, key: str, fn, *args):
+        """在进程池中执行渲染函数，统一处理超时、进程池损坏和耗时统计"""
+        loop = asyncio.get_running_loop()
+        started = time.monotonic()
+        try:
+            future = loop.run_in_executor(self._get_pool(), fn, *args)
+            result = await asyncio.wait_for(future, timeout=settings.DOCX_RENDER_TIMEOUT)
+        except asyncio.TimeoutError:
+            self.metrics.failed += 1
+            logger.error("docx_render_timeout", key=key[:12])
+            raise AppException("DOCX 文件生成超时")
+        except BrokenProcessPool:
+            # 子进程异常退出后重建进程池
+            self.metrics.failed += 1
+            self._pool = None
+            logger.error("docx_render_pool_broken", key=key[:12])
+            raise AppException("DOCX 文件生成失败")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self.metrics.failed += 1
+            logger.error("docx_render_failed", key=key[:12], error=str(e))
+            raise AppException("DOCX 文件生成失败")
+
+        self.metrics.record(time.monotonic() - started)
+        return result
+
+    async def _render_file(self, key: str, title: str, content: str, images: list) -> str:
+        out_path = docx_cache.temp_path(key)
+        started = time.monotonic()
+        try:
+            await self._execute(key, _render_to_file, title, content, images, out_path)
+        except BaseException:
+            self._discard(out_path)
+            raise
+
+        file_path = docx_cache.adopt(key, out_path)
+        logger.info(
+            "docx_rendered",
+            key=key[:12],
+            title=(title or "")[:30],
+            image_count=len(images),
+            elapsed_ms=round((time.monotonic() - started) * 1000, 1),
+        )
+        return file_path
+
+    async def _render_bytes(self, key: str, title: str, content: str, images: list) -> bytes:
+        started = time.monotonic()
+        data = await self._execute(key, _render_to_bytes, title, content, images)
+        logger.info(
+            "docx_rendered_in_memory",
+            key=key[:12],
+            size=len(data),
+            elapsed_ms=round((time.monotonic() - started) * 1000, 1),
+        )
+        return data
+
+    @staticmethod
+    def _discard(out_path: str):
+        """删除未完成的临时文件（子进程稍后才写完的残留由产物清理兜底）"""
+        try:
+            os.remove(out_path)
+        except OSError:
+            pass
+
+    def get_metrics(self) -> dict:
+        return {
+            "workers": settings.DOCX_RENDER_WORKERS,
+            "queue_size": settings.DOCX_RENDER_QUEUE_SIZE,
+            "pending": self._pending,
+            "inflight": len(self._inflight),
+            **self.metrics.snapshot(),
+            "cache": docx_cache.stats(),
+        }
+
+    def shutdown(self):
+        """关闭进程池（取消尚未开始的任务）"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("docx_render_pool_stopped")
+
+
+# 全局实例
+docx_render_service = DocxRenderService()
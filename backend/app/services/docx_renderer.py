@@ -0,0 +1,208 @@
+"""
+Markdown → DOCX 原生渲染器
+
+直接遍历提示词产出的 Markdown 子集（标题、段落、列表、引用、行内粗体/斜体/代码/链接），
+一次性构建 python-docx 文档，并在构建过程中按 cover / after_paragraph:N / end 放置图片。
+字体和字号定义在参考模板的样式中（正文宋体 12pt、标题黑体），run 不再逐个设置。
+"""
+
+import os
+import re
+import tempfile
+import uuid
+from pathlib import Path
+
+import structlog
+from docx import Document
+from docx.enum.text import WD_ALIGN_PARAGRAPH
+from docx.oxml.ns import qn
+from docx.shared import Pt, Inches
+
+from app.core.config import settings
+from app.models.article_document import ArticleDocument
+
+logger = structlog.get_logger()
+
+# 渲染结果变化时递增，使已有的 DOCX 缓存失效
+RENDERER_VERSION = "2"
+
+BODY_FONT = "宋体"
+BODY_SIZE = Pt(12)
+HEADING_FONT = "黑体"
+CODE_FONT = "Consolas"
+
+INLINE_RE = re.compile(
+    r"\*\*(?P<bold>.+?)\*\*"
+    r"|__(?P<bold2>.+?)__"
+    r"|\*(?P<italic>[^*\s](?:[^*]*?[^*\s])?)\*"
+    r"|`(?P<code>[^`]+)`"
+    r"|\[(?P<link>[^\]]+)\]\((?P<href>[^)]+)\)"
+)
+
+
+def _set_style_font(style, font_name: str, size: Pt | None = None):
+    """在样式上设置中西文字体（移除主题字体属性，否则会覆盖显式字体）"""
+    rFonts = style.element.get_or_add_rPr().get_or_add_rFonts()
+    for attr in ("w:asciiTheme", "w:hAnsiTheme", "w:eastAsiaTheme", "w:cstheme"):
+        rFonts.attrib.pop(qn(attr), None)
+    for attr in ("w:ascii", "w:hAnsi", "w:eastAsia"):
+        rFonts.set(qn(attr), font_name)
+    if size is not None:
+        style.font.size = size
+
+
+def apply_style_template(doc: Document) -> Document:
+    """将正文/标题字体写入文档样式，段落和 run 通过样式继承格式"""
+    styles = doc.styles
+    _set_style_font(styles["Normal"], BODY_FONT, BODY_SIZE)
+    for name in ["Title"] + [f"Heading {i}" for i in range(1, 10)]:
+        try:
+            _set_style_font(styles[name], HEADING_FONT)
+        except KeyError:
+            continue
+    return doc
+
+
+_reference_doc_path: str | None = None
+
+
+def get_reference_doc() -> str:
+    """
+    获取参考模板路径
+
+    配置了 DOCX_REFERENCE_DOC 时直接使用；否则按渲染器版本生成一次默认模板。
+    原生渲染器以它为底稿，pandoc 通过 --reference-doc 使用同一份样式。
+    """
+    global _reference_doc_path
+    if settings.DOCX_REFERENCE_DOC:
+        return settings.DOCX_REFERENCE_DOC
+    if _reference_doc_path and os.path.exists(_reference_doc_path):
+        return _reference_doc_path
+
+    path = Path(tempfile.gettempdir()) / f"toutiao_reference_v{RENDERER_VERSION}.docx"
+    if not path.exists():
+        # 先写临时文件再替换，多个渲染进程同时生成时互不影响
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex[:8]}")
+        apply_style_template(Document()).save(str(tmp_path))
+        os.replace(tmp_path, path)
+        logger.info("docx_reference_created", path=str(path))
+    _reference_doc_path = str(path)
+    return _reference_doc_path
+
+
+def reference_fingerprint() -> str:
+    """参考模板标识（用于缓存键，自定义模板修改后缓存失效）"""
+    if not settings.DOCX_REFERENCE_DOC:
+        return "default"
+    try:
+        mtime = os.path.getmtime(settings.DOCX_REFERENCE_DOC)
+    except OSError:
+        mtime = 0
+    return f"{settings.DOCX_REFERENCE_DOC}:{mtime}"
+
+
+def new_document() -> Document:
+    """以参考模板为底稿创建空文档（保留样式和页面设置，清空正文）"""
+    doc = Document(get_reference_doc())
+    body = doc.element.body
+    for child in list(body):
+        if child.tag != qn("w:sectPr"):
+            body.remove(child)
+    return doc
+
+
+class MarkdownDocxRenderer:
+    """Markdown 子集到 python-docx 文档的单遍渲染器"""
+
+    COVER_WIDTH = 5.5
+    IMAGE_WIDTH = 5.0
+
+    def _add_inline(self, para, text: str):
+        """按行内标记拆分为多个 run（字体由段落样式继承）"""
+        pos = 0
+        for match in INLINE_RE.finditer(text):
+            if match.start() > pos:
+                para.add_run(text[pos:match.start()])
+            if match.group("bold") or match.group("bold2"):
+                para.add_run(match.group("bold") or match.group("bold2")).bold = True
+            elif match.group("italic"):
+                para.add_run(match.group("italic")).italic = True
+            elif match.group("code"):
+                para.add_run(match.group("code")).font.name = CODE_FONT
+            else:
+                para.add_run(match.group("link"))
+            pos = match.end()
+        if pos < len(text):
+            para.add_run(text[pos:])
+
+    def _add_image(self, doc: Document, image_path: str, width_inches: float) -> bool:
+        """在文档末尾追加居中图片段落"""
+        try:
+            para = doc.add_paragraph()
+            para.alignment = WD_ALIGN_PARAGRAPH.CENTER
+            para.add_run().add_picture(image_path, width=Inches(width_inches))
+            return True
+        except Exception as e:
+            logger.error("add_image_failed", path=image_path, error=str(e))
+            return False
+
+    def _add_heading(self, doc: Document, text: str, level: int):
+        para = doc.add_heading(level=min(level, 9))
+        self._add_inline(para, text)
+
+    def render(self, title: str, content: str, organized_images: dict) -> Document:
+        """
+        渲染文档
+
+        Args:
+            title: 文章标题（为空时不输出标题，如微头条）
+            content: Markdown 正文
+            organized_images: DocxGenerator._organize_images_by_position 的结果
+
+        Returns:
+            Document: 构建完成的文档
+        """
+        doc = new_document()
+
+        if title:
+            self._add_heading(doc, title, 1)
+
+        for img in organized_images.get("cover", []):
+            self._add_image(doc, img["path"], self.COVER_WIDTH)
+
+        after_paragraph = organized_images.get("after_paragraph", {})
+        document = ArticleDocument.parse(content)
+
+        for block in document.blocks:
+            block_type = block["type"]
+            if block_type == "blank":
+                # 保留原文空行
+                doc.add_paragraph()
+                continue
+            if block_type == "heading":
+                self._add_heading(doc, block["text"], block["level"])
+                continue
+
+            if block_type == "bullet":
+                para = doc.add_paragraph(style="List Bullet")
+            elif block_type == "quote":
+                para = doc.add_paragraph(style="Quote")
+            else:
+                para = doc.add_paragraph()
+            self._add_inline(para, block["text"])
+
+            for img in after_paragraph.get(block["paragraph"], []):
+                self._add_image(doc, img["path"], self.IMAGE_WIDTH)
+
+        # 超出正文段落数的位置与结尾图片一起放在末尾
+        for para_num in sorted(n for n in after_paragraph if n > document.paragraph_count):
+            for img in after_paragraph[para_num]:
+                self._add_image(doc, img["path"], self.IMAGE_WIDTH)
+        for img in organized_images.get("end", []):
+            self._add_image(doc, img["path"], self.IMAGE_WIDTH)
+
+        return doc
+
+
+# 全局实例
+markdown_docx_renderer = MarkdownDocxRenderer()
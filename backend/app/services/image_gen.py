@@ -2,9 +2,11 @@
 
 import asyncio
 import base64
+import time
 import uuid
+from collections import deque
 from pathlib import Path
-from typing import List, Tuple
+from typing import AsyncIterator, List, Tuple
 import structlog
 import httpx
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -12,12 +14,65 @@ from sqlalchemy import select
 
 from app.models.ai_config import AIConfig, AIConfigType
 from app.core.config import settings
+from app.services.resource_pools import resource_pools
 
 logger = structlog.get_logger()
 
 # 图片存储根目录
 IMAGES_DIR = Path(settings.STATIC_DIR) / "images"
 
+# 截止时间已过时返回的错误信息
+DEADLINE_EXCEEDED_ERROR = "已超过图片生成截止时间"
+
+
+class _LatencyTracker:
+    """记录最近的生图请求耗时，用于估算 p95 决定何时发起对冲请求"""
+
+    def __init__(self, max_samples: int = 100):
+        self._samples: deque[float] = deque(maxlen=max_samples)
+
+    def record(self, seconds: float):
+        self._samples.append(seconds)
+
+    def p95(self) -> float | None:
+        if len(self._samples) < settings.IMAGE_HEDGE_MIN_SAMPLES:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+_latency = _LatencyTracker()
+
+
+def _hedge_delay() -> float | None:
+    """发起对冲请求前的等待时间（秒），None 表示不对冲"""
+    if not settings.IMAGE_HEDGE_ENABLED:
+        return None
+    p95 = _latency.p95()
+    return p95 if p95 is not None else float(settings.IMAGE_HEDGE_DEFAULT_DELAY)
+
+
+class ImageRenderConfig:
+    """
+    图片生成配置快照
+
+    只保存调用 API 所需的字段，与数据库会话解耦，
+    可以在并发渲染、调度器和后台任务中安全使用。
+    """
+
+    def __init__(self, api_url: str, api_key: str, model: str):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.model = model
+
+    @classmethod
+    def from_model(cls, config: AIConfig) -> "ImageRenderConfig":
+        return cls(
+            api_url=config.api_url,
+            api_key=config.api_key,
+            model=config.model,
+        )
+
 
 async def _get_image_config(db: AsyncSession) -> AIConfig | None:
     """从数据库获取图片生成配置"""
@@ -30,33 +85,43 @@ async def _get_image_config(db: AsyncSession) -> AIConfig | None:
     return config
 
 
-async def generate_image(
-    db: AsyncSession,
+async def get_render_config(db: AsyncSession) -> ImageRenderConfig | None:
+    """查询一次图片生成配置并转换为与会话无关的快照"""
+    config = await _get_image_config(db)
+    if not config:
+        return None
+    return ImageRenderConfig.from_model(config)
+
+
+async def render_image(
+    config: ImageRenderConfig,
     prompt: str,
     article_id: str,
     index: int = 0,
+    deadline: float | None = None,
 ) -> dict:
     """
-    生成单张图片
+    生成单张图片（不访问数据库）
 
     Args:
-        db: 数据库会话
+        config: 图片生成配置快照
         prompt: 图片描述
         article_id: 文章ID（用于目录组织）
         index: 图片序号
+        deadline: 截止时间（event loop 时钟），超过后直接跳过
 
     Returns:
-        dict: {"success": bool, "path": str, "url": str, "error": str}
+        dict: {"success": bool, "path": str, "url": str, "error": str, "skipped": bool}
     """
-    config = await _get_image_config(db)
-    if not config:
-        logger.info("image_gen_skipped_no_config", prompt=prompt[:50])
-        return {"success": False, "error": "未配置图片生成 API"}
-
     try:
         logger.info("image_gen_start", prompt=prompt[:100], model=config.model)
 
-        response_data = await _call_api(config, prompt)
+        # 进程内所有文章共享生图名额（每个 API 请求占用一个，见 _call_api_hedged）
+        response_data = await _call_api_hedged(config, prompt, deadline)
+
+        if response_data.get("deadline_exceeded"):
+            logger.warning("image_gen_deadline_exceeded", index=index, prompt=prompt[:50])
+            return {"success": False, "error": response_data["error"], "skipped": True}
 
         if response_data.get("error"):
             logger.error("image_gen_api_error", error=response_data["error"])
@@ -78,6 +143,119 @@ async def generate_image(
         return {"success": False, "error": str(e)}
 
 
+async def generate_image(
+    db: AsyncSession,
+    prompt: str,
+    article_id: str,
+    index: int = 0,
+) -> dict:
+    """
+    生成单张图片
+
+    Args:
+        db: 数据库会话
+        prompt: 图片描述
+        article_id: 文章ID（用于目录组织）
+        index: 图片序号
+
+    Returns:
+        dict: {"success": bool, "path": str, "url": str, "error": str}
+    """
+    config = await get_render_config(db)
+    if not config:
+        logger.info("image_gen_skipped_no_config", prompt=prompt[:50])
+        return {"success": False, "error": "未配置图片生成 API"}
+
+    return await render_image(config, prompt, article_id, index)
+
+
+async def iter_render_images(
+    config: ImageRenderConfig,
+    prompts: List[str],
+    article_id: str,
+    indices: List[int] | None = None,
+    max_concurrent: int = 3,
+    deadline: float | None = None,
+) -> AsyncIterator[dict]:
+    """
+    批量生成图片，按完成顺序逐张返回结果（不访问数据库）
+
+    调用方可以在每张图片完成后立即持久化，进程中途退出时已完成的图片不会丢失。
+
+    Args:
+        config: 图片生成配置快照
+        prompts: 图片描述列表
+        article_id: 文章ID
+        indices: 需要生成的序号（默认全部）
+        max_concurrent: 最大并发数
+        deadline: 整批截止时间（event loop 时钟），未完成的图片会被跳过
+
+    Yields:
+        dict: {"index": int, "success": bool, "path": str, "url": str, "error": str}
+    """
+    if indices is None:
+        indices = list(range(len(prompts)))
+
+    semaphore = asyncio.Semaphore(max_concurrent)
+
+    async def render_with_semaphore(index: int) -> dict:
+        async with semaphore:
+            result = await render_image(config, prompts[index], article_id, index, deadline)
+        return {"index": index, **result}
+
+    tasks = [asyncio.create_task(render_with_semaphore(i)) for i in indices]
+    try:
+        for future in asyncio.as_completed(tasks):
+            yield await future
+    finally:
+        # 调用方提前退出（取消/异常）时，停止剩余的生成请求
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def iter_generate_images(
+    db: AsyncSession,
+    prompts: List[str],
+    article_id: str,
+    indices: List[int] | None = None,
+    max_concurrent: int = 3,
+    deadline: float | None = None,
+) -> AsyncIterator[dict]:
+    """
+    批量生成图片，按完成顺序逐张返回结果
+
+    整批只查询一次配置，渲染过程中不再使用传入的数据库会话，
+    调用方可以在迭代期间放心地用该会话提交每张图片的结果。
+
+    Args:
+        db: 数据库会话（仅用于读取配置）
+        prompts: 图片描述列表
+        article_id: 文章ID
+        indices: 需要生成的序号（默认全部）
+        max_concurrent: 最大并发数
+        deadline: 整批截止时间（event loop 时钟），未完成的图片会被跳过
+
+    Yields:
+        dict: {"index": int, "success": bool, "path": str, "url": str, "error": str}
+    """
+    if indices is None:
+        indices = list(range(len(prompts)))
+
+    config = await get_render_config(db)
+    if not config:
+        logger.info("image_gen_skipped_no_config", count=len(indices))
+        for i in indices:
+            yield {"index": i, "success": False, "error": "未配置图片生成 API"}
+        return
+
+    async for result in iter_render_images(
+        config, prompts, article_id, indices=indices,
+        max_concurrent=max_concurrent, deadline=deadline,
+    ):
+        yield result
+
+
 async def generate_images(
     db: AsyncSession,
     prompts: List[str],
@@ -98,24 +276,11 @@ async def generate_images(
     """
     results = {"success_count": 0, "images": [], "errors": []}
 
-    # 限制并发数
-    semaphore = asyncio.Semaphore(max_concurrent)
-
-    async def gen_with_semaphore(prompt: str, index: int):
-        async with semaphore:
-            return await generate_image(db, prompt, article_id, index)
-
-    # 并发生成
-    tasks = [
-        gen_with_semaphore(prompt, i)
-        for i, prompt in enumerate(prompts)
-    ]
-    gen_results = await asyncio.gather(*tasks, return_exceptions=True)
-
-    for i, result in enumerate(gen_results):
-        if isinstance(result, Exception):
-            results["errors"].append({"index": i, "error": str(result)})
-        elif result.get("success"):
+    async for result in iter_generate_images(
+        db, prompts, article_id, max_concurrent=max_concurrent
+    ):
+        i = result["index"]
+        if result.get("success"):
             results["success_count"] += 1
             results["images"].append({
                 "index": i,
@@ -125,10 +290,81 @@ async def generate_images(
         else:
             results["errors"].append({"index": i, "error": result.get("error", "未知错误")})
 
+    results["images"].sort(key=lambda img: img["index"])
+    results["errors"].sort(key=lambda err: err["index"])
     return results
 
 
-async def _call_api(config: AIConfig, prompt: str) -> dict:
+async def _call_api_hedged(
+    config: ImageRenderConfig,
+    prompt: str,
+    deadline: float | None = None,
+) -> dict:
+    """
+    带截止时间和对冲请求的 API 调用
+
+    单次请求超时取 IMAGE_REQUEST_TIMEOUT 与剩余预算的较小值；
+    请求耗时超过近期 p95 时再发起一个相同请求，先成功的结果胜出，另一个被取消。
+    每个请求各占用一个 resource_pools.image 名额，直到请求真正结束（含取消）才释放；
+    对冲请求只在有空闲名额时发起，不排队，实际并发不超过 IMAGE_MAX_CONCURRENT。
+    """
+    loop = asyncio.get_running_loop()
+    pool = resource_pools.image
+
+    def time_left() -> float:
+        timeout = float(settings.IMAGE_REQUEST_TIMEOUT)
+        if deadline is not None:
+            timeout = min(timeout, deadline - loop.time())
+        return timeout
+
+    def start(request_timeout: float) -> asyncio.Task:
+        """发起一次请求（调用方已占用名额），任务结束时释放名额"""
+        task = asyncio.create_task(_call_api(config, prompt, request_timeout))
+        task.add_done_callback(lambda _: pool.release())
+        return task
+
+    await pool.take()
+    timeout = time_left()
+    if timeout <= 0:
+        pool.release()
+        return {"error": DEADLINE_EXCEEDED_ERROR, "deadline_exceeded": True}
+
+    pending = {start(timeout)}
+    try:
+        hedge_delay = _hedge_delay()
+        if hedge_delay is not None and hedge_delay < timeout:
+            done, _ = await asyncio.wait(pending, timeout=hedge_delay)
+            hedge_timeout = time_left()
+            if not done and hedge_timeout > 0:
+                if await pool.try_take():
+                    logger.info(
+                        "image_gen_hedge_start",
+                        prompt=prompt[:50],
+                        hedge_delay=round(hedge_delay, 1),
+                    )
+                    pending.add(start(hedge_timeout))
+                else:
+                    logger.info("image_gen_hedge_skipped_pool_full", prompt=prompt[:50])
+
+        result: dict = {"error": "未知错误"}
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            results = [task.result() for task in done]
+            for result in results:
+                if not result.get("error"):
+                    return result
+            result = results[-1]
+
+        # 全部失败：若是预算耗尽导致的超时，标记为截止跳过
+        if deadline is not None and result.get("timeout") and loop.time() >= deadline:
+            return {"error": DEADLINE_EXCEEDED_ERROR, "deadline_exceeded": True}
+        return result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def _call_api(config: ImageRenderConfig, prompt: str, timeout: float = 300.0) -> dict:
     """调用图片生成 API"""
     api_url = f"{config.api_url.rstrip('/')}/v1/responses"
     payload = {
@@ -145,9 +381,9 @@ async def _call_api(config: AIConfig, prompt: str) -> dict:
         "tools": [{"type": "image_generation"}]
     }
 
-    try:
-        async with httpx.AsyncClient(timeout=300.0) as client:
-            response = await client.post(
+    async def post() -> httpx.Response:
+        async with httpx.AsyncClient(timeout=timeout) as client:
+            return await client.post(
                 api_url,
                 json=payload,
                 headers={
@@ -155,11 +391,17 @@ async def _call_api(config: AIConfig, prompt: str) -> dict:
                     "Authorization": f"Bearer {config.api_key}"
                 }
             )
-            if response.status_code != 200:
-                return {"error": f"HTTP {response.status_code}: {response.text[:500]}"}
-            return response.json()
-    except httpx.TimeoutException:
-        return {"error": "请求超时（300秒）"}
+
+    started = time.monotonic()
+    try:
+        # httpx 的超时针对单个读写操作，这里再限制请求总时长
+        response = await asyncio.wait_for(post(), timeout=timeout)
+        if response.status_code != 200:
+            return {"error": f"HTTP {response.status_code}: {response.text[:500]}"}
+        _latency.record(time.monotonic() - started)
+        return response.json()
+    except (httpx.TimeoutException, asyncio.TimeoutError):
+        return {"error": f"请求超时（{int(timeout)}秒）", "timeout": True}
     except httpx.ConnectError:
         return {"error": f"无法连接到服务器 {config.api_url}"}
     except Exception as e:
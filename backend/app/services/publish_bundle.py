@@ -0,0 +1,274 @@
+"""
+发布包服务
+
+文章定稿（编辑阶段确认 / 自动模式完成）时预先构建发布所需的全部产物：
+缩放后的图片、基于缩放图片渲染的 DOCX、规范化后的标签，
+保存在 static/bundles/{article_id}/{fingerprint}/ 下并记录到 articles.publish_bundle。
+发布时只需校验指纹即可直接使用，不再在启动浏览器前渲染。
+"""
+
+import asyncio
+import hashlib
+import json
+import os
+import shutil
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+import structlog
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.models import Article, ArticleStatus
+from app.models.prompt import ContentType
+from app.services.docx_cache import docx_cache
+from app.services.docx_render_service import docx_render_service
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow 为可选依赖，未安装时图片原样复制
+    Image = None
+
+logger = structlog.get_logger()
+
+BUNDLES_DIR = Path(settings.STATIC_DIR) / "bundles"
+
+# 发布包结构或构建逻辑变化时递增，使已有发布包失效
+BUNDLE_VERSION = 1
+
+MAX_TAGS = 5
+
+
+def normalize_tags(raw_tags: list | None) -> list[str]:
+    """去除 # 前缀、去重并限制数量"""
+    tags = []
+    for tag in raw_tags or []:
+        if isinstance(tag, str):
+            clean_tag = tag.strip().lstrip("#").strip()
+            if clean_tag and clean_tag not in tags:
+                tags.append(clean_tag)
+    return tags[:MAX_TAGS]
+
+
+def _docx_title(article: Article) -> str:
+    """微头条没有标题"""
+    return "" if article.content_type == ContentType.WEITOUTIAO else article.title
+
+
+def _link_or_copy(src: str, dest: Path):
+    try:
+        os.link(src, dest)
+    except OSError:
+        shutil.copy2(src, dest)
+
+
+def _derive_image(src: str, dest_dir: Path, index: int) -> str:
+    """生成发布用图片：超过最大宽度时等比缩小，否则直接复用原图"""
+    suffix = Path(src).suffix or ".png"
+    if Image is not None:
+        try:
+            with Image.open(src) as img:
+                if img.width > settings.PUBLISH_IMAGE_MAX_WIDTH:
+                    height = round(img.height * settings.PUBLISH_IMAGE_MAX_WIDTH / img.width)
+                    resized = img.convert("RGB").resize(
+                        (settings.PUBLISH_IMAGE_MAX_WIDTH, height), Image.LANCZOS
+                    )
+                    dest = dest_dir / f"image_{index}.jpg"
+                    resized.save(dest, "JPEG", quality=settings.PUBLISH_IMAGE_QUALITY, optimize=True)
+                    return str(dest)
+        except Exception as e:
+            logger.warning("bundle_image_resize_failed", path=src, error=str(e))
+
+    dest = dest_dir / f"image_{index}{suffix}"
+    _link_or_copy(src, dest)
+    return str(dest)
+
+
+class PublishBundleService:
+    """发布包构建与读取"""
+
+    def __init__(self):
+        self._building: dict[str, asyncio.Task] = {}  # article_id:fingerprint -> 构建任务
+        self._background: set[asyncio.Task] = set()
+
+    def fingerprint(self, article: Article) -> str:
+        """发布包指纹：文章内容、图片、标签或渲染配置任一变化都会改变"""
+        payload = json.dumps(
+            {
+                "version": BUNDLE_VERSION,
+                "docx": docx_cache.make_key(_docx_title(article), article.content, article.images),
+                "tags": normalize_tags(article.tags),
+                "image_width": settings.PUBLISH_IMAGE_MAX_WIDTH,
+            },
+            sort_keys=True,
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:16]
+
+    def get_valid(self, article: Article) -> dict | None:
+        """返回与当前文章内容一致且文件完整的发布包"""
+        bundle = article.publish_bundle
+        if not bundle or bundle.get("fingerprint") != self.fingerprint(article):
+            return None
+        paths = [bundle.get("docx_path")] + [img.get("path") for img in bundle.get("images", [])]
+        if not all(path and os.path.exists(path) for path in paths):
+            return None
+        return bundle
+
+    async def ensure(self, db: AsyncSession, article: Article) -> dict:
+        """
+        获取可用的发布包（已过期或不存在时构建并写入文章）
+
+        只 flush 不提交，由调用方与其他修改一起提交。
+
+        Returns:
+            dict: {"version", "fingerprint", "docx_path", "images", "tags", "built_at"}
+        """
+        bundle = self.get_valid(article)
+        if bundle:
+            return bundle
+
+        task, started = self._start_build(article)
+        try:
+            bundle = await asyncio.shield(task)
+        except Exception:
+            if started:
+                raise
+            # 预取的构建失败时由发布方重新构建一次
+            task, _ = self._start_build(article)
+            bundle = await asyncio.shield(task)
+
+        article.publish_bundle = bundle
+        await db.flush()
+        return bundle
+
+    def prefetch(self, article: Article):
+        """在后台提前构建发布包（不写数据库），随后的 ensure 会直接复用该构建任务"""
+        if self.get_valid(article) is None:
+            self._start_build(article)
+
+    def _start_build(self, article: Article) -> tuple[asyncio.Task, bool]:
+        """
+        启动构建任务（同一文章同一内容的构建只会进行一次）
+
+        Returns:
+            tuple: (构建任务, 是否由本次调用新建)
+        """
+        fingerprint = self.fingerprint(article)
+        build_key = f"{article.id}:{fingerprint}"
+        task = self._building.get(build_key)
+        if task is not None:
+            return task, False
+
+        task = asyncio.ensure_future(
+            self.build(
+                article_id=str(article.id),
+                fingerprint=fingerprint,
+                title=_docx_title(article),
+                content=article.content,
+                images=list(article.images or []),
+                tags=normalize_tags(article.tags),
+            )
+        )
+        self._building[build_key] = task
+        task.add_done_callback(lambda t: self._on_build_done(build_key, t))
+        return task, True
+
+    def _on_build_done(self, build_key: str, task: asyncio.Task):
+        self._building.pop(build_key, None)
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("publish_bundle_build_failed", key=build_key, error=str(task.exception()))
+
+    async def build(
+        self,
+        article_id: str,
+        fingerprint: str,
+        title: str,
+        content: str,
+        images: list,
+        tags: list[str],
+    ) -> dict:
+        """
+        构建发布包（不依赖数据库会话）
+
+        每次构建使用独立的临时目录，其他进程同时构建同一指纹时互不干扰；
+        完成后整体改名为指纹目录，指纹目录已存在（其他进程先完成）时直接使用已有的发布包。
+        旧指纹的发布包可能仍在被其他进程发布使用，不在此删除，由产物清理按保留期回收。
+        """
+        article_dir = BUNDLES_DIR / article_id
+        bundle_dir = article_dir / fingerprint
+        tmp_dir = article_dir / f".{fingerprint}.{uuid.uuid4().hex[:8]}.tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        try:
+            derived = []
+            for index, img in enumerate(images):
+                src = img.get("path")
+                if not src or not os.path.exists(src):
+                    continue
+                path = await asyncio.to_thread(_derive_image, src, tmp_dir, index)
+                derived.append({**img, "path": str(bundle_dir / Path(path).name), "source": src})
+
+            # 以缩放后的图片渲染 DOCX（先用临时目录中的路径，完成后整体改名）
+            render_images = [
+                {**img, "path": str(tmp_dir / Path(img["path"]).name)} for img in derived
+            ]
+            docx_path = await docx_render_service.generate(title, content, render_images)
+            await asyncio.to_thread(_link_or_copy, docx_path, tmp_dir / "article.docx")
+
+            if bundle_dir.exists():
+                # 相同指纹内容相同，保留先完成的发布包（可能已在使用中）；
+                # 更新修改时间，避免被产物清理当作过期的旧指纹回收
+                os.utime(bundle_dir)
+                await asyncio.to_thread(shutil.rmtree, tmp_dir, True)
+            else:
+                try:
+                    os.replace(tmp_dir, bundle_dir)
+                except OSError:
+                    # 改名前被其他进程抢先（目标目录非空）
+                    if not bundle_dir.exists():
+                        raise
+                    await asyncio.to_thread(shutil.rmtree, tmp_dir, True)
+        except BaseException:
+            await asyncio.to_thread(shutil.rmtree, tmp_dir, True)
+            raise
+
+        logger.info(
+            "publish_bundle_built",
+            article_id=article_id,
+            fingerprint=fingerprint,
+            image_count=len(derived),
+        )
+        return {
+            "version": BUNDLE_VERSION,
+            "fingerprint": fingerprint,
+            "docx_path": str(bundle_dir / "article.docx"),
+            "images": derived,
+            "tags": tags,
+            "built_at": datetime.utcnow().isoformat(),
+        }
+
+    def schedule(self, article_id: str):
+        """在后台为文章构建发布包（使用独立会话）"""
+        task = asyncio.create_task(self._build_in_background(article_id))
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _build_in_background(self, article_id: str):
+        try:
+            async with AsyncSessionLocal() as db:
+                article = await db.get(Article, article_id)
+                if article and article.status == ArticleStatus.DRAFT:
+                    await self.ensure(db, article)
+                    await db.commit()
+        except Exception as e:
+            logger.error("publish_bundle_background_failed", article_id=article_id, error=str(e))
+
+    async def remove(self, article_id: str):
+        """删除文章的全部发布包"""
+        await asyncio.to_thread(shutil.rmtree, BUNDLES_DIR / article_id, True)
+
+
+# 全局实例
+publish_bundle_service = PublishBundleService()
@@ -12,11 +12,13 @@ import httpx
 
 from app.core.config import settings
 from app.core.exceptions import PublishException
+from app.models.article_document import ArticleDocument
+from app.services.resource_pools import resource_pools
 
 logger = structlog.get_logger()
 
-# 线程池用于运行同步 Patchright
-_executor = ThreadPoolExecutor(max_workers=2)
+# 线程池用于运行同步 Patchright（会话数由 resource_pools.browser 控制）
+_executor = ThreadPoolExecutor(max_workers=settings.BROWSER_MAX_SESSIONS)
 
 
 def _parse_headless(value: str) -> str | bool:
@@ -530,13 +532,12 @@ class PublisherService:
                 logger.info("filling_content", content_length=len(content))
                 editor = page.locator('[contenteditable="true"]').first
                 editor.click()
-                paragraphs = content.split("\n")
-                for i, para in enumerate(paragraphs):
-                    if para.strip():
-                        page.keyboard.insert_text(para)
-                        if i < len(paragraphs) - 1:
-                            page.keyboard.press("Enter")
-                            time.sleep(0.1)
+                lines = ArticleDocument.parse(content).nonblank_lines()
+                for i, line in enumerate(lines):
+                    page.keyboard.insert_text(line)
+                    if i < len(lines) - 1:
+                        page.keyboard.press("Enter")
+                        time.sleep(0.1)
 
                 time.sleep(2)
 
@@ -602,17 +603,23 @@ class PublisherService:
                 browser.close()
                 logger.info("browser_closed")
 
+    async def _run_in_browser(self, account_id, fn, *args) -> dict:
+        """占用浏览器会话名额（全局 + 账号）后在线程池中运行同步发布流程"""
+        async with resource_pools.browser.acquire(str(account_id) if account_id else None):
+            loop = asyncio.get_event_loop()
+            return await loop.run_in_executor(_executor, fn, *args)
+
     async def publish_to_toutiao_via_docx(
         self,
         docx_path: str,
         cookies: List[dict],
         tags: Optional[List[str]] = None,
+        account_id=None,
     ) -> dict:
         """通过 DOCX 发布（异步包装）"""
         logger.info("publish_to_toutiao_via_docx_start", docx_path=docx_path, tag_count=len(tags) if tags else 0)
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            _executor,
+        return await self._run_in_browser(
+            account_id,
             self._run_sync_publish,
             docx_path,
             cookies,
@@ -627,8 +634,9 @@ class PublisherService:
         images: Optional[List[str]] = None,
         docx_path: Optional[str] = None,
         tags: Optional[List[str]] = None,
+        account_id=None,
     ) -> dict:
-        """发布到头条号（文章）"""
+        """发布到头条号（文章），account_id 用于限制同一账号的并发浏览器会话"""
         logger.info(
             "publish_to_toutiao_start",
             title_length=len(title) if title else 0,
@@ -638,11 +646,10 @@ class PublisherService:
             tag_count=len(tags) if tags else 0,
         )
         if docx_path and os.path.exists(docx_path):
-            return await self.publish_to_toutiao_via_docx(docx_path, cookies, tags)
+            return await self.publish_to_toutiao_via_docx(docx_path, cookies, tags, account_id)
 
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            _executor,
+        return await self._run_in_browser(
+            account_id,
             self._run_sync_publish_form,
             title,
             content,
@@ -803,13 +810,12 @@ class PublisherService:
                     editor.click()
                     time.sleep(0.5)
 
-                    paragraphs = content.split("\n")
-                    for i, para in enumerate(paragraphs):
-                        if para.strip():
-                            page.keyboard.insert_text(para)
-                            if i < len(paragraphs) - 1:
-                                page.keyboard.press("Enter")
-                                time.sleep(0.1)
+                    lines = ArticleDocument.parse(content).nonblank_lines()
+                    for i, line in enumerate(lines):
+                        page.keyboard.insert_text(line)
+                        if i < len(lines) - 1:
+                            page.keyboard.press("Enter")
+                            time.sleep(0.1)
 
                     logger.info("weitoutiao_content_filled")
                     time.sleep(2)
@@ -927,8 +933,9 @@ class PublisherService:
         images: Optional[List[str]] = None,
         docx_path: Optional[str] = None,
         tags: Optional[List[str]] = None,
+        account_id=None,
     ) -> dict:
-        """发布微头条（异步包装）"""
+        """发布微头条（异步包装），account_id 用于限制同一账号的并发浏览器会话"""
         logger.info(
             "publish_weitoutiao_start",
             content_length=len(content) if content else 0,
@@ -936,9 +943,8 @@ class PublisherService:
             image_count=len(images) if images else 0,
             tag_count=len(tags) if tags else 0,
         )
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(
-            _executor,
+        return await self._run_in_browser(
+            account_id,
             self._run_sync_publish_weitoutiao,
             content,
             cookies,
@@ -0,0 +1,144 @@
+"""
+资源池 - 按资源类型限制并发
+
+队列任务不再整体占用一个并发槽位，而是在每个步骤只申请该步骤需要的资源：
+LLM 调用、图片生成、浏览器会话（全局上限 + 每个账号上限）。
+这样生成类任务与发布类任务互不阻塞，可以重叠执行。
+DOCX 渲染由 DocxRenderService 的进程池与排队上限控制。
+"""
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Hashable
+
+from app.core.config import settings
+
+
+class ResourcePool:
+    """容量固定的资源池，记录占用、排队和等待耗时"""
+
+    def __init__(self, name: str, capacity: int):
+        self.name = name
+        self.capacity = max(1, capacity)
+        self._semaphore = asyncio.Semaphore(self.capacity)
+        self.in_use = 0
+        self.waiting = 0
+        self.acquired = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[None]:
+        await self.take()
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def take(self):
+        """占用一个名额（名额用完时排队等待），用完后调用 release()"""
+        started = time.monotonic()
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        self._on_taken(time.monotonic() - started)
+
+    async def try_take(self) -> bool:
+        """有空闲名额且无人排队时立即占用并返回 True，否则不等待直接返回 False"""
+        if self._semaphore.locked():
+            return False
+        # 未锁定时 acquire 立即返回，不会让出事件循环
+        await self._semaphore.acquire()
+        self._on_taken(0.0)
+        return True
+
+    def release(self):
+        self.in_use -= 1
+        self._semaphore.release()
+
+    def _on_taken(self, waited: float):
+        self.acquired += 1
+        self._wait_total += waited
+        self._wait_max = max(self._wait_max, waited)
+        self.in_use += 1
+
+    @property
+    def idle(self) -> bool:
+        return self.in_use == 0 and self.waiting == 0
+
+    def stats(self) -> dict:
+        return {
+            "capacity": self.capacity,
+            "in_use": self.in_use,
+            "waiting": self.waiting,
+            "acquired": self.acquired,
+            "avg_wait_ms": round(self._wait_total / self.acquired * 1000, 1) if self.acquired else 0,
+            "max_wait_ms": round(self._wait_max * 1000, 1),
+        }
+
+
+class KeyedResourcePool:
+    """
+    分键资源池：全局容量 + 每个键的容量
+
+    先占用键（如账号）的名额再占用全局名额，
+    同一账号排队时不会占着全局名额让其他账号等待。
+    """
+
+    def __init__(self, name: str, capacity: int, per_key: int):
+        self.name = name
+        self.per_key = max(1, per_key)
+        self.total = ResourcePool(name, capacity)
+        self._keys: dict[Hashable, ResourcePool] = {}
+
+    @asynccontextmanager
+    async def acquire(self, key: Hashable | None = None) -> AsyncIterator[None]:
+        if key is None:
+            async with self.total.acquire():
+                yield
+            return
+
+        pool = self._keys.get(key)
+        if pool is None:
+            pool = self._keys[key] = ResourcePool(f"{self.name}:{key}", self.per_key)
+        try:
+            async with pool.acquire():
+                async with self.total.acquire():
+                    yield
+        finally:
+            if pool.idle and self._keys.get(key) is pool:
+                del self._keys[key]
+
+    def stats(self) -> dict:
+        return {
+            **self.total.stats(),
+            "per_key": self.per_key,
+            "keys": {str(key): pool.stats() for key, pool in self._keys.items()},
+        }
+
+
+class ResourcePools:
+    """进程内资源池集合"""
+
+    def __init__(self):
+        self.llm = ResourcePool("llm", settings.LLM_MAX_CONCURRENT)
+        self.image = ResourcePool("image", settings.IMAGE_MAX_CONCURRENT)
+        self.browser = KeyedResourcePool(
+            "browser",
+            settings.BROWSER_MAX_SESSIONS,
+            settings.BROWSER_SESSIONS_PER_ACCOUNT,
+        )
+
+    def stats(self) -> dict:
+        return {
+            "llm": self.llm.stats(),
+            "image": self.image.stats(),
+            "browser": self.browser.stats(),
+        }
+
+
+# 全局实例
+resource_pools = ResourcePools()
@@ -2,5 +2,15 @@
 
 from app.services.scheduler.service import SchedulerService, scheduler_service
 from app.services.scheduler.executor import TaskExecutor
+from app.services.scheduler.queue import TaskQueue, task_queue
+from app.services.scheduler.leader import SchedulerLeader, scheduler_leader
 
-__all__ = ["SchedulerService", "scheduler_service", "TaskExecutor"]
+__all__ = [
+    "SchedulerService",
+    "scheduler_service",
+    "TaskExecutor",
+    "TaskQueue",
+    "task_queue",
+    "SchedulerLeader",
+    "scheduler_leader",
+]
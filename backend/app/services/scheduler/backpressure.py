@@ -0,0 +1,148 @@
+"""
+草稿积压背压 - 生成任务的就绪草稿上限
+
+生成任务（GENERATE）执行前检查同内容类型、同账号（含未分配账号）的就绪草稿数，
+达到上限时跳过本次生成并记录原因，避免为无人发布的草稿消耗 LLM 与生图额度。
+就绪草稿数按 (内容类型, 账号) 分组缓存 DRAFT_COUNT_CACHE_TTL 秒，
+缓存期内本进程新生成的草稿直接累加，不必每次执行都查询文章表。
+"""
+
+import asyncio
+import time
+from datetime import date, datetime, timedelta
+from uuid import UUID
+import structlog
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import Article, ArticleStatus, ScheduledTask, Task
+from app.models.prompt import ContentType
+
+logger = structlog.get_logger()
+
+# 就绪草稿：有内容、未发布、不是生成并发布任务的库存稿件（与发布任务的选取条件一致）
+READY_DRAFT_FILTER = (
+    Article.status == ArticleStatus.DRAFT,
+    Article.content != "",
+    Article.inventory == False,
+)
+
+
+class DraftBackpressure:
+    """生成任务背压"""
+
+    def __init__(self):
+        self._counts: dict[tuple[ContentType, UUID | None], int] = {}
+        self._loaded_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    def _fresh(self) -> bool:
+        return self._loaded_at is not None and time.monotonic() - self._loaded_at < settings.DRAFT_COUNT_CACHE_TTL
+
+    async def _refresh(self, db: AsyncSession):
+        if self._fresh():
+            return
+        async with self._lock:
+            if self._fresh():
+                return
+            result = await db.execute(
+                select(Article.content_type, Article.account_id, func.count(Article.id))
+                .where(*READY_DRAFT_FILTER)
+                .group_by(Article.content_type, Article.account_id)
+            )
+            self._counts = {(content_type, account_id): count for content_type, account_id, count in result.all()}
+            self._loaded_at = time.monotonic()
+
+    async def ready_count(self, db: AsyncSession, content_type: ContentType, account_id: UUID | None) -> int:
+        """就绪草稿数：指定账号时为该账号与未分配账号的草稿，否则为该内容类型的全部草稿"""
+        await self._refresh(db)
+        if account_id is None:
+            return sum(count for (ct, _), count in self._counts.items() if ct == content_type)
+        return self._counts.get((content_type, None), 0) + self._counts.get((content_type, account_id), 0)
+
+    def ceiling(self, scheduled_task: ScheduledTask) -> int:
+        """任务的就绪草稿上限（未单独设置时使用 GENERATE_DRAFT_CEILING，0 表示不限制）"""
+        return scheduled_task.draft_ceiling or settings.GENERATE_DRAFT_CEILING
+
+    async def check(self, db: AsyncSession, scheduled_task: ScheduledTask) -> str | None:
+        """
+        检查生成任务是否应跳过
+
+        Returns:
+            str | None: 跳过原因，未达上限时返回 None
+        """
+        ceiling = self.ceiling(scheduled_task)
+        if ceiling <= 0:
+            return None
+
+        ready = await self.ready_count(db, scheduled_task.content_type, scheduled_task.account_id)
+        if ready < ceiling:
+            return None
+
+        logger.info(
+            "generate_backpressure_skip",
+            task_id=str(scheduled_task.id),
+            content_type=scheduled_task.content_type.value,
+            ready=ready,
+            ceiling=ceiling,
+        )
+        return f"就绪草稿已有 {ready} 篇（上限 {ceiling}），跳过本次生成"
+
+    def record_generated(self, content_type: ContentType, account_id: UUID | None = None):
+        """本进程新生成一篇草稿，累加到缓存计数"""
+        key = (content_type, account_id)
+        self._counts[key] = self._counts.get(key, 0) + 1
+
+    async def get_throughput(self, db: AsyncSession, days: int = 7) -> dict:
+        """近 days 天（本地日期）每日生成、发布、背压跳过的数量，以及当前就绪草稿数"""
+        utc_offset = timedelta(minutes=round((datetime.now() - datetime.utcnow()).total_seconds() / 60))
+        today = datetime.now().date()
+        first_day = today - timedelta(days=days - 1)
+        since = datetime.combine(first_day, datetime.min.time()) - utc_offset
+
+        async def per_day(column, *conditions) -> dict[date, int]:
+            day = func.date(column + utc_offset)
+            result = await db.execute(
+                select(day, func.count()).where(column >= since, *conditions).group_by(day)
+            )
+            return dict(result.all())
+
+        generated = await per_day(Article.created_at, Article.inventory == False)
+        published = await per_day(Article.published_at)
+        skipped = await per_day(Task.completed_at, Task.payload.has_key("skipped"))
+
+        series = []
+        for offset in range(days):
+            day = first_day + timedelta(days=offset)
+            series.append({
+                "date": day.isoformat(),
+                "generated": generated.get(day, 0),
+                "published": published.get(day, 0),
+                "skipped": skipped.get(day, 0),
+            })
+
+        result = await db.execute(
+            select(Article.content_type, func.count(Article.id))
+            .where(*READY_DRAFT_FILTER)
+            .group_by(Article.content_type)
+        )
+        ready = {content_type.value: count for content_type, count in result.all()}
+
+        total_generated = sum(d["generated"] for d in series)
+        total_published = sum(d["published"] for d in series)
+        return {
+            "days": series,
+            "totals": {
+                "generated": total_generated,
+                "published": total_published,
+                "skipped": sum(d["skipped"] for d in series),
+                "backlog_growth": total_generated - total_published,
+            },
+            "ready": ready,
+            "default_ceiling": settings.GENERATE_DRAFT_CEILING,
+        }
+
+
+# 全局实例
+draft_backpressure = DraftBackpressure()
@@ -1,6 +1,7 @@
 """任务执行器"""
 
 import random
+from contextlib import nullcontext
 from datetime import datetime
 from uuid import UUID
 import structlog
@@ -18,11 +19,14 @@ from app.models import (
     Task,
     TaskType,
     TaskStatus,
-    Account,
-    AccountStatus,
 )
 from app.models.workflow_session import WorkflowMode
+from app.models.workflow_config import WorkflowConfig
 from app.services.workflow import workflow_engine
+from app.services.scheduler.handle import ExecutionHandle
+from app.services.scheduler.backpressure import draft_backpressure
+from app.core.config import settings
+from app.core.exceptions import AccountUnavailableException, TaskInterruptedException, TaskSkippedException
 
 logger = structlog.get_logger()
 
@@ -30,16 +34,27 @@ logger = structlog.get_logger()
 class TaskExecutor:
     """任务执行器"""
 
-    async def execute(self, db: AsyncSession, scheduled_task: ScheduledTask) -> bool:
+    async def execute(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        job: Task | None = None,
+        handle: ExecutionHandle | None = None,
+    ) -> bool:
         """
         执行定时任务
 
         Args:
             db: 数据库会话
             scheduled_task: 定时任务
+            job: 队列中领取到的任务记录（作为本次执行记录使用，重试时据此续跑）
+            handle: 执行句柄，收到取消或停机请求时在检查点抛出 TaskInterruptedException
 
         Returns:
             bool: 是否成功
+
+        Raises:
+            TaskSkippedException: 生成任务的就绪草稿已达上限，跳过本次执行
         """
         logger.info(
             "scheduled_task_execute_start",
@@ -48,13 +63,23 @@ class TaskExecutor:
             task_type=scheduled_task.type.value,
         )
 
+        if job is not None and (job.payload or {}).get("inventory"):
+            return await self._execute_inventory(db, scheduled_task, job, handle)
+
+        # 背压：草稿积压时不再生成
+        if scheduled_task.type == ScheduledTaskType.GENERATE:
+            reason = await draft_backpressure.check(db, scheduled_task)
+            if reason:
+                raise TaskSkippedException(reason)
+
         try:
             if scheduled_task.type == ScheduledTaskType.GENERATE:
-                result = await self._execute_generate(db, scheduled_task)
+                result = await self._execute_generate(db, scheduled_task, job, handle=handle)
+                draft_backpressure.record_generated(scheduled_task.content_type)
             elif scheduled_task.type == ScheduledTaskType.PUBLISH:
-                result = await self._execute_publish(db, scheduled_task)
+                result = await self._execute_publish(db, scheduled_task, job, handle)
             elif scheduled_task.type == ScheduledTaskType.GENERATE_AND_PUBLISH:
-                result = await self._execute_generate_and_publish(db, scheduled_task)
+                result = await self._execute_generate_and_publish(db, scheduled_task, job, handle)
             else:
                 raise ValueError(f"未知任务类型: {scheduled_task.type}")
 
@@ -71,6 +96,9 @@ class TaskExecutor:
             )
             return True
 
+        except TaskInterruptedException:
+            raise
+
         except Exception as e:
             scheduled_task.last_error = str(e)
             scheduled_task.last_run_at = datetime.utcnow()
@@ -84,45 +112,95 @@ class TaskExecutor:
             )
             return False
 
-    async def _execute_generate(
-        self, db: AsyncSession, scheduled_task: ScheduledTask
-    ) -> dict:
-        """执行生成任务"""
-        # 获取话题
-        topic = self._get_topic(scheduled_task)
+    async def _start_log(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        task_type: TaskType,
+        job: Task | None = None,
+        article_id: UUID | None = None,
+    ) -> Task:
+        """获取执行记录：队列任务直接复用，否则新建"""
+        if job is not None:
+            return job
 
-        # 创建执行记录
         task_log = Task(
-            type=TaskType.SCHEDULED_GENERATE,
+            type=task_type,
             status=TaskStatus.RUNNING,
             scheduled_task_id=scheduled_task.id,
+            article_id=article_id,
             account_id=scheduled_task.account_id,
             started_at=datetime.utcnow(),
         )
         db.add(task_log)
         await db.flush()
-
+        return task_log
+
+    async def _execute_inventory(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        job: Task,
+        handle: ExecutionHandle | None = None,
+    ) -> bool:
+        """生成一篇库存稿件（不更新定时任务的执行统计）"""
         try:
-            # 创建工作流会话
-            session_result = await workflow_engine.create_session(
-                db=db,
-                mode=WorkflowMode.AUTO,
-                content_type=scheduled_task.content_type,
-                custom_topic=topic,
+            await self._execute_generate(
+                db, scheduled_task, job, allow_publish=False, inventory=True, handle=handle
             )
 
-            # 执行全自动流程
-            result = await workflow_engine.execute_auto(
-                db=db,
-                session_id=UUID(session_result["session_id"]),
+            logger.info(
+                "inventory_draft_ready",
+                task_id=str(scheduled_task.id),
+                article_id=str(job.article_id),
             )
+            return True
 
-            if result.get("success"):
-                task_log.status = TaskStatus.COMPLETED
-                task_log.article_id = UUID(result["article_id"])
-            else:
-                task_log.status = TaskStatus.FAILED
-                task_log.error_message = result.get("error", "未知错误")
+        except TaskInterruptedException:
+            raise
+
+        except Exception as e:
+            logger.error(
+                "inventory_generate_failed",
+                task_id=str(scheduled_task.id),
+                error=str(e),
+            )
+            return False
+
+    async def _execute_generate(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        job: Task | None = None,
+        allow_publish: bool = True,
+        inventory: bool = False,
+        handle: ExecutionHandle | None = None,
+    ) -> dict:
+        """
+        执行生成任务
+
+        工作流配置开启自动发布时，生成后通过 _publish_article 发布（不在工作流内发布），
+        与定时发布一样标记发布中、不可打断，中断后不会重复发布。
+        inventory 为 True 时文章标记为库存稿件，与执行记录的完成状态在同一事务中提交，
+        补库存统计不会看到「任务已完成但稿件尚未入库」的中间状态而重复补单。
+        """
+        # 创建执行记录
+        task_log = await self._start_log(db, scheduled_task, TaskType.SCHEDULED_GENERATE, job)
+
+        try:
+            task_log.article_id = await self._run_workflow(
+                db, scheduled_task, task_log, allow_publish=False, handle=handle
+            )
+            if inventory:
+                article = await db.get(Article, task_log.article_id)
+                article.inventory = True
+                article.account_id = scheduled_task.account_id
+            if allow_publish and await self._auto_publish_enabled(db, scheduled_task):
+                await self._auto_publish(db, scheduled_task, task_log, handle)
+            task_log.status = TaskStatus.COMPLETED
+
+        except TaskInterruptedException:
+            raise
 
         except Exception as e:
             task_log.status = TaskStatus.FAILED
@@ -134,26 +212,116 @@ class TaskExecutor:
 
         return {"article_id": str(task_log.article_id) if task_log.article_id else None}
 
+    async def _auto_publish_enabled(self, db: AsyncSession, scheduled_task: ScheduledTask) -> bool:
+        return bool(await db.scalar(
+            select(WorkflowConfig.enable_auto_publish).where(
+                WorkflowConfig.content_type == scheduled_task.content_type
+            )
+        ))
+
+    async def _auto_publish(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        task_log: Task,
+        handle: ExecutionHandle | None = None,
+    ):
+        """生成任务的自动发布（发布失败或无可用账号不影响生成结果，文章留待手动发布）"""
+        article = await db.get(Article, task_log.article_id)
+        if handle:
+            handle.checkpoint("publish")
+        if article.status == ArticleStatus.PUBLISHING:
+            await self._fail_interrupted_publish(db, article, task_log)
+        if article.status == ArticleStatus.PUBLISHED:
+            return
+
+        try:
+            await self._publish_article(db, scheduled_task, article, task_log, handle)
+        except AccountUnavailableException:
+            pass  # _publish_article 已记录原因
+
+    async def _run_workflow(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        task_log: Task,
+        allow_publish: bool = True,
+        handle: ExecutionHandle | None = None,
+    ) -> UUID:
+        """
+        全自动生成一篇文章，返回文章 ID
+
+        工作流会话 ID 作为检查点记录在执行记录的 payload 中，
+        中断或失败后再次执行时续跑同一会话，已完成的阶段不再重复调用模型。
+        """
+        payload = task_log.payload or {}
+        if payload.get("session_id"):
+            session_id = UUID(payload["session_id"])
+        else:
+            session_result = await workflow_engine.create_session(
+                db=db,
+                mode=WorkflowMode.AUTO,
+                content_type=scheduled_task.content_type,
+                custom_topic=self._get_topic(scheduled_task),
+            )
+            session_id = UUID(session_result["session_id"])
+            task_log.payload = {**payload, "session_id": str(session_id)}
+            await db.commit()
+
+        result = await workflow_engine.execute_auto(
+            db=db,
+            session_id=session_id,
+            allow_publish=allow_publish,
+            checkpoint=handle.checkpoint if handle else None,
+        )
+        if not result.get("success"):
+            raise Exception(result.get("error", "生成文章失败"))
+        return UUID(result["article_id"])
+
+    async def _fail_interrupted_publish(self, db: AsyncSession, article: Article, task_log: Task):
+        """
+        文章停留在发布中：上次发布在浏览器操作期间被中断（进程被强制结束），发布结果未知
+
+        标记为失败并不再自动重试，避免重复发布。
+        """
+        message = "上次发布被中断，发布结果未知，请在头条后台确认后手动重新发布"
+        article.status = ArticleStatus.FAILED
+        article.error_message = message
+        task_log.retry_count = settings.SCHEDULER_RETRY_COUNT
+        await db.commit()
+        raise Exception(message)
+
     async def _execute_publish(
-        self, db: AsyncSession, scheduled_task: ScheduledTask
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        job: Task | None = None,
+        handle: ExecutionHandle | None = None,
     ) -> dict:
-        """执行发布任务"""
-        from app.services.publisher import publisher
-        from app.services.docx_generator import docx_generator
-
-        # 获取账号
-        if not scheduled_task.account_id:
-            raise ValueError("未配置发布账号")
+        """
+        执行发布任务
 
-        account = await db.get(Account, scheduled_task.account_id)
-        if not account or account.status != AccountStatus.ACTIVE:
-            raise ValueError("发布账号不可用")
+        队列任务带 article_id 时（重试单篇发布失败的记录）只发布该文章，
+        否则按发布模式查询草稿批量发布，每篇文章单独记录。
+        """
+        from app.services.publish_bundle import publish_bundle_service
+
+        if job is not None and job.article_id:
+            article = await db.get(Article, job.article_id)
+            if not article or article.status == ArticleStatus.PUBLISHED:
+                return {"published_count": 0, "total_count": 0}
+            if article.status == ArticleStatus.PUBLISHING:
+                await self._fail_interrupted_publish(db, article, job)
+            if not await self._publish_article(db, scheduled_task, article, job, handle):
+                raise Exception(job.error_message or "发布失败")
+            return {"published_count": 1, "total_count": 1}
 
         # 查询待发布文章
         query = select(Article).where(
             Article.status == ArticleStatus.DRAFT,
             Article.content_type == scheduled_task.content_type,
             Article.content != "",  # 有内容
+            Article.inventory == False,  # 库存稿件留给生成并发布任务
         )
 
         # 排序
@@ -190,187 +358,204 @@ class TaskExecutor:
                 articles = articles[:scheduled_task.publish_batch_size]
 
         published_count = 0
-        cookies = json.loads(account.cookies) if isinstance(account.cookies, str) else account.cookies
 
-        for article in articles:
+        for position, article in enumerate(articles):
+            # 两篇文章之间响应取消与停机，已发布的不受影响
+            if handle:
+                handle.checkpoint("publish")
+
+            # 发布当前文章时提前构建后续文章的发布包，渲染与浏览器操作重叠
+            for upcoming in articles[position + 1:position + 1 + settings.PUBLISH_PREFETCH_WINDOW]:
+                publish_bundle_service.prefetch(upcoming)
+
             # 创建执行记录
-            task_log = Task(
-                type=TaskType.SCHEDULED_PUBLISH,
-                status=TaskStatus.RUNNING,
-                scheduled_task_id=scheduled_task.id,
-                article_id=article.id,
-                account_id=scheduled_task.account_id,
-                started_at=datetime.utcnow(),
+            task_log = await self._start_log(
+                db, scheduled_task, TaskType.SCHEDULED_PUBLISH, article_id=article.id
             )
-            db.add(task_log)
-            await db.flush()
-
             try:
-                # 生成 DOCX
-                docx_path = await docx_generator.generate(
-                    title=article.title if scheduled_task.content_type.value == "article" else "",
-                    content=article.content,
-                    images=article.images or [],
-                )
+                # 同一次批量发布的后续文章不受发布冷却限制，配额仍然生效
+                if await self._publish_article(
+                    db, scheduled_task, article, task_log, handle, check_cooldown=position == 0
+                ):
+                    published_count += 1
+            except AccountUnavailableException:
+                # 账号达到配额或冷却中，剩余文章留待下次发布
+                break
+
+        logger.info(
+            "scheduled_publish_completed",
+            task_id=str(scheduled_task.id),
+            published_count=published_count,
+            total_count=len(articles),
+        )
+
+        return {"published_count": published_count, "total_count": len(articles)}
+
+    async def _publish_article(
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        article: Article,
+        task_log: Task,
+        handle: ExecutionHandle | None = None,
+        check_cooldown: bool = True,
+    ) -> bool:
+        """
+        发布单篇文章并更新执行记录，返回是否成功
+
+        发布账号为任务配置的账号，未配置时由账号选择器分配；租用期间其他 worker 不会使用该账号。
+        check_cooldown 为 False 时不检查账号的发布冷却（批量发布中的后续文章）。
+        浏览器操作期间文章处于发布中，且不会被取消或停机打断（已提交的发布无法撤回）。
+
+        Raises:
+            AccountUnavailableException: 账号不可用（达到配额、冷却中、正在发布），文章保持原状态
+        """
+        from app.services.publisher import publisher
+        from app.services.publish_bundle import publish_bundle_service
+        from app.services.account_selector import account_selector
+
+        success = False
+        try:
+            # 获取发布包（定稿时已预构建）
+            bundle = await publish_bundle_service.ensure(db, article)
+
+            async with account_selector.lease(
+                db, scheduled_task.account_id, check_cooldown=check_cooldown
+            ) as account:
+                cookies = json.loads(account.cookies) if isinstance(account.cookies, str) else account.cookies
+                article.status = ArticleStatus.PUBLISHING
+                article.account_id = account.id
+                task_log.account_id = account.id
+                await db.commit()
 
                 # 发布
-                if scheduled_task.content_type.value == "weitoutiao":
-                    publish_result = await publisher.publish_weitoutiao(
-                        content=article.content,
-                        cookies=cookies,
-                        images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                        docx_path=docx_path,
-                        tags=article.tags if article.tags else None,
-                    )
-                else:
-                    publish_result = await publisher.publish_to_toutiao(
-                        title=article.title,
-                        content=article.content,
-                        cookies=cookies,
-                        images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                        docx_path=docx_path,
-                        tags=article.tags if article.tags else None,
-                    )
+                try:
+                    with handle.critical() if handle else nullcontext():
+                        if scheduled_task.content_type.value == "weitoutiao":
+                            publish_result = await publisher.publish_weitoutiao(
+                                content=article.content,
+                                cookies=cookies,
+                                images=[img["path"] for img in bundle["images"]],
+                                docx_path=bundle["docx_path"],
+                                tags=bundle["tags"] or None,
+                                account_id=account.id,
+                            )
+                        else:
+                            publish_result = await publisher.publish_to_toutiao(
+                                title=article.title,
+                                content=article.content,
+                                cookies=cookies,
+                                images=[img["path"] for img in bundle["images"]],
+                                docx_path=bundle["docx_path"],
+                                tags=bundle["tags"] or None,
+                                account_id=account.id,
+                            )
+                except Exception:
+                    await account_selector.record_result(account, False)
+                    raise
+                await account_selector.record_result(account, bool(publish_result.get("success")))
 
                 if publish_result.get("success"):
                     article.status = ArticleStatus.PUBLISHED
                     article.publish_url = publish_result.get("url", "")
                     article.published_at = datetime.utcnow()
                     task_log.status = TaskStatus.COMPLETED
-                    published_count += 1
+                    success = True
                 else:
                     article.status = ArticleStatus.FAILED
                     article.error_message = publish_result.get("message", "发布失败")
                     task_log.status = TaskStatus.FAILED
                     task_log.error_message = publish_result.get("message", "发布失败")
-
-            except Exception as e:
-                article.status = ArticleStatus.FAILED
-                article.error_message = str(e)
-                task_log.status = TaskStatus.FAILED
-                task_log.error_message = str(e)
-                logger.error(
-                    "scheduled_publish_article_failed",
-                    article_id=str(article.id),
-                    error=str(e),
-                )
-            finally:
-                task_log.completed_at = datetime.utcnow()
+                # 释放账号锁前提交，下一个持锁者能读到当日发布数
                 await db.commit()
 
-        logger.info(
-            "scheduled_publish_completed",
-            task_id=str(scheduled_task.id),
-            published_count=published_count,
-            total_count=len(articles),
-        )
+        except AccountUnavailableException as e:
+            task_log.status = TaskStatus.FAILED
+            task_log.error_message = e.detail
+            logger.warning(
+                "scheduled_publish_no_account",
+                task_id=str(scheduled_task.id),
+                article_id=str(article.id),
+                reason=e.detail,
+            )
+            raise
 
-        return {"published_count": published_count, "total_count": len(articles)}
+        except Exception as e:
+            article.status = ArticleStatus.FAILED
+            article.error_message = str(e)
+            task_log.status = TaskStatus.FAILED
+            task_log.error_message = str(e)
+            logger.error(
+                "scheduled_publish_article_failed",
+                article_id=str(article.id),
+                error=str(e),
+            )
+        finally:
+            task_log.completed_at = datetime.utcnow()
+            await db.commit()
+
+        return success
 
     async def _execute_generate_and_publish(
-        self, db: AsyncSession, scheduled_task: ScheduledTask
+        self,
+        db: AsyncSession,
+        scheduled_task: ScheduledTask,
+        job: Task | None = None,
+        handle: ExecutionHandle | None = None,
     ) -> dict:
-        """执行生成并发布任务"""
-        from app.services.publisher import publisher
-        from app.services.docx_generator import docx_generator
-
-        # 获取账号
-        if not scheduled_task.account_id:
-            raise ValueError("未配置发布账号")
-
-        account = await db.get(Account, scheduled_task.account_id)
-        if not account or account.status != AccountStatus.ACTIVE:
-            raise ValueError("发布账号不可用")
+        """
+        执行生成并发布任务
 
-        # 获取话题
-        topic = self._get_topic(scheduled_task)
+        启用库存时优先取出一篇库存稿件直接发布；重试时若文章已生成则直接发布，
+        生成中断的从中断的阶段继续。
+        """
+        from app.services.scheduler.inventory import draft_inventory
 
         # 创建执行记录
-        task_log = Task(
-            type=TaskType.SCHEDULED_GENERATE_PUBLISH,
-            status=TaskStatus.RUNNING,
-            scheduled_task_id=scheduled_task.id,
-            account_id=scheduled_task.account_id,
-            started_at=datetime.utcnow(),
-        )
-        db.add(task_log)
-        await db.flush()
+        task_log = await self._start_log(db, scheduled_task, TaskType.SCHEDULED_GENERATE_PUBLISH, job)
 
         try:
-            # 1. 生成文章
-            session_result = await workflow_engine.create_session(
-                db=db,
-                mode=WorkflowMode.AUTO,
-                content_type=scheduled_task.content_type,
-                custom_topic=topic,
-            )
-
-            result = await workflow_engine.execute_auto(
-                db=db,
-                session_id=UUID(session_result["session_id"]),
-            )
-
-            if not result.get("success"):
-                raise Exception(result.get("error", "生成文章失败"))
+            # 1. 取库存稿件（已开始现生成的不再取）
+            resuming = bool((task_log.payload or {}).get("session_id"))
+            if not task_log.article_id and not resuming and scheduled_task.inventory_target > 0:
+                article = await draft_inventory.pop(db, scheduled_task)
+                if article:
+                    task_log.article_id = article.id
+                await db.commit()
 
-            article_id = UUID(result["article_id"])
-            task_log.article_id = article_id
+            # 2. 生成文章（未启用库存或库存为空）
+            if not task_log.article_id:
+                task_log.article_id = await self._run_workflow(
+                    db, scheduled_task, task_log, allow_publish=False, handle=handle
+                )
+                await db.commit()
 
-            # 2. 发布文章
-            article = await db.get(Article, article_id)
+            # 3. 发布文章
+            article = await db.get(Article, task_log.article_id)
             if not article:
                 raise Exception("文章不存在")
+            if handle:
+                handle.checkpoint("publish")
 
-            # 生成 DOCX
-            docx_path = await docx_generator.generate(
-                title=article.title if scheduled_task.content_type.value == "article" else "",
-                content=article.content,
-                images=article.images or [],
-            )
-
-            # 发布
-            cookies = json.loads(account.cookies) if isinstance(account.cookies, str) else account.cookies
-
-            if scheduled_task.content_type.value == "weitoutiao":
-                publish_result = await publisher.publish_weitoutiao(
-                    content=article.content,
-                    cookies=cookies,
-                    images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                    docx_path=docx_path,
-                    tags=article.tags if article.tags else None,
-                )
-            else:
-                publish_result = await publisher.publish_to_toutiao(
-                    title=article.title,
-                    content=article.content,
-                    cookies=cookies,
-                    images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                    docx_path=docx_path,
-                    tags=article.tags if article.tags else None,
-                )
-
-            if publish_result.get("success"):
-                article.status = ArticleStatus.PUBLISHED
-                article.publish_url = publish_result.get("url", "")
-                article.published_at = datetime.utcnow()
-                task_log.status = TaskStatus.COMPLETED
-            else:
-                article.status = ArticleStatus.FAILED
-                article.error_message = publish_result.get("message", "发布失败")
-                task_log.status = TaskStatus.FAILED
-                task_log.error_message = publish_result.get("message", "发布失败")
+        except TaskInterruptedException:
+            raise
 
         except Exception as e:
             task_log.status = TaskStatus.FAILED
             task_log.error_message = str(e)
-            raise
-        finally:
             task_log.completed_at = datetime.utcnow()
             await db.commit()
+            raise
+
+        if article.status == ArticleStatus.PUBLISHING:
+            await self._fail_interrupted_publish(db, article, task_log)
+        if article.status != ArticleStatus.PUBLISHED:
+            if not await self._publish_article(db, scheduled_task, article, task_log, handle):
+                raise Exception(task_log.error_message or "发布失败")
 
         return {
-            "article_id": str(task_log.article_id) if task_log.article_id else None,
-            "published": task_log.status == TaskStatus.COMPLETED,
+            "article_id": str(task_log.article_id),
+            "published": True,
         }
 
     def _get_topic(self, scheduled_task: ScheduledTask) -> str | None:
@@ -0,0 +1,73 @@
+"""
+执行句柄 - 队列任务执行期间的取消与停机控制
+
+执行方在检查点（工作流阶段之间、批量发布的两篇文章之间）调用 checkpoint()，
+收到取消或停机请求时在检查点抛出 TaskInterruptedException，已完成阶段的结果保留，
+停机放回队列后由下一个 worker 从中断的阶段继续。
+浏览器发布等无法中途撤回的操作放在 critical() 区间内，区间内不会被强制取消。
+"""
+
+import asyncio
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Iterator
+from uuid import UUID
+
+from app.core.exceptions import TaskInterruptedException
+
+# 中断原因
+CANCEL = "cancel"
+DRAIN = "drain"
+
+
+class ExecutionHandle:
+    """单条队列任务的执行句柄"""
+
+    def __init__(self, job_id: UUID):
+        self.job_id = job_id
+        self.started_at = datetime.utcnow()
+        self.stage: str | None = None
+        self.reason: str | None = None
+        self.task: asyncio.Task | None = None
+        self._critical = 0
+
+    @property
+    def in_critical(self) -> bool:
+        return self._critical > 0
+
+    def request_stop(self, reason: str):
+        """请求在下一个检查点中断（取消优先于停机）"""
+        if self.reason != CANCEL:
+            self.reason = reason
+
+    def interrupt(self, reason: str | None = None):
+        """立即中断：不在关键区间内时直接取消执行协程，否则等离开区间后的检查点"""
+        if reason:
+            self.request_stop(reason)
+        if not self.in_critical and self.task and not self.task.done():
+            self.task.cancel()
+
+    def checkpoint(self, stage: str | None = None):
+        """检查点：记录当前阶段，有中断请求时抛出 TaskInterruptedException"""
+        if stage:
+            self.stage = stage
+        if self.reason:
+            raise TaskInterruptedException(f"任务在 {self.stage or '开始'} 阶段前中断（{self.reason}）")
+
+    @contextmanager
+    def critical(self) -> Iterator[None]:
+        """不可中断区间"""
+        self._critical += 1
+        try:
+            yield
+        finally:
+            self._critical -= 1
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": str(self.job_id),
+            "started_at": self.started_at.isoformat(),
+            "stage": self.stage,
+            "stopping": self.reason,
+            "in_critical": self.in_critical,
+        }
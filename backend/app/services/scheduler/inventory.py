@@ -0,0 +1,173 @@
+"""
+草稿库存 - 生成并发布任务的预生成缓冲
+
+启用库存（inventory_target > 0）的生成并发布任务，由 leader 在后台按 (内容类型, 账号)
+将已定稿、发布包就绪的库存稿件补足到目标数；触发时只取出一篇直接发布，
+发布时间不再受生成耗时影响，生成失败也不会落在发布时刻。
+库存为空时回退为现生成现发布，并记为一次缺货。
+"""
+
+from datetime import datetime
+from uuid import UUID
+import structlog
+from sqlalchemy import select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.database import AsyncSessionLocal
+from app.models import (
+    Article,
+    ArticleStatus,
+    ScheduledTask,
+    ScheduledTaskType,
+    Task,
+    TaskStatus,
+    TaskType,
+)
+from app.services.scheduler.queue import task_queue
+
+logger = structlog.get_logger()
+
+# 补库存的生成任务排在定时触发和手动触发之后
+INVENTORY_PRIORITY = -5
+
+
+def _ready_filter(content_type, account_id) -> tuple:
+    return (
+        Article.inventory == True,
+        Article.status == ArticleStatus.DRAFT,
+        Article.content_type == content_type,
+        Article.account_id == account_id if account_id else Article.account_id.is_(None),
+    )
+
+
+class DraftInventory:
+    """草稿库存"""
+
+    async def count_ready(self, db: AsyncSession, content_type, account_id: UUID | None) -> int:
+        return await db.scalar(
+            select(func.count(Article.id)).where(*_ready_filter(content_type, account_id))
+        ) or 0
+
+    async def count_producing(self, db: AsyncSession, scheduled_task_ids: list[UUID]) -> int:
+        """排队中或生成中的补库存任务数"""
+        return await db.scalar(
+            select(func.count(Task.id)).where(
+                Task.scheduled_task_id.in_(scheduled_task_ids),
+                Task.type == TaskType.SCHEDULED_GENERATE,
+                Task.status.in_([TaskStatus.PENDING, TaskStatus.RUNNING]),
+                Task.payload["inventory"].as_boolean() == True,
+            )
+        ) or 0
+
+    async def _groups(self, db: AsyncSession) -> dict[tuple, list[ScheduledTask]]:
+        """按 (内容类型, 账号) 分组的启用库存的任务，同组共享库存"""
+        result = await db.execute(
+            select(ScheduledTask)
+            .where(
+                ScheduledTask.is_active == True,
+                ScheduledTask.type == ScheduledTaskType.GENERATE_AND_PUBLISH,
+                ScheduledTask.inventory_target > 0,
+            )
+            .order_by(ScheduledTask.created_at)
+        )
+        groups: dict[tuple, list[ScheduledTask]] = {}
+        for task in result.scalars().all():
+            groups.setdefault((task.content_type, task.account_id), []).append(task)
+        return groups
+
+    async def replenish(self) -> int:
+        """
+        补足各组库存（由调度器 leader 定期调用）
+
+        组内目标取最大值，由目标最大的任务（相同时取最早创建的）负责生成，使用它的话题配置。
+
+        Returns:
+            int: 本轮入队的生成任务数
+        """
+        enqueued = 0
+        async with AsyncSessionLocal() as db:
+            for (content_type, account_id), tasks in (await self._groups(db)).items():
+                producer = max(tasks, key=lambda t: t.inventory_target)
+                ready = await self.count_ready(db, content_type, account_id)
+                producing = await self.count_producing(db, [t.id for t in tasks])
+                deficit = producer.inventory_target - ready - producing
+                for _ in range(deficit):
+                    await task_queue.enqueue(
+                        db,
+                        TaskType.SCHEDULED_GENERATE,
+                        scheduled_task_id=producer.id,
+                        account_id=account_id,
+                        priority=INVENTORY_PRIORITY,
+                        payload={"inventory": True},
+                    )
+                if deficit > 0:
+                    enqueued += deficit
+                    logger.info(
+                        "inventory_replenish",
+                        scheduled_task_id=str(producer.id),
+                        content_type=content_type.value,
+                        ready=ready,
+                        producing=producing,
+                        enqueued=deficit,
+                    )
+        return enqueued
+
+    async def pop(self, db: AsyncSession, scheduled_task: ScheduledTask) -> Article | None:
+        """
+        取出一篇库存稿件（并发取用时用 SKIP LOCKED 避免取到同一篇）
+
+        取出后稿件不再计入库存；同时更新任务的库存统计。调用方负责提交。
+        """
+        ready = await self.count_ready(db, scheduled_task.content_type, scheduled_task.account_id)
+        result = await db.execute(
+            select(Article)
+            .where(*_ready_filter(scheduled_task.content_type, scheduled_task.account_id))
+            .order_by(Article.created_at)
+            .limit(1)
+            .with_for_update(skip_locked=True)
+        )
+        article = result.scalar_one_or_none()
+
+        stats = dict(scheduled_task.inventory_stats or {})
+        remaining = max(ready - 1, 0) if article else 0
+        stats["pops"] = stats.get("pops", 0) + 1
+        stats["low_watermark"] = min(stats.get("low_watermark", remaining), remaining)
+        stats["last_pop_at"] = datetime.utcnow().isoformat()
+        if article:
+            article.inventory = False
+        else:
+            stats["stockouts"] = stats.get("stockouts", 0) + 1
+            logger.warning(
+                "inventory_stockout",
+                scheduled_task_id=str(scheduled_task.id),
+                content_type=scheduled_task.content_type.value,
+            )
+        scheduled_task.inventory_stats = stats
+        return article
+
+    async def get_status(self, db: AsyncSession) -> list[dict]:
+        """各启用库存任务的库存状态"""
+        items = []
+        for (content_type, account_id), tasks in (await self._groups(db)).items():
+            ready = await self.count_ready(db, content_type, account_id)
+            producing = await self.count_producing(db, [t.id for t in tasks])
+            for task in tasks:
+                stats = task.inventory_stats or {}
+                items.append({
+                    "scheduled_task_id": str(task.id),
+                    "name": task.name,
+                    "content_type": content_type.value,
+                    "account_id": str(account_id) if account_id else None,
+                    "target": task.inventory_target,
+                    "ready": ready,
+                    "producing": producing,
+                    "low_watermark": stats.get("low_watermark"),
+                    "pops": stats.get("pops", 0),
+                    "stockouts": stats.get("stockouts", 0),
+                    "last_pop_at": stats.get("last_pop_at"),
+                })
+        return items
+
+
+# 全局实例
+draft_inventory = DraftInventory()
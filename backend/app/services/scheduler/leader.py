@@ -0,0 +1,130 @@
+"""
+调度器选主 - 基于 Postgres 会话级 advisory lock
+
+每个进程都参与选主，只有持有锁的进程运行 APScheduler，其余进程仅作为 API 服务。
+锁与一条专用数据库连接绑定：进程退出或连接断开时锁自动释放，其他进程在下一次检查时接任。
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+import structlog
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection
+
+from app.core.config import settings
+from app.core.database import engine, AsyncSessionLocal
+from app.services.scheduler.service import scheduler_service
+from app.services.scheduler.inventory import draft_inventory
+from app.services.scheduler.state import scheduler_state
+
+logger = structlog.get_logger()
+
+
+class SchedulerLeader:
+    """调度器 leader 选举"""
+
+    def __init__(self):
+        self.instance_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self.is_leader = False
+        self._conn: AsyncConnection | None = None
+        self._task: asyncio.Task | None = None
+
+    async def start(self):
+        """启动选主循环"""
+        if self._task:
+            return
+        self._task = asyncio.create_task(self._loop())
+
+    async def stop(self):
+        """停止选主循环，若为 leader 则停止调度器并释放锁"""
+        if not self._task:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        await self._step_down()
+
+    async def _loop(self):
+        while True:
+            try:
+                if self.is_leader:
+                    await self._check()
+                    # 其他进程对定时任务的修改通过定期同步生效
+                    await scheduler_service.sync()
+                    await self._report()
+                    await self._replenish_inventory()
+                else:
+                    await self._try_acquire()
+            except Exception as e:
+                logger.error("scheduler_leader_check_failed", instance_id=self.instance_id, error=str(e))
+                await self._step_down()
+            await asyncio.sleep(settings.SCHEDULER_LEADER_INTERVAL)
+
+    async def _report(self):
+        """上报调度器状态，并执行数据库中的暂停开关（暂停 / 恢复请求可能落在其他进程）"""
+        async with AsyncSessionLocal() as db:
+            paused = await scheduler_state.report(db, self.instance_id, scheduler_service.get_status())
+        scheduler_service.set_paused(paused)
+
+    async def _replenish_inventory(self):
+        """补足草稿库存（失败不影响 leader 身份）"""
+        try:
+            await draft_inventory.replenish()
+        except Exception as e:
+            logger.error("inventory_replenish_failed", error=str(e))
+
+    async def _try_acquire(self):
+        conn = await engine.connect()
+        try:
+            acquired = await conn.scalar(
+                text("SELECT pg_try_advisory_lock(:lock_id)"),
+                {"lock_id": settings.SCHEDULER_LEADER_LOCK_ID},
+            )
+            await conn.commit()
+        except Exception:
+            await conn.invalidate()
+            raise
+
+        if not acquired:
+            await conn.close()
+            return
+
+        self._conn = conn
+        self.is_leader = True
+        logger.info("scheduler_leader_elected", instance_id=self.instance_id)
+        await scheduler_service.start()
+        await self._report()
+
+    async def _check(self):
+        """确认持锁连接仍然可用（连接断开意味着锁已被释放）"""
+        await self._conn.execute(text("SELECT 1"))
+        await self._conn.commit()
+
+    async def _step_down(self):
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        await scheduler_service.stop()
+        if self._conn is not None:
+            # 直接丢弃物理连接，保证会话级锁随之释放，而不是带着锁回到连接池
+            try:
+                await self._conn.invalidate()
+            except Exception as e:
+                logger.warning("scheduler_leader_release_failed", error=str(e))
+            self._conn = None
+        logger.info("scheduler_leader_stepped_down", instance_id=self.instance_id)
+
+    def get_status(self) -> dict:
+        return {
+            "instance_id": self.instance_id,
+            "is_leader": self.is_leader,
+        }
+
+
+# 全局实例
+scheduler_leader = SchedulerLeader()
@@ -0,0 +1,267 @@
+"""
+负载平滑规划
+
+把时间切成 SCHEDULER_PLAN_SLOT_MINUTES 分钟的槽位，预测各槽位需要的资源（LLM、图片、浏览器），
+每个槽位可启动的任务数以对应资源池的容量为上限：
+- Cron / 固定间隔任务到点后，在 SCHEDULER_PLAN_MAX_DELAY_MINUTES 内顺延到最早有余量的槽位，
+  通过队列任务的 available_at 延后执行；
+- 随机间隔任务在 [min, max] 窗口内选负载最低的槽位，槽位内分钟随机。
+两者都不会被挪出 active_start_hour / active_end_hour。预测接口使用同一套放置规则。
+
+规划使用本地时间（与 next_run_at、活跃时段一致），队列的 available_at 为 UTC，读入时换算。
+"""
+
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+from uuid import UUID
+from apscheduler.triggers.cron import CronTrigger
+from sqlalchemy import select, and_, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import ScheduledTask, ScheduledTaskType, ScheduleMode, Task, TaskStatus, TaskType
+
+# 每次执行启动时占用的资源
+TASK_TYPE_DEMAND = {
+    TaskType.SCHEDULED_GENERATE: ("llm", "image"),
+    TaskType.SCHEDULED_PUBLISH: ("browser",),
+    TaskType.SCHEDULED_GENERATE_PUBLISH: ("llm", "image", "browser"),
+}
+
+# 单个任务在预测窗口内最多展开的触发次数（防止每分钟触发的 cron 展开过多）
+MAX_EVENTS_PER_TASK = 500
+
+# 到点执行时按该容差匹配规划时预先放置的触发（与调度器的 misfire_grace_time 一致）
+FIRE_MATCH_TOLERANCE = timedelta(minutes=5)
+
+
+def local_naive(value: datetime | None) -> datetime | None:
+    """APScheduler 返回带时区的时间，统一转为本地时区的 naive 时间"""
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone().replace(tzinfo=None)
+
+
+def task_demand(task: ScheduledTask) -> tuple[str, ...]:
+    """定时任务每次触发占用的资源（启用库存的生成并发布任务触发时只发布）"""
+    if task.type == ScheduledTaskType.PUBLISH:
+        return ("browser",)
+    if task.type == ScheduledTaskType.GENERATE:
+        return ("llm", "image")
+    if task.inventory_target > 0:
+        return ("browser",)
+    return ("llm", "image", "browser")
+
+
+def slot_capacity() -> dict[str, int]:
+    return {
+        "llm": settings.LLM_MAX_CONCURRENT,
+        "image": settings.IMAGE_MAX_CONCURRENT,
+        "browser": settings.BROWSER_MAX_SESSIONS,
+    }
+
+
+def in_active_hours(task: ScheduledTask, moment: datetime) -> bool:
+    return task.active_start_hour <= moment.hour < task.active_end_hour
+
+
+class SlotPlan:
+    """按槽位累计的资源负载"""
+
+    def __init__(self, slot_minutes: int | None = None):
+        self.slot = timedelta(minutes=slot_minutes or settings.SCHEDULER_PLAN_SLOT_MINUTES)
+        self.capacity = slot_capacity()
+        self.loads: dict[datetime, Counter] = {}
+        self.counts: Counter = Counter()
+        # task_id -> [(原始触发时间, 放置后的时间)]，已计入负载
+        self.placed: dict[UUID, list[tuple[datetime, datetime]]] = {}
+
+    def slot_of(self, moment: datetime) -> datetime:
+        epoch = datetime(2000, 1, 1)
+        return epoch + (moment - epoch) // self.slot * self.slot
+
+    def add(self, moment: datetime, demand: tuple[str, ...]):
+        slot = self.slot_of(moment)
+        self.loads.setdefault(slot, Counter()).update(demand)
+        self.counts[slot] += 1
+
+    def fits(self, slot: datetime, demand: tuple[str, ...]) -> bool:
+        load = self.loads.get(slot, Counter())
+        return all(load[r] + 1 <= self.capacity[r] for r in demand)
+
+    def utilization(self, slot: datetime, demand: tuple[str, ...]) -> float:
+        load = self.loads.get(slot, Counter())
+        return max((load[r] + 1) / self.capacity[r] for r in demand)
+
+    def take(self, task_id: UUID, moment: datetime) -> datetime | None:
+        """取出任务在 moment 附近触发的预先放置时间（已计入负载），没有时返回 None"""
+        events = self.placed.get(task_id) or []
+        for i, (fire, at) in enumerate(events):
+            if moment - FIRE_MATCH_TOLERANCE <= fire <= moment + timedelta(minutes=1):
+                del events[i]
+                return at
+        return None
+
+    def place_delayed(self, task: ScheduledTask, fire_time: datetime, demand: tuple[str, ...]) -> datetime:
+        """
+        到点触发的任务：顺延到 max_delay 内最早有余量的槽位
+
+        原触发时间在活跃时段内时不会被顺延出活跃时段；都没有余量时按原时间执行。
+        """
+        if self.fits(self.slot_of(fire_time), demand):
+            return fire_time
+
+        latest = fire_time + timedelta(minutes=settings.SCHEDULER_PLAN_MAX_DELAY_MINUTES)
+        candidate = self.slot_of(fire_time) + self.slot
+        while candidate <= latest:
+            if in_active_hours(task, fire_time) and not in_active_hours(task, candidate):
+                break
+            if self.fits(candidate, demand):
+                return candidate
+            candidate += self.slot
+        return fire_time
+
+    def place_in_window(
+        self,
+        task: ScheduledTask,
+        earliest: datetime,
+        latest: datetime,
+        demand: tuple[str, ...],
+    ) -> datetime | None:
+        """随机间隔任务：在窗口内活跃时段的槽位中选负载最低的（相同时随机），无可用槽位返回 None"""
+        candidates = []
+        slot = self.slot_of(earliest)
+        while slot <= latest:
+            start = max(slot, earliest)
+            end = min(slot + self.slot - timedelta(minutes=1), latest)
+            if start <= end and in_active_hours(task, start):
+                candidates.append((self.utilization(slot, demand), start, end))
+            slot += self.slot
+        if not candidates:
+            return None
+
+        lowest = min(c[0] for c in candidates)
+        _, start, end = random.choice([c for c in candidates if c[0] == lowest])
+        minutes = int((end - start).total_seconds() // 60)
+        return (start + timedelta(minutes=random.randint(0, minutes))).replace(second=0, microsecond=0)
+
+
+class LoadPlanner:
+    """负载规划器"""
+
+    def fire_times(self, task: ScheduledTask, after: datetime, until: datetime) -> list[datetime]:
+        """预测任务在 (after, until] 内的原始触发时间（随机间隔任务只知道下一次）"""
+        times: list[datetime] = []
+        if task.schedule_mode == ScheduleMode.CRON:
+            trigger = CronTrigger.from_crontab(task.schedule_config.get("cron", "0 9 * * *"))
+            previous = None
+            current = after.astimezone()
+            while len(times) < MAX_EVENTS_PER_TASK:
+                fire = trigger.get_next_fire_time(previous, current)
+                if fire is None or local_naive(fire) > until:
+                    break
+                if local_naive(fire) > after:
+                    times.append(local_naive(fire))
+                previous = current = fire + timedelta(seconds=1)
+        elif task.schedule_mode == ScheduleMode.INTERVAL:
+            step = timedelta(minutes=max(1, task.schedule_config.get("minutes", 60)))
+            fire = task.next_run_at or after + step
+            while fire <= after:
+                fire += step
+            while fire <= until and len(times) < MAX_EVENTS_PER_TASK:
+                times.append(fire)
+                fire += step
+        elif task.next_run_at and after < task.next_run_at <= until:
+            times.append(task.next_run_at)
+        return times
+
+    async def build(
+        self,
+        db: AsyncSession,
+        tasks: list[ScheduledTask],
+        now: datetime | None = None,
+        hours: int | None = None,
+    ) -> tuple[SlotPlan, list[tuple[ScheduledTask, datetime, datetime]]]:
+        """
+        按放置规则模拟 now 之后 hours 小时内的负载
+
+        执行中的队列任务和已到期未领取的队列任务计入当前槽位，其余未执行的按 available_at 计入；
+        各任务的后续触发按时间顺序依次放置。
+
+        Returns:
+            (SlotPlan, [(任务, 原始触发时间, 放置后的时间)])
+        """
+        now = now or datetime.now()
+        until = now + timedelta(hours=hours or settings.SCHEDULER_PLAN_HORIZON_HOURS)
+        plan = SlotPlan()
+
+        utc_offset = timedelta(minutes=round((datetime.now() - datetime.utcnow()).total_seconds() / 60))
+        result = await db.execute(
+            select(Task.type, Task.status, Task.available_at).where(
+                Task.type.in_(list(TASK_TYPE_DEMAND)),
+                or_(
+                    Task.status == TaskStatus.RUNNING,
+                    and_(Task.status == TaskStatus.PENDING, Task.available_at <= until - utc_offset),
+                ),
+            )
+        )
+        for task_type, status, available_at in result.all():
+            at = now if status == TaskStatus.RUNNING else max(available_at + utc_offset, now)
+            plan.add(at, TASK_TYPE_DEMAND[task_type])
+
+        events = [
+            (fire, task)
+            for task in tasks
+            for fire in self.fire_times(task, now, until)
+        ]
+        events.sort(key=lambda e: (e[0], str(e[1].id)))
+
+        placed = []
+        for fire, task in events:
+            demand = task_demand(task)
+            if task.schedule_mode == ScheduleMode.RANDOM_INTERVAL:
+                # 随机间隔任务的下一次时间已经规划过
+                at = fire
+            else:
+                at = plan.place_delayed(task, fire, demand)
+                plan.placed.setdefault(task.id, []).append((fire, at))
+            plan.add(at, demand)
+            placed.append((task, fire, at))
+        return plan, placed
+
+    async def forecast(self, db: AsyncSession, hours: int | None = None) -> dict:
+        """预测各槽位的负载"""
+        result = await db.execute(select(ScheduledTask).where(ScheduledTask.is_active == True))
+        tasks = list(result.scalars().all())
+        now = datetime.now()
+        hours = hours or settings.SCHEDULER_PLAN_HORIZON_HOURS
+        plan, placed = await self.build(db, tasks, now, hours)
+
+        delayed = Counter()
+        for task, fire, at in placed:
+            if at != fire:
+                delayed[plan.slot_of(at)] += 1
+
+        slots = []
+        slot = plan.slot_of(now)
+        while slot < now + timedelta(hours=hours):
+            load = plan.loads.get(slot, Counter())
+            slots.append({
+                "start": slot.isoformat(),
+                "jobs": plan.counts[slot],
+                "delayed": delayed[slot],
+                "load": {r: load[r] for r in plan.capacity},
+                "over_capacity": any(load[r] > plan.capacity[r] for r in plan.capacity),
+            })
+            slot += plan.slot
+
+        return {
+            "slot_minutes": int(plan.slot.total_seconds() // 60),
+            "capacity": plan.capacity,
+            "slots": slots,
+        }
+
+
+# 全局实例
+load_planner = LoadPlanner()
@@ -0,0 +1,525 @@
+"""
+任务队列 - 基于 tasks 表的持久化队列
+
+任务以 PENDING 行写入 tasks 表，worker 用 SELECT ... FOR UPDATE SKIP LOCKED
+按优先级领取，多个进程可同时消费同一张表而不会重复领取。
+领取时写入租约（locked_by / locked_until），执行期间定时心跳续租；
+worker 崩溃后租约过期，任务会被其他 worker 重新领取。
+失败的任务按 SCHEDULER_RETRY_DELAY 指数退避重试，超过 SCHEDULER_RETRY_COUNT 次后标记为失败；
+租约过期后的重新领取同样计入重试次数，反复拖垮 worker 或卡死的任务不会被无限领取。
+
+停机时先停止领取，给执行中的任务 QUEUE_DRAIN_TIMEOUT 秒在检查点收尾；
+到期后中断剩余任务并放回队列，下一个 worker 从记录的检查点继续（见 handle.py）。
+"""
+
+import asyncio
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from uuid import UUID
+import structlog
+from sqlalchemy import select, update, func, and_, or_, case
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
+from app.core.exceptions import TaskInterruptedException, TaskSkippedException
+from app.models import ScheduledTask, ScheduledTaskType, Task, TaskStatus, TaskType
+from app.services.scheduler.executor import task_executor
+from app.services.scheduler.handle import ExecutionHandle, CANCEL, DRAIN
+
+logger = structlog.get_logger()
+
+# 定时任务类型 -> 队列任务类型
+SCHEDULED_TASK_TYPES = {
+    ScheduledTaskType.GENERATE: TaskType.SCHEDULED_GENERATE,
+    ScheduledTaskType.PUBLISH: TaskType.SCHEDULED_PUBLISH,
+    ScheduledTaskType.GENERATE_AND_PUBLISH: TaskType.SCHEDULED_GENERATE_PUBLISH,
+}
+
+# worker 能处理的任务类型
+HANDLED_TYPES = tuple(SCHEDULED_TASK_TYPES.values())
+
+# 手动触发的任务优先于定时触发
+MANUAL_PRIORITY = 10
+
+LEASE_EXHAUSTED_MESSAGE = "执行超时或 worker 异常退出，租约多次过期，已停止重试"
+
+
+class TaskQueue:
+    """
+    任务队列 worker
+
+    每个进程一个实例，并发上限默认为 SCHEDULER_MAX_CONCURRENT（独立 worker 进程可单独指定）。
+    空闲时每 QUEUE_POLL_INTERVAL 秒轮询一次，本进程入队时立即唤醒。
+    """
+
+    def __init__(self):
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._runner: asyncio.Task | None = None
+        self._wakeup: asyncio.Event | None = None
+        self._active: dict[UUID, asyncio.Task] = {}
+        self._handles: dict[UUID, ExecutionHandle] = {}
+        self.draining = False
+        self.concurrency = settings.SCHEDULER_MAX_CONCURRENT
+
+    @property
+    def running(self) -> bool:
+        return self._runner is not None
+
+    async def start(self, concurrency: int | None = None):
+        """启动 worker 循环"""
+        if self._runner:
+            return
+        if concurrency:
+            self.concurrency = concurrency
+        self._wakeup = asyncio.Event()
+        self.draining = False
+        self._runner = asyncio.create_task(self._run())
+        logger.info(
+            "task_queue_started",
+            worker_id=self.worker_id,
+            concurrency=self.concurrency,
+        )
+
+    async def stop(self, drain_timeout: float | None = None):
+        """
+        停止 worker
+
+        停止领取新任务，执行中的任务在下一个检查点中断并放回队列；
+        drain_timeout（默认 QUEUE_DRAIN_TIMEOUT）秒后仍未结束的任务直接取消并放回队列。
+        正在浏览器中发布的任务无法撤回，等待其完成。
+        """
+        if not self._runner:
+            return
+        self.draining = True
+        self._runner.cancel()
+        try:
+            await self._runner
+        except asyncio.CancelledError:
+            pass
+        self._runner = None
+
+        jobs = list(self._active.values())
+        if jobs:
+            if drain_timeout is None:
+                drain_timeout = settings.QUEUE_DRAIN_TIMEOUT
+            logger.info(
+                "task_queue_draining",
+                worker_id=self.worker_id,
+                active_jobs=len(jobs),
+                timeout=drain_timeout,
+            )
+            for handle in list(self._handles.values()):
+                handle.request_stop(DRAIN)
+            _, pending = await asyncio.wait(jobs, timeout=drain_timeout)
+            if pending:
+                logger.warning("task_queue_drain_timeout", worker_id=self.worker_id, pending=len(pending))
+                for handle in list(self._handles.values()):
+                    handle.interrupt(DRAIN)
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        logger.info("task_queue_stopped", worker_id=self.worker_id, drained=len(jobs))
+
+    def notify(self):
+        """唤醒 worker 立即领取任务"""
+        if self._wakeup:
+            self._wakeup.set()
+
+    async def cancel(self, db: AsyncSession, job: Task):
+        """
+        取消排队中或执行中的任务
+
+        清除租约并标记为已取消；在本进程执行的任务立即中断，
+        在其他进程执行的任务由该进程在下一次心跳时发现并中断。
+        """
+        job.status = TaskStatus.CANCELLED
+        job.completed_at = datetime.utcnow()
+        job.locked_by = None
+        job.locked_until = None
+        await db.commit()
+
+        handle = self._handles.get(job.id)
+        if handle:
+            handle.interrupt(CANCEL)
+        logger.info("task_cancelled", job_id=str(job.id), local=handle is not None)
+
+    # ==================== 入队 ====================
+
+    async def enqueue(
+        self,
+        db: AsyncSession,
+        task_type: TaskType,
+        scheduled_task_id: UUID | None = None,
+        article_id: UUID | None = None,
+        account_id: UUID | None = None,
+        priority: int = 0,
+        payload: dict | None = None,
+        available_at: datetime | None = None,
+    ) -> Task:
+        """写入一条待执行任务（available_at 为 UTC，默认立即可领取）"""
+        job = Task(
+            type=task_type,
+            status=TaskStatus.PENDING,
+            scheduled_task_id=scheduled_task_id,
+            article_id=article_id,
+            account_id=account_id,
+            priority=priority,
+            payload=payload,
+            available_at=available_at or datetime.utcnow(),
+        )
+        db.add(job)
+        await db.commit()
+        self.notify()
+
+        logger.info(
+            "task_enqueued",
+            job_id=str(job.id),
+            task_type=task_type.value,
+            priority=priority,
+        )
+        return job
+
+    async def enqueue_scheduled(
+        self,
+        scheduled_task_id: UUID,
+        priority: int = 0,
+        db: AsyncSession | None = None,
+        delay: timedelta | None = None,
+    ) -> Task | None:
+        """
+        为定时任务入队一次执行
+
+        同一定时任务已有排队或执行中的队列任务时不重复入队（对应原先 max_instances=1）。
+
+        Args:
+            db: 复用调用方的会话（不传时自行打开）
+            delay: 延后执行（负载规划顺延）
+
+        Returns:
+            Task | None: 队列任务，定时任务不存在时返回 None
+        """
+        if db is None:
+            async with AsyncSessionLocal() as db:
+                return await self.enqueue_scheduled(scheduled_task_id, priority, db, delay)
+
+        scheduled_task = await db.get(ScheduledTask, scheduled_task_id)
+        if not scheduled_task:
+            return None
+
+        result = await db.execute(
+            select(Task).where(
+                Task.scheduled_task_id == scheduled_task_id,
+                # 按类型过滤，库存补货任务（SCHEDULED_GENERATE）不影响生成并发布任务的触发
+                Task.type == SCHEDULED_TASK_TYPES[scheduled_task.type],
+                or_(
+                    Task.status == TaskStatus.PENDING,
+                    and_(Task.status == TaskStatus.RUNNING, Task.locked_by.isnot(None)),
+                ),
+            ).limit(1)
+        )
+        existing = result.scalar_one_or_none()
+        if existing:
+            logger.info(
+                "task_enqueue_skipped",
+                scheduled_task_id=str(scheduled_task_id),
+                job_id=str(existing.id),
+            )
+            return existing
+
+        return await self.enqueue(
+            db,
+            SCHEDULED_TASK_TYPES[scheduled_task.type],
+            scheduled_task_id=scheduled_task.id,
+            account_id=scheduled_task.account_id,
+            priority=priority,
+            available_at=datetime.utcnow() + delay if delay else None,
+        )
+
+    # ==================== 消费 ====================
+
+    async def _run(self):
+        while True:
+            try:
+                slots = self.concurrency - len(self._active)
+                if slots > 0:
+                    for job_id in await self._claim(slots):
+                        job = asyncio.create_task(self._process(job_id))
+                        self._active[job_id] = job
+                        job.add_done_callback(lambda _, job_id=job_id: self._on_job_done(job_id))
+            except Exception as e:
+                logger.error("task_queue_claim_failed", error=str(e))
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=settings.QUEUE_POLL_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+
+    def _on_job_done(self, job_id: UUID):
+        self._active.pop(job_id, None)
+        # 空出并发槽位，立即领取下一条
+        self.notify()
+
+    async def _claim(self, limit: int) -> list[UUID]:
+        """
+        领取最多 limit 条可执行任务（待执行且到期，或租约已过期的执行中任务）
+
+        租约过期的任务重新领取时重试次数加一，已达到 SCHEDULER_RETRY_COUNT 的直接标记为失败。
+        停机时放回队列的任务（_release）已是待执行状态，不计入重试次数。
+        """
+        now = datetime.utcnow()
+        expired = and_(Task.status == TaskStatus.RUNNING, Task.locked_until < now)
+        retry_count = func.coalesce(Task.retry_count, 0)
+        candidates = (
+            select(Task.id)
+            .where(
+                Task.type.in_(HANDLED_TYPES),
+                or_(
+                    and_(Task.status == TaskStatus.PENDING, Task.available_at <= now),
+                    expired,
+                ),
+            )
+            .order_by(Task.priority.desc(), Task.available_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+
+        async with AsyncSessionLocal() as db:
+            exhausted = await db.execute(
+                update(Task)
+                .where(
+                    Task.type.in_(HANDLED_TYPES),
+                    expired,
+                    retry_count >= settings.SCHEDULER_RETRY_COUNT,
+                )
+                .values(
+                    status=TaskStatus.FAILED,
+                    error_message=LEASE_EXHAUSTED_MESSAGE,
+                    completed_at=now,
+                    locked_by=None,
+                    locked_until=None,
+                )
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )
+            for job_id in exhausted.scalars().all():
+                logger.warning("task_lease_retries_exhausted", job_id=str(job_id))
+
+            result = await db.execute(
+                update(Task)
+                .where(Task.id.in_(candidates.scalar_subquery()))
+                .values(
+                    # SET 中的 status 为更新前的值：执行中即租约过期后的重新领取
+                    retry_count=case(
+                        (Task.status == TaskStatus.RUNNING, retry_count + 1),
+                        else_=retry_count,
+                    ),
+                    status=TaskStatus.RUNNING,
+                    locked_by=self.worker_id,
+                    locked_until=now + timedelta(seconds=settings.QUEUE_VISIBILITY_TIMEOUT),
+                    heartbeat_at=now,
+                    started_at=now,
+                    completed_at=None,
+                )
+                .returning(Task.id)
+                .execution_options(synchronize_session=False)
+            )
+            job_ids = list(result.scalars().all())
+            await db.commit()
+
+        if job_ids:
+            logger.info("task_queue_claimed", worker_id=self.worker_id, count=len(job_ids))
+        return job_ids
+
+    async def _process(self, job_id: UUID):
+        """执行一条已领取的任务，期间定时续租"""
+        handle = ExecutionHandle(job_id)
+        self._handles[job_id] = handle
+        handler = handle.task = asyncio.create_task(self._handle(job_id, handle))
+        heartbeat = asyncio.create_task(self._heartbeat(job_id, handle))
+        try:
+            await handler
+        except (TaskInterruptedException, asyncio.CancelledError):
+            if handle.reason is None:
+                raise
+            if handle.reason == DRAIN:
+                # 停机中断：已完成的阶段保留，放回队列续跑
+                logger.info("task_checkpointed", job_id=str(job_id), stage=handle.stage)
+                await self._release([job_id])
+            else:
+                # 任务被取消或租约被其他 worker 接手，不再回写状态
+                logger.warning("task_interrupted", job_id=str(job_id), stage=handle.stage)
+        except TaskSkippedException as e:
+            await self._skip(job_id, e.detail)
+        except Exception as e:
+            logger.error("task_execute_failed", job_id=str(job_id), error=str(e))
+            await self._fail(job_id, str(e))
+        else:
+            await self._complete(job_id)
+        finally:
+            self._handles.pop(job_id, None)
+            heartbeat.cancel()
+            if not handler.done():
+                handler.cancel()
+
+    async def _handle(self, job_id: UUID, handle: ExecutionHandle):
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Task, job_id)
+            if not job:
+                return
+            scheduled_task = await db.get(ScheduledTask, job.scheduled_task_id) if job.scheduled_task_id else None
+            if not scheduled_task:
+                raise Exception("定时任务不存在")
+
+            if not await task_executor.execute(db, scheduled_task, job=job, handle=handle):
+                raise Exception(scheduled_task.last_error or job.error_message or "执行失败")
+
+    async def _heartbeat(self, job_id: UUID, handle: ExecutionHandle):
+        """定时续租；租约被取消或转移时中断执行"""
+        while True:
+            await asyncio.sleep(settings.QUEUE_HEARTBEAT_INTERVAL)
+            now = datetime.utcnow()
+            try:
+                async with AsyncSessionLocal() as db:
+                    result = await db.execute(
+                        update(Task)
+                        .where(Task.id == job_id, Task.locked_by == self.worker_id)
+                        .values(
+                            heartbeat_at=now,
+                            locked_until=now + timedelta(seconds=settings.QUEUE_VISIBILITY_TIMEOUT),
+                        )
+                        .execution_options(synchronize_session=False)
+                    )
+                    await db.commit()
+            except Exception as e:
+                # 数据库暂时不可用时继续执行，租约到期前还有机会续上
+                logger.warning("task_heartbeat_failed", job_id=str(job_id), error=str(e))
+                continue
+
+            if result.rowcount == 0:
+                handle.interrupt(CANCEL)
+                return
+
+    # ==================== 状态回写 ====================
+
+    async def _complete(self, job_id: UUID):
+        async with AsyncSessionLocal() as db:
+            await db.execute(
+                update(Task)
+                .where(Task.id == job_id, Task.locked_by == self.worker_id)
+                .values(
+                    status=TaskStatus.COMPLETED,
+                    error_message=None,
+                    completed_at=datetime.utcnow(),
+                    locked_by=None,
+                    locked_until=None,
+                )
+                .execution_options(synchronize_session=False)
+            )
+            await db.commit()
+
+    async def _fail(self, job_id: UUID, error: str):
+        """失败处理：未超过重试次数则按指数退避重新排队"""
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Task, job_id)
+            if not job or job.locked_by != self.worker_id:
+                return
+
+            now = datetime.utcnow()
+            retry_count = job.retry_count or 0
+            job.error_message = error
+            job.locked_by = None
+            job.locked_until = None
+
+            if retry_count < settings.SCHEDULER_RETRY_COUNT:
+                delay = settings.SCHEDULER_RETRY_DELAY * 2 ** retry_count
+                job.status = TaskStatus.PENDING
+                job.retry_count = retry_count + 1
+                job.available_at = now + timedelta(seconds=delay)
+                job.completed_at = None
+                logger.info(
+                    "task_retry_scheduled",
+                    job_id=str(job_id),
+                    retry_count=job.retry_count,
+                    delay_seconds=delay,
+                )
+            else:
+                job.status = TaskStatus.FAILED
+                job.completed_at = now
+                logger.warning("task_retries_exhausted", job_id=str(job_id), retry_count=retry_count)
+
+            await db.commit()
+
+    async def _skip(self, job_id: UUID, reason: str):
+        """执行条件不满足（如草稿积压）时跳过：记录原因并标记为已取消，不重试"""
+        async with AsyncSessionLocal() as db:
+            job = await db.get(Task, job_id)
+            if not job or job.locked_by != self.worker_id:
+                return
+
+            job.status = TaskStatus.CANCELLED
+            job.error_message = reason
+            job.payload = {**(job.payload or {}), "skipped": reason}
+            job.completed_at = datetime.utcnow()
+            job.locked_by = None
+            job.locked_until = None
+            await db.commit()
+
+    async def _release(self, job_ids: list[UUID]):
+        """停机时将执行中的任务放回队列，不计入重试次数（检查点保存在 payload 中）"""
+        try:
+            async with AsyncSessionLocal() as db:
+                await db.execute(
+                    update(Task)
+                    .where(Task.id.in_(job_ids), Task.locked_by == self.worker_id)
+                    .values(
+                        status=TaskStatus.PENDING,
+                        available_at=datetime.utcnow(),
+                        locked_by=None,
+                        locked_until=None,
+                    )
+                    .execution_options(synchronize_session=False)
+                )
+                await db.commit()
+        except Exception as e:
+            # 释放失败时等租约过期后由其他 worker 接手
+            logger.warning("task_release_failed", error=str(e))
+
+    # ==================== 统计 ====================
+
+    async def get_stats(self, db: AsyncSession) -> dict:
+        """队列统计：各状态任务数、最早待执行任务的等待时间、本进程 worker 状态"""
+        now = datetime.utcnow()
+        result = await db.execute(
+            select(Task.status, func.count(Task.id))
+            .where(Task.type.in_(HANDLED_TYPES))
+            .group_by(Task.status)
+        )
+        counts = {status.value: count for status, count in result.all()}
+
+        oldest = await db.scalar(
+            select(func.min(Task.available_at)).where(
+                Task.type.in_(HANDLED_TYPES),
+                Task.status == TaskStatus.PENDING,
+                Task.available_at <= now,
+            )
+        )
+
+        return {
+            "counts": counts,
+            "oldest_ready_seconds": (now - oldest).total_seconds() if oldest else 0,
+            "worker": {
+                "worker_id": self.worker_id,
+                "running": self.running,
+                "draining": self.draining,
+                "active_jobs": len(self._active),
+                "concurrency": self.concurrency,
+                "jobs": [handle.to_dict() for handle in self._handles.values()],
+            },
+        }
+
+
+# 全局实例
+task_queue = TaskQueue()
@@ -1,7 +1,9 @@
 """调度服务 - 基于 APScheduler"""
 
 import asyncio
+import json
 import random
+import time as time_module
 from datetime import datetime, timedelta, time
 from uuid import UUID
 from typing import Optional
@@ -11,11 +13,14 @@ from apscheduler.triggers.cron import CronTrigger
 from apscheduler.triggers.interval import IntervalTrigger
 from apscheduler.triggers.date import DateTrigger
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
+from sqlalchemy import select, update, values, column, DateTime
+from sqlalchemy.dialects.postgresql import UUID as PG_UUID
 
+from app.core.config import settings
 from app.core.database import AsyncSessionLocal
 from app.models import ScheduledTask, ScheduleMode
-from app.services.scheduler.executor import task_executor
+from app.services.scheduler.queue import task_queue, MANUAL_PRIORITY
+from app.services.scheduler.planner import SlotPlan, load_planner, local_naive, task_demand
 
 logger = structlog.get_logger()
 
@@ -26,8 +31,13 @@ class SchedulerService:
     def __init__(self):
         self.scheduler: Optional[AsyncIOScheduler] = None
         self.running = False
-        self.semaphore = asyncio.Semaphore(3)  # 最大并发数
-        self._running_tasks: dict[str, asyncio.Task] = {}
+        self.paused = False
+        # task_id -> 调度相关字段签名，用于同步时判断任务是否被修改
+        self._signatures: dict[UUID, tuple] = {}
+        # 到点入队时使用的负载规划，最多每个选主检查间隔重建一次
+        self._plan: SlotPlan | None = None
+        self._plan_built_at = 0.0
+        self._plan_lock = asyncio.Lock()
 
     async def start(self):
         """启动调度器"""
@@ -61,21 +71,108 @@ class SchedulerService:
             self.scheduler.shutdown(wait=False)
             self.scheduler = None
 
+        self._signatures = {}
+        self._plan = None
         self.running = False
+        self.paused = False
         logger.info("scheduler_stopped")
 
     async def _load_tasks(self):
-        """从数据库加载所有活跃任务"""
+        """从数据库加载所有活跃任务（一次查询，下次执行时间一次批量写入）"""
         async with AsyncSessionLocal() as db:
-            result = await db.execute(
-                select(ScheduledTask).where(ScheduledTask.is_active == True)
-            )
-            tasks = result.scalars().all()
+            tasks = await self._get_active_tasks(db)
+            plan = await self._build_plan(db, tasks, {task.id for task in tasks})
+            next_runs = {task.id: await self._add_job(task, plan) for task in tasks}
+            await self._save_next_runs(db, next_runs)
 
-            for task in tasks:
-                await self._add_job(task)
+        logger.info("scheduler_tasks_loaded", count=len(tasks))
 
-            logger.info("scheduler_tasks_loaded", count=len(tasks))
+    async def sync(self):
+        """
+        与数据库同步定时任务
+
+        API 请求可能落在非 leader 进程上，其 add_task / remove_task 不会影响 leader 的调度器，
+        因此 leader 定期比对活跃任务：新增或调度配置变化的重新添加，已停用或删除的移除。
+        """
+        if not self.scheduler:
+            return
+
+        async with AsyncSessionLocal() as db:
+            tasks = await self._get_active_tasks(db)
+
+            changed = [
+                task for task in tasks
+                if self.scheduler.get_job(f"scheduled_task_{task.id}") is None
+                or self._signatures.get(task.id) != self._signature(task)
+            ]
+            if changed:
+                plan = await self._build_plan(db, tasks, {task.id for task in changed})
+                next_runs = {task.id: await self._add_job(task, plan) for task in changed}
+                await self._save_next_runs(db, next_runs)
+                self._plan = None
+
+        for task_id in set(self._signatures) - {task.id for task in tasks}:
+            await self.remove_task(task_id)
+
+    async def _get_active_tasks(self, db: AsyncSession) -> list[ScheduledTask]:
+        result = await db.execute(
+            select(ScheduledTask).where(ScheduledTask.is_active == True)
+        )
+        return list(result.scalars().all())
+
+    async def _build_plan(self, db: AsyncSession, tasks: list[ScheduledTask], replanned: set[UUID]) -> SlotPlan:
+        """当前负载规划；将要重新规划的随机间隔任务不计入旧的下一次时间"""
+        plan, _ = await load_planner.build(db, [
+            task for task in tasks
+            if task.schedule_mode != ScheduleMode.RANDOM_INTERVAL or task.id not in replanned
+        ])
+        return plan
+
+    async def _current_plan(self, db: AsyncSession) -> SlotPlan:
+        """
+        到点入队使用的负载规划
+
+        缓存超过 SCHEDULER_LEADER_INTERVAL 或任务变化后重建；同一时刻触发的多个任务在同一份规划上
+        依次放置（放置与计入之间没有 await），后触发的能看到先触发的负载。
+        """
+        async with self._plan_lock:
+            age = time_module.monotonic() - self._plan_built_at
+            if self._plan is None or age >= settings.SCHEDULER_LEADER_INTERVAL:
+                self._plan, _ = await load_planner.build(db, await self._get_active_tasks(db))
+                self._plan_built_at = time_module.monotonic()
+            return self._plan
+
+    async def _save_next_runs(self, db: AsyncSession, next_runs: dict[UUID, datetime | None]):
+        """批量写入下次执行时间：UPDATE ... FROM (VALUES ...)，一条语句一次提交"""
+        rows = [
+            (task_id, local_naive(next_run))
+            for task_id, next_run in next_runs.items()
+            if next_run is not None
+        ]
+        if not rows:
+            return
+
+        data = values(
+            column("id", PG_UUID(as_uuid=True)),
+            column("next_run_at", DateTime()),
+            name="next_runs",
+        ).data(rows)
+        await db.execute(
+            update(ScheduledTask)
+            .where(ScheduledTask.id == data.c.id)
+            .values(next_run_at=data.c.next_run_at)
+            .execution_options(synchronize_session=False)
+        )
+        await db.commit()
+
+    @staticmethod
+    def _signature(task: ScheduledTask) -> tuple:
+        return (
+            task.schedule_mode,
+            json.dumps(task.schedule_config, sort_keys=True),
+            task.active_start_hour,
+            task.active_end_hour,
+        )
 
     async def add_task(self, task_id: UUID):
         """添加或更新定时任务"""
@@ -93,38 +190,36 @@ class SchedulerService:
                 self.scheduler.remove_job(job_id)
 
             if task.is_active:
-                await self._add_job(task)
+                plan = await self._build_plan(db, await self._get_active_tasks(db), {task.id})
+                await self._save_next_runs(db, {task.id: await self._add_job(task, plan)})
+            self._plan = None
 
     async def remove_task(self, task_id: UUID):
         """移除定时任务"""
         if not self.scheduler:
             return
 
+        self._signatures.pop(task_id, None)
+        self._plan = None
         job_id = f"scheduled_task_{task_id}"
         if self.scheduler.get_job(job_id):
             self.scheduler.remove_job(job_id)
             logger.info("scheduler_job_removed", task_id=str(task_id))
 
     async def trigger_now(self, task_id: UUID) -> bool:
-        """立即执行一次"""
-        async with AsyncSessionLocal() as db:
-            task = await db.get(ScheduledTask, task_id)
-            if not task:
-                return False
-
-            # 在后台执行
-            asyncio.create_task(self._execute_with_limit(task_id))
-            return True
+        """立即执行一次（以较高优先级入队）"""
+        job = await task_queue.enqueue_scheduled(task_id, priority=MANUAL_PRIORITY)
+        return job is not None
 
-    async def _add_job(self, task: ScheduledTask):
-        """添加 APScheduler Job"""
+    async def _add_job(self, task: ScheduledTask, plan: SlotPlan | None = None) -> datetime | None:
+        """添加 APScheduler Job，返回下次执行时间（由调用方批量写入数据库）"""
         if not self.scheduler:
-            return
+            return None
 
         job_id = f"scheduled_task_{task.id}"
 
         # 计算下次执行时间
-        next_run = await self._calculate_next_run(task)
+        next_run = await self._calculate_next_run(task, plan)
 
         if task.schedule_mode == ScheduleMode.CRON:
             # Cron 模式
@@ -145,13 +240,7 @@ class SchedulerService:
             args=[task.id],
             replace_existing=True,
         )
-
-        # 更新数据库中的下次执行时间
-        async with AsyncSessionLocal() as db:
-            db_task = await db.get(ScheduledTask, task.id)
-            if db_task:
-                db_task.next_run_at = next_run
-                await db.commit()
+        self._signatures[task.id] = self._signature(task)
 
         logger.info(
             "scheduler_job_added",
@@ -159,34 +248,56 @@ class SchedulerService:
             task_name=task.name,
             next_run=next_run.isoformat() if next_run else None,
         )
+        return next_run
 
     async def _job_wrapper(self, task_id: UUID):
-        """Job 包装器"""
-        await self._execute_with_limit(task_id)
-
-        # 如果是随机间隔模式，重新调度
+        """Job 包装器：到点后写入任务队列，由 worker 执行；入队和更新下次执行时间共用一个会话"""
         async with AsyncSessionLocal() as db:
             task = await db.get(ScheduledTask, task_id)
-            if task and task.is_active and task.schedule_mode == ScheduleMode.RANDOM_INTERVAL:
-                await self._reschedule_random_interval(task)
+            if not task:
+                return
 
-    async def _execute_with_limit(self, task_id: UUID):
-        """带并发限制的执行"""
-        async with self.semaphore:
-            async with AsyncSessionLocal() as db:
-                task = await db.get(ScheduledTask, task_id)
-                if not task:
-                    return
+            # 按当前负载规划：cron / 固定间隔任务在槽位已满时顺延执行
+            plan = await self._current_plan(db)
+            delay = None
+            if task.schedule_mode != ScheduleMode.RANDOM_INTERVAL:
+                fire_time = datetime.now()
+                # 规划时已放置的触发直接使用放置结果，否则按当前负载放置并计入
+                at = plan.take(task_id, fire_time)
+                if at is None:
+                    demand = task_demand(task)
+                    at = plan.place_delayed(task, fire_time, demand)
+                    plan.add(at, demand)
+                delay = at - fire_time
+                if delay > timedelta(0):
+                    logger.info(
+                        "scheduler_job_delayed",
+                        task_id=str(task_id),
+                        delay_seconds=int(delay.total_seconds()),
+                    )
+                else:
+                    delay = None
+
+            await task_queue.enqueue_scheduled(task_id, db=db, delay=delay)
+
+            if not self.scheduler:
+                return
 
-                await task_executor.execute(db, task)
+            # 随机间隔模式重新调度，其余模式读取 APScheduler 计算的下次执行时间
+            if task.is_active and task.schedule_mode == ScheduleMode.RANDOM_INTERVAL:
+                next_run = await self._reschedule_random_interval(task, plan)
+            else:
+                job = self.scheduler.get_job(f"scheduled_task_{task_id}")
+                next_run = job.next_run_time if job else None
 
-    async def _reschedule_random_interval(self, task: ScheduledTask):
-        """重新调度随机间隔任务"""
-        if not self.scheduler:
-            return
+            if next_run:
+                task.next_run_at = local_naive(next_run)
+                await db.commit()
 
+    async def _reschedule_random_interval(self, task: ScheduledTask, plan: SlotPlan | None = None) -> datetime:
+        """重新调度随机间隔任务，返回下次执行时间"""
         job_id = f"scheduled_task_{task.id}"
-        next_run = await self._calculate_next_run(task)
+        next_run = await self._calculate_next_run(task, plan)
 
         # 移除旧的 job
         if self.scheduler.get_job(job_id):
@@ -200,21 +311,15 @@ class SchedulerService:
             args=[task.id],
         )
 
-        # 更新数据库
-        async with AsyncSessionLocal() as db:
-            db_task = await db.get(ScheduledTask, task.id)
-            if db_task:
-                db_task.next_run_at = next_run
-                await db.commit()
-
         logger.info(
             "scheduler_job_rescheduled",
             task_id=str(task.id),
             next_run=next_run.isoformat(),
         )
+        return next_run
 
-    async def _calculate_next_run(self, task: ScheduledTask) -> datetime:
-        """计算下次执行时间"""
+    async def _calculate_next_run(self, task: ScheduledTask, plan: SlotPlan | None = None) -> datetime:
+        """计算下次执行时间（随机间隔任务有负载规划时选负载最低的槽位）"""
         now = datetime.now()
 
         if task.schedule_mode == ScheduleMode.CRON:
@@ -233,6 +338,19 @@ class SchedulerService:
             config = task.schedule_config
             min_minutes = config.get("min_minutes", 60)
             max_minutes = config.get("max_minutes", 120)
+
+            if plan is not None:
+                demand = task_demand(task)
+                planned = plan.place_in_window(
+                    task,
+                    now + timedelta(minutes=min_minutes),
+                    now + timedelta(minutes=max_minutes),
+                    demand,
+                )
+                if planned:
+                    plan.add(planned, demand)
+                    return planned
+
             interval = random.randint(min_minutes, max_minutes)
             next_time = now + timedelta(minutes=interval)
 
@@ -269,22 +387,22 @@ class SchedulerService:
 
         jobs = self.scheduler.get_jobs()
         return {
-            "running": self.running,
+            "running": self.running and not self.paused,
             "active_tasks": len(jobs),
             "pending_jobs": len([j for j in jobs if j.next_run_time]),
         }
 
-    async def pause_all(self):
-        """暂停所有任务"""
-        if self.scheduler:
+    def set_paused(self, paused: bool):
+        """暂停 / 恢复所有任务（仅作用于本进程的调度器，由 leader 按数据库中的暂停开关调用）"""
+        if not self.scheduler or self.paused == paused:
+            return
+        if paused:
             self.scheduler.pause()
             logger.info("scheduler_paused")
-
-    async def resume_all(self):
-        """恢复所有任务"""
-        if self.scheduler:
+        else:
             self.scheduler.resume()
             logger.info("scheduler_resumed")
+        self.paused = paused
 
 
 # 全局实例
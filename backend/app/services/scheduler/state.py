@@ -0,0 +1,74 @@
+"""
+调度器共享状态 - 暂停开关与 leader 上报
+
+API 请求可能落在任意进程上（独立 worker 部署时 API 进程不运行调度器），
+暂停 / 恢复只写数据库，由 leader 在每次检查时执行；leader 同时上报自身状态，
+状态接口从数据库读取，与请求落在哪个进程无关。
+"""
+
+from datetime import datetime, timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.core.config import settings
+from app.models import SchedulerState
+
+STATE_ID = 1
+
+# 超过该倍数的检查间隔未上报，视为没有 leader
+LEADER_STALE_INTERVALS = 3
+
+
+class SchedulerStateStore:
+    """调度器共享状态"""
+
+    async def _get(self, db: AsyncSession) -> SchedulerState:
+        state = await db.get(SchedulerState, STATE_ID)
+        if state is None:
+            # 迁移已写入该行，仅在缺失时补建
+            state = SchedulerState(id=STATE_ID, paused=False, active_tasks=0, pending_jobs=0)
+            db.add(state)
+            await db.flush()
+        return state
+
+    async def set_paused(self, db: AsyncSession, paused: bool):
+        state = await self._get(db)
+        state.paused = paused
+        await db.commit()
+
+    async def report(self, db: AsyncSession, instance_id: str, status: dict) -> bool:
+        """leader 上报调度器状态，返回暂停开关"""
+        state = await self._get(db)
+        state.leader_instance_id = instance_id
+        state.leader_heartbeat_at = datetime.utcnow()
+        state.active_tasks = status["active_tasks"]
+        state.pending_jobs = status["pending_jobs"]
+        await db.commit()
+        return state.paused
+
+    async def get_status(self, db: AsyncSession) -> dict:
+        """调度器整体状态（running 表示有存活的 leader 且未暂停）"""
+        state = await db.get(SchedulerState, STATE_ID)
+        if state is None:
+            return {
+                "running": False,
+                "paused": False,
+                "active_tasks": 0,
+                "pending_jobs": 0,
+                "leader_instance_id": None,
+                "leader_heartbeat_at": None,
+            }
+
+        stale = timedelta(seconds=settings.SCHEDULER_LEADER_INTERVAL * LEADER_STALE_INTERVALS)
+        alive = bool(state.leader_heartbeat_at and datetime.utcnow() - state.leader_heartbeat_at < stale)
+        return {
+            "running": alive and not state.paused,
+            "paused": state.paused,
+            "active_tasks": state.active_tasks if alive else 0,
+            "pending_jobs": state.pending_jobs if alive else 0,
+            "leader_instance_id": state.leader_instance_id if alive else None,
+            "leader_heartbeat_at": state.leader_heartbeat_at,
+        }
+
+
+# 全局实例
+scheduler_state = SchedulerStateStore()
@@ -1,5 +1,8 @@
 """工作流引擎 - 状态机核心"""
 
+import asyncio
+from datetime import datetime
+from typing import Callable
 from uuid import UUID
 import structlog
 from sqlalchemy.ext.asyncio import AsyncSession
@@ -10,9 +13,11 @@ from app.models.workflow_session import WorkflowSession, WorkflowMode, WorkflowS
 from app.models.prompt import ContentType
 from app.models.workflow_config import WorkflowConfig
 from app.services.workflow.conversation import conversation_mgr
+from app.services.workflow.progress import progress_tracker
 from app.services.workflow.stages import GenerateStage, OptimizeStage, ImageStage, EditStage
 from app.services.workflow.stages.base import BaseStage, StageResult
-from app.core.exceptions import AIServiceException
+from app.core.config import settings
+from app.core.exceptions import AIServiceException, AccountUnavailableException, TaskInterruptedException
 
 logger = structlog.get_logger()
 
@@ -91,7 +96,7 @@ class WorkflowEngine:
             content_type=content_type,
             current_stage=WorkflowStage.GENERATE,
             stage_data=stage_data,
-            progress="0",
+            progress=0,
         )
         db.add(session)
         await db.commit()
@@ -240,9 +245,7 @@ class WorkflowEngine:
 
             # 保存当前阶段快照
             snapshot = await handler.snapshot(db, session)
-            if session.stage_data is None:
-                session.stage_data = {}
-            session.stage_data[session.current_stage.value] = snapshot
+            session.stage_data = {**(session.stage_data or {}), session.current_stage.value: snapshot}
             logger.info(
                 "workflow_next_stage_snapshot_saved",
                 session_id=str(session_id),
@@ -255,7 +258,7 @@ class WorkflowEngine:
             raise AIServiceException("已经是最终阶段")
 
         session.current_stage = next_stage
-        session.progress = str(self.STAGE_PROGRESS.get(next_stage, 0))
+        session.progress = self.STAGE_PROGRESS.get(next_stage, 0)
 
         await db.commit()
 
@@ -326,13 +329,20 @@ class WorkflowEngine:
         self,
         db: AsyncSession,
         session_id: UUID,
+        allow_publish: bool = True,
+        checkpoint: Callable[[str], None] | None = None,
     ) -> dict:
         """
         执行全自动流程
 
+        各阶段完成后将快照写入 stage_data；再次执行同一会话时跳过已有快照的阶段，
+        从中断的阶段继续。
+
         Args:
             db: 数据库会话
             session_id: 工作流会话ID
+            allow_publish: 是否允许按配置自动发布（调用方自行发布或预生成库存时传 False）
+            checkpoint: 每个阶段开始前调用，传入阶段名；抛出 TaskInterruptedException 时中断流程
 
         Returns:
             dict: 执行结果
@@ -350,7 +360,8 @@ class WorkflowEngine:
         config = await self._get_workflow_config(db, session.content_type)
         enable_optimize = config.enable_optimize if config else True
         enable_image_gen = config.enable_image_gen if config else True
-        enable_auto_publish = config.enable_auto_publish if config else False
+        enable_auto_publish = (config.enable_auto_publish if config else False) and allow_publish
+        enable_progressive_image = config.enable_progressive_image if config else False
 
         logger.info(
             "workflow_auto_config",
@@ -358,63 +369,84 @@ class WorkflowEngine:
             enable_optimize=enable_optimize,
             enable_image_gen=enable_image_gen,
             enable_auto_publish=enable_auto_publish,
+            enable_progressive_image=enable_progressive_image,
         )
 
+        completed = set(session.stage_data or {})
+        if completed & {"generate", "optimize", "image", "edit"}:
+            logger.info(
+                "workflow_auto_resume",
+                session_id=str(session_id),
+                completed_stages=sorted(completed),
+            )
+
+        def enter(stage: str):
+            if checkpoint:
+                checkpoint(stage)
+
+        # 执行期间进度以内存为准，阶段完成时随快照落盘
+        progress_tracker.start(session)
         try:
             # 阶段1: 生成文章 (25%)
-            logger.info("workflow_auto_stage_generate_start", session_id=str(session_id))
-            session.current_stage = WorkflowStage.GENERATE
-            session.progress = "10"
-            await db.commit()
+            enter("generate")
+            if "generate" not in completed:
+                logger.info("workflow_auto_stage_generate_start", session_id=str(session_id))
+                await self._advance(db, session, 10, WorkflowStage.GENERATE)
 
-            generate_handler = self.STAGE_HANDLERS[WorkflowStage.GENERATE]
-            gen_result = await generate_handler.auto_execute(db, session)
+                generate_handler = self.STAGE_HANDLERS[WorkflowStage.GENERATE]
+                gen_result = await generate_handler.auto_execute(db, session)
 
-            snapshot = await generate_handler.snapshot(db, session)
-            session.stage_data = session.stage_data or {}
-            session.stage_data["generate"] = snapshot
-            session.progress = "25"
-            await db.commit()
-            logger.info(
-                "workflow_auto_stage_generate_done",
-                session_id=str(session_id),
-                article_title=article.title[:50] if article.title else "(empty)",
-            )
+                snapshot = await generate_handler.snapshot(db, session)
+                self._save_snapshot(session, "generate", snapshot)
+                await self._advance(db, session, 25, flush=True)
+                logger.info(
+                    "workflow_auto_stage_generate_done",
+                    session_id=str(session_id),
+                    article_title=article.title[:50] if article.title else "(empty)",
+                )
 
             # 阶段2: 优化文章 (50%) - 根据配置决定是否执行
-            if enable_optimize:
+            enter("optimize")
+            if "optimize" in completed:
+                pass  # 续跑：该阶段已完成
+            elif enable_optimize:
                 logger.info("workflow_auto_stage_optimize_start", session_id=str(session_id))
-                session.current_stage = WorkflowStage.OPTIMIZE
-                session.progress = "30"
-                await db.commit()
+                await self._advance(db, session, 30, WorkflowStage.OPTIMIZE)
 
                 optimize_handler = self.STAGE_HANDLERS[WorkflowStage.OPTIMIZE]
                 opt_result = await optimize_handler.auto_execute(db, session)
 
                 snapshot = await optimize_handler.snapshot(db, session)
-                session.stage_data["optimize"] = snapshot
-                session.progress = "50"
-                await db.commit()
+                self._save_snapshot(session, "optimize", snapshot)
+                await self._advance(db, session, 50, flush=True)
                 logger.info("workflow_auto_stage_optimize_done", session_id=str(session_id))
             else:
                 logger.info("workflow_auto_stage_optimize_skipped", session_id=str(session_id))
-                session.progress = "50"
-                await db.commit()
+                await self._advance(db, session, 50)
 
             # 阶段3: 图片生成 (75%) - 根据配置决定是否执行
-            if enable_image_gen:
+            enter("image")
+            if "image" in completed:
+                pass  # 续跑：该阶段已完成
+            elif enable_image_gen:
                 logger.info("workflow_auto_stage_image_start", session_id=str(session_id))
-                session.current_stage = WorkflowStage.IMAGE
-                session.progress = "60"
-                await db.commit()
+                await self._advance(db, session, 60, WorkflowStage.IMAGE)
 
+                # 图片阶段总预算，逐张请求共享该截止时间
+                deadline = asyncio.get_running_loop().time() + settings.IMAGE_STAGE_BUDGET
                 image_handler = self.STAGE_HANDLERS[WorkflowStage.IMAGE]
-                img_result = await image_handler.auto_execute(db, session)
+                img_result = await image_handler.auto_execute(
+                    db,
+                    session,
+                    deadline=deadline,
+                    progressive=enable_progressive_image,
+                    cutoff=config.progressive_image_cutoff if config else 60,
+                    background=config.enable_background_image if config else True,
+                )
 
                 snapshot = await image_handler.snapshot(db, session)
-                session.stage_data["image"] = snapshot
-                session.progress = "75"
-                await db.commit()
+                self._save_snapshot(session, "image", snapshot)
+                await self._advance(db, session, 75, flush=True)
                 logger.info(
                     "workflow_auto_stage_image_done",
                     session_id=str(session_id),
@@ -422,48 +454,37 @@ class WorkflowEngine:
                 )
             else:
                 logger.info("workflow_auto_stage_image_skipped", session_id=str(session_id))
-                session.progress = "75"
-                await db.commit()
+                await self._advance(db, session, 75)
 
             # 阶段4: 编辑阶段 (90%)
-            logger.info("workflow_auto_stage_edit_start", session_id=str(session_id))
-            session.current_stage = WorkflowStage.EDIT
-            session.progress = "80"
-            await db.commit()
+            enter("edit")
+            if "edit" not in completed:
+                logger.info("workflow_auto_stage_edit_start", session_id=str(session_id))
+                await self._advance(db, session, 80, WorkflowStage.EDIT)
 
-            edit_handler = self.STAGE_HANDLERS[WorkflowStage.EDIT]
-            edit_result = await edit_handler.auto_execute(db, session)
+                edit_handler = self.STAGE_HANDLERS[WorkflowStage.EDIT]
+                edit_result = await edit_handler.auto_execute(db, session)
 
-            snapshot = await edit_handler.snapshot(db, session)
-            session.stage_data["edit"] = snapshot
-            session.progress = "90"
-            await db.commit()
-            logger.info("workflow_auto_stage_edit_done", session_id=str(session_id))
+                snapshot = await edit_handler.snapshot(db, session)
+                self._save_snapshot(session, "edit", snapshot)
+                await self._advance(db, session, 90, flush=True)
+                logger.info("workflow_auto_stage_edit_done", session_id=str(session_id))
 
             # 阶段5: 自动发布 - 根据配置决定是否执行
+            enter("publish")
             if enable_auto_publish:
                 logger.info("workflow_auto_stage_publish_start", session_id=str(session_id))
-                session.progress = "95"
-                await db.commit()
+                await self._advance(db, session, 95)
 
                 try:
                     from app.services.publisher import publisher
-                    from app.services.docx_generator import docx_generator
-                    from app.models.account import Account, AccountStatus
-
-                    # 获取活跃账号
-                    result = await db.execute(
-                        select(Account).where(Account.status == AccountStatus.ACTIVE).limit(1)
-                    )
-                    account = result.scalar_one_or_none()
+                    from app.services.publish_bundle import publish_bundle_service
+                    from app.services.account_selector import account_selector
 
-                    if account and account.cookies:
-                        # 生成 DOCX
-                        docx_path = await docx_generator.generate(
-                            title=article.title if session.content_type == ContentType.ARTICLE else "",
-                            content=article.content,
-                            images=article.images or [],
-                        )
+                    # 在可用账号中选最久未发布的，租用期间其他 worker 不会使用该账号
+                    async with account_selector.lease(db) as account:
+                        # 获取发布包（定稿时已预构建）
+                        bundle = await publish_bundle_service.ensure(db, article)
 
                         # 发布
                         import json
@@ -473,27 +494,33 @@ class WorkflowEngine:
                             publish_result = await publisher.publish_weitoutiao(
                                 content=article.content,
                                 cookies=cookies,
-                                images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                                docx_path=docx_path,
-                                tags=article.tags if article.tags else None,
+                                images=[img["path"] for img in bundle["images"]],
+                                docx_path=bundle["docx_path"],
+                                tags=bundle["tags"] or None,
+                                account_id=account.id,
                             )
                         else:
                             publish_result = await publisher.publish_to_toutiao(
                                 title=article.title,
                                 content=article.content,
                                 cookies=cookies,
-                                images=[img.get("path") for img in (article.images or []) if img.get("path")],
-                                docx_path=docx_path,
-                                tags=article.tags if article.tags else None,
+                                images=[img["path"] for img in bundle["images"]],
+                                docx_path=bundle["docx_path"],
+                                tags=bundle["tags"] or None,
+                                account_id=account.id,
                             )
 
+                        await account_selector.record_result(account, bool(publish_result.get("success")))
                         if publish_result.get("success"):
                             article.status = ArticleStatus.PUBLISHED
                             article.publish_url = publish_result.get("url", "")
+                            article.account_id = account.id
+                            article.published_at = datetime.utcnow()
                             logger.info(
                                 "workflow_auto_publish_success",
                                 session_id=str(session_id),
                                 article_id=str(article.id),
+                                account_id=str(account.id),
                             )
                         else:
                             logger.warning(
@@ -501,11 +528,13 @@ class WorkflowEngine:
                                 session_id=str(session_id),
                                 error=publish_result.get("message"),
                             )
-                    else:
-                        logger.warning(
-                            "workflow_auto_publish_no_account",
-                            session_id=str(session_id),
-                        )
+                        await db.commit()
+                except AccountUnavailableException as e:
+                    logger.warning(
+                        "workflow_auto_publish_no_account",
+                        session_id=str(session_id),
+                        reason=e.detail,
+                    )
                 except Exception as pub_error:
                     logger.error(
                         "workflow_auto_publish_error",
@@ -518,8 +547,15 @@ class WorkflowEngine:
 
             # 完成
             session.current_stage = WorkflowStage.COMPLETED
-            session.progress = "100"
+            session.progress = 100
             await db.commit()
+            progress_tracker.finish(session.id, "completed", {
+                "stage": session.current_stage.value,
+                "progress": 100,
+                "article_id": str(article.id),
+                "title": article.title,
+                "content_preview": article.content[:200] + "..." if article.content else "",
+            })
 
             logger.info(
                 "workflow_auto_completed",
@@ -537,9 +573,23 @@ class WorkflowEngine:
                 "stage": "completed",
             }
 
+        except TaskInterruptedException:
+            # 已完成阶段的快照已提交，由调用方决定是否续跑
+            logger.info(
+                "workflow_auto_interrupted",
+                session_id=str(session_id),
+                current_stage=session.current_stage.value,
+            )
+            raise
+
         except Exception as e:
             session.error_message = str(e)
             await db.commit()
+            progress_tracker.finish(session.id, "failed", {
+                "stage": session.current_stage.value,
+                "progress": session.progress,
+                "error": str(e),
+            })
 
             logger.error(
                 "workflow_auto_failed",
@@ -553,6 +603,33 @@ class WorkflowEngine:
                 "error": str(e),
             }
 
+        finally:
+            # 被中断或取消时不推送结束事件，状态以数据库为准
+            progress_tracker.finish(session.id)
+
+    async def _advance(
+        self,
+        db: AsyncSession,
+        session: WorkflowSession,
+        progress: int,
+        stage: WorkflowStage | None = None,
+        flush: bool = False,
+    ):
+        """
+        更新进度（传入 stage 时同时进入该阶段）并推送事件
+
+        只在 flush（阶段完成，需要保存快照）或距上次落盘超过 WORKFLOW_PROGRESS_FLUSH_INTERVAL 时提交，
+        其余进度随阶段处理器自身的事务一起落盘。
+        """
+        progress_tracker.update(session, progress, stage)
+        if flush or progress_tracker.flush_due(session.id):
+            await db.commit()
+            progress_tracker.mark_flushed(session.id)
+
+    def _save_snapshot(self, session: WorkflowSession, stage: str, snapshot: dict):
+        """写入阶段快照（JSONB 列需整体赋值才会被检测为已修改）"""
+        session.stage_data = {**(session.stage_data or {}), stage: snapshot}
+
     async def get_session_status(
         self,
         db: AsyncSession,
@@ -568,6 +645,11 @@ class WorkflowEngine:
         Returns:
             dict: 会话状态
         """
+        # 本进程内执行中的会话直接返回内存中的进度
+        live = progress_tracker.get_status(session_id)
+        if live is not None:
+            return live
+
         session = await self._get_session(db, session_id)
         article = await db.get(Article, session.article_id)
 
@@ -582,7 +664,7 @@ class WorkflowEngine:
             "article_id": str(session.article_id),
             "stage": session.current_stage.value,
             "mode": session.mode.value,
-            "progress": int(session.progress or 0),
+            "progress": session.progress,
             "status": status,
             "error": session.error_message,
         }
@@ -620,7 +702,7 @@ class WorkflowEngine:
             "article_id": str(session.article_id),
             "stage": session.current_stage.value,
             "mode": session.mode.value,
-            "progress": int(session.progress or 0),
+            "progress": session.progress,
             "stage_data": session.stage_data,
             "error": session.error_message,
             "created_at": session.created_at.isoformat(),
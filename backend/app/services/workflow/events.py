@@ -0,0 +1,59 @@
+"""
+工作流事件总线 - 进程内推送全自动流程的进度
+
+进度跟踪（progress.py）在 execute_auto 推进时发布事件，SSE 接口订阅后直接转发给前端，
+执行期间不再轮询数据库。
+事件类型：
+- stage: 进入新阶段
+- progress: 阶段内进度变化
+- completed: 流程完成（结束事件）
+- failed: 流程失败（结束事件；不用 error，避免与浏览器 EventSource 的连接错误事件同名）
+
+总线只覆盖本进程内执行的会话；会话在其他进程执行时，由 SSE 接口低频回退读库。
+执行中会话的最新状态由进度跟踪保存，总线本身不保留事件。
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from uuid import UUID
+
+# 结束事件，发出后订阅方关闭连接
+TERMINAL_EVENTS = ("completed", "failed")
+
+# 单个订阅队列的长度上限，消费过慢时丢弃最旧的事件（进度事件后者覆盖前者）
+SUBSCRIBER_QUEUE_SIZE = 100
+
+
+class WorkflowEventBus:
+    """工作流事件总线"""
+
+    def __init__(self):
+        self._subscribers: dict[str, set[asyncio.Queue]] = {}
+
+    def publish(self, session_id: UUID | str, event: str, data: dict):
+        key = str(session_id)
+        message = {"event": event, "data": {"session_id": key, **data}}
+        for queue in self._subscribers.get(key, ()):
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    @asynccontextmanager
+    async def subscribe(self, session_id: UUID | str) -> AsyncIterator[asyncio.Queue]:
+        """订阅会话事件，退出时取消订阅"""
+        key = str(session_id)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(key, set()).add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[key]
+
+
+# 全局实例
+workflow_events = WorkflowEventBus()
@@ -0,0 +1,112 @@
+"""
+工作流进度跟踪 - 执行中会话的进度以内存为准
+
+全自动流程执行期间，进度与当前阶段先写入本进程的跟踪表并推送事件，
+只在阶段完成（快照落盘）或距上次落盘超过 WORKFLOW_PROGRESS_FLUSH_INTERVAL 时随事务提交；
+状态接口与 SSE 接口对本进程内执行中的会话直接读取跟踪表，不读数据库。
+流程结束（完成、失败或被中断）时移除跟踪，之后以数据库为准。
+"""
+
+import time
+from uuid import UUID
+
+from app.core.config import settings
+from app.models.workflow_session import WorkflowSession, WorkflowStage
+from app.services.workflow.events import workflow_events
+
+
+class ProgressTracker:
+    """执行中会话的进度跟踪"""
+
+    def __init__(self):
+        self._live: dict[str, dict] = {}
+
+    def start(self, session: WorkflowSession):
+        """开始跟踪（execute_auto 开始时调用）"""
+        self._live[str(session.id)] = {
+            "session_id": str(session.id),
+            "article_id": str(session.article_id),
+            "mode": session.mode.value,
+            "stage": session.current_stage.value,
+            "progress": session.progress,
+            "event": "progress",
+            "flushed_at": time.monotonic(),
+        }
+
+    def update(self, session: WorkflowSession, progress: int, stage: WorkflowStage | None = None):
+        """
+        更新进度（写入会话对象，由调用方或后续事务提交）并推送事件
+
+        传入 stage 时同时进入该阶段，推送 stage 事件；未跟踪的会话（半自动模式）只更新会话对象。
+        """
+        if stage is not None:
+            session.current_stage = stage
+        session.progress = progress
+
+        entry = self._live.get(str(session.id))
+        if entry is None:
+            return
+        entry["stage"] = session.current_stage.value
+        entry["progress"] = progress
+        entry["event"] = "stage" if stage is not None else "progress"
+        workflow_events.publish(session.id, entry["event"], {
+            "stage": entry["stage"],
+            "progress": progress,
+        })
+
+    def flush_due(self, session_id: UUID | str) -> bool:
+        """距上次落盘是否已超过落盘间隔"""
+        entry = self._live.get(str(session_id))
+        return entry is not None and time.monotonic() - entry["flushed_at"] >= settings.WORKFLOW_PROGRESS_FLUSH_INTERVAL
+
+    def mark_flushed(self, session_id: UUID | str):
+        entry = self._live.get(str(session_id))
+        if entry is not None:
+            entry["flushed_at"] = time.monotonic()
+
+    def finish(self, session_id: UUID | str, event: str | None = None, data: dict | None = None):
+        """
+        结束跟踪（调用前会话状态应已提交）
+
+        传入 event 时推送结束事件（completed / failed）；被中断时不推送，订阅方回退读库。
+        """
+        self._live.pop(str(session_id), None)
+        if event:
+            workflow_events.publish(session_id, event, data or {})
+
+    def is_live(self, session_id: UUID | str) -> bool:
+        """会话是否正在本进程内执行"""
+        return str(session_id) in self._live
+
+    def get_status(self, session_id: UUID | str) -> dict | None:
+        """执行中会话的状态（与 get_session_status 返回格式一致），未跟踪时返回 None"""
+        entry = self._live.get(str(session_id))
+        if entry is None:
+            return None
+        return {
+            "session_id": entry["session_id"],
+            "article_id": entry["article_id"],
+            "stage": entry["stage"],
+            "mode": entry["mode"],
+            "progress": entry["progress"],
+            "status": "processing",
+            "error": None,
+        }
+
+    def get_event(self, session_id: UUID | str) -> dict | None:
+        """执行中会话的最新事件，供后连接的订阅方补发"""
+        entry = self._live.get(str(session_id))
+        if entry is None:
+            return None
+        return {
+            "event": entry["event"],
+            "data": {
+                "session_id": entry["session_id"],
+                "stage": entry["stage"],
+                "progress": entry["progress"],
+            },
+        }
+
+
+# 全局实例
+progress_tracker = ProgressTracker()
@@ -11,7 +11,10 @@ from app.models.workflow_session import WorkflowSession
 from app.models import Article
 from app.models.ai_config import AIConfig, AIConfigType
 from app.core.exceptions import AIServiceException
-from app.services.docx_generator import docx_generator
+from app.models.article_document import ArticleDocument
+from app.services.docx_render_service import docx_render_service
+from app.services.publish_bundle import publish_bundle_service
+from app.services.resource_pools import resource_pools
 
 logger = structlog.get_logger()
 
@@ -46,13 +49,12 @@ class EditStage(BaseStage):
         )
         return result.scalar_one_or_none()
 
-    def _generate_docx(self, article: Article) -> str:
+    async def _generate_docx(self, article: Article) -> str:
         """生成 DOCX 预览文件"""
-        return docx_generator.create_preview_docx(
+        return await docx_render_service.generate(
             title=article.title,
             content=article.content,
             images=article.images if article.images else None,
-            article_id=str(article.id),
         )
 
     def _parse_user_intent(self, message: str) -> dict:
@@ -97,46 +99,44 @@ class EditStage(BaseStage):
     async def _edit_paragraph(
         self,
         db: AsyncSession,
-        content: str,
+        document: ArticleDocument,
         para_num: int,
         request: str,
     ) -> str:
-        """使用 AI 修改指定段落"""
+        """使用 AI 修改指定段落，返回修改后的正文"""
         config = await self._get_ai_config(db)
         if not config or not config.api_key:
-            return content
+            return document.content
 
-        paragraphs = content.split('\n')
-        if para_num < 1 or para_num > len(paragraphs):
-            return content
-
-        target_para = paragraphs[para_num - 1]
+        target_para = document.paragraph_text(para_num)
+        if target_para is None:
+            return document.content
 
         client = AsyncOpenAI(api_key=config.api_key, base_url=config.api_url or None)
 
         try:
-            response = await client.chat.completions.create(
-                model=config.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是文章编辑专家。根据用户要求修改指定段落，只返回修改后的段落文本，不要返回其他内容。"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"原段落：\n{target_para}\n\n用户要求：{request}\n\n请返回修改后的段落："
-                    },
-                ],
-                temperature=0.7,
-            )
+            async with resource_pools.llm.acquire():
+                response = await client.chat.completions.create(
+                    model=config.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "你是文章编辑专家。根据用户要求修改指定段落，只返回修改后的段落文本，不要返回其他内容。"
+                        },
+                        {
+                            "role": "user",
+                            "content": f"原段落：\n{target_para}\n\n用户要求：{request}\n\n请返回修改后的段落："
+                        },
+                    ],
+                    temperature=0.7,
+                )
 
             new_para = response.choices[0].message.content.strip()
-            paragraphs[para_num - 1] = new_para
-            return '\n'.join(paragraphs)
+            return document.replace_paragraph(para_num, new_para)
 
         except Exception as e:
             logger.error("edit_paragraph_error", error=str(e))
-            return content
+            return document.content
 
     async def process(
         self,
@@ -154,11 +154,11 @@ class EditStage(BaseStage):
         # 首次进入：生成预览并提示
         if not history:
             try:
-                docx_path = self._generate_docx(article)
+                docx_path = await self._generate_docx(article)
                 docx_url = f"/api/v1/articles/{article.id}/preview-docx"
 
                 image_count = len(article.images) if article.images else 0
-                para_count = len([p for p in article.content.split('\n') if p.strip()])
+                para_count = article.document.paragraph_count
 
                 return StageResult(
                     reply=f"已生成预览文档，包含：\n- 标题：{article.title}\n- 正文：{para_count} 段\n- 配图：{image_count} 张\n\n您可以：\n- 点击「下载预览文档」查看完整效果\n- 输入「修改标题为 xxx」调整标题\n- 输入「修改第N段 + 要求」调整内容\n- 输入「确认完成」结束编辑",
@@ -186,7 +186,7 @@ class EditStage(BaseStage):
         # 下载预览
         if action == "download":
             try:
-                docx_path = self._generate_docx(article)
+                docx_path = await self._generate_docx(article)
                 docx_url = f"/api/v1/articles/{article.id}/preview-docx"
 
                 return StageResult(
@@ -208,14 +208,12 @@ class EditStage(BaseStage):
 
         # 确认完成
         if action == "confirm":
-            # 生成最终 DOCX
+            # 构建发布包（含最终 DOCX）
             try:
-                final_docx_path = self._generate_docx(article)
+                bundle = await publish_bundle_service.ensure(db, article)
 
                 # 保存路径到 stage_data
-                stage_data = session.stage_data or {}
-                stage_data["final_docx_path"] = final_docx_path
-                session.stage_data = stage_data
+                session.stage_data = {**(session.stage_data or {}), "final_docx_path": bundle["docx_path"]}
                 await db.commit()
 
                 return StageResult(
@@ -273,19 +271,20 @@ class EditStage(BaseStage):
             para_num = intent.get("paragraph", 1)
             request = intent.get("request", "")
 
-            paragraphs = article.content.split('\n')
-            if para_num < 1 or para_num > len(paragraphs):
+            paragraph_count = article.document.paragraph_count
+            if para_num < 1 or para_num > paragraph_count:
                 return StageResult(
-                    reply=f"文章共有 {len(paragraphs)} 段，请指定有效的段落号。",
+                    reply=f"文章共有 {paragraph_count} 段，请指定有效的段落号。",
                     can_proceed=True,
                     suggestions=self.default_suggestions,
                 )
 
-            new_content = await self._edit_paragraph(db, article.content, para_num, request)
+            new_content = await self._edit_paragraph(db, article.document, para_num, request)
             article.content = new_content
+            article.refresh_structure()
             await db.commit()
 
-            new_para = new_content.split('\n')[para_num - 1]
+            new_para = article.document.paragraph_text(para_num)
             return StageResult(
                 reply=f"第 {para_num} 段已修改：\n\n{new_para[:200]}{'...' if len(new_para) > 200 else ''}",
                 can_proceed=True,
@@ -300,7 +299,7 @@ class EditStage(BaseStage):
         if action == "edit_content":
             request = intent.get("request", user_message)
             return StageResult(
-                reply=f"请告诉我您想修改哪个部分：\n- 「修改标题为 xxx」\n- 「修改第N段 + 具体要求」\n\n当前文章共 {len(article.content.split(chr(10)))} 段。",
+                reply=f"请告诉我您想修改哪个部分：\n- 「修改标题为 xxx」\n- 「修改第N段 + 具体要求」\n\n当前文章共 {article.document.paragraph_count} 段。",
                 can_proceed=True,
                 suggestions=["修改标题", "修改第1段", "修改第2段", "确认完成"],
             )
@@ -317,18 +316,17 @@ class EditStage(BaseStage):
         db: AsyncSession,
         session: WorkflowSession,
     ) -> StageResult:
-        """自动模式执行（跳过编辑，直接生成最终文档）"""
+        """自动模式执行（跳过编辑，直接构建发布包）"""
         article = await db.get(Article, session.article_id)
         if not article:
             raise AIServiceException("关联文章不存在")
 
         try:
-            docx_path = self._generate_docx(article)
+            bundle = await publish_bundle_service.ensure(db, article)
+            docx_path = bundle["docx_path"]
 
             # 保存路径
-            stage_data = session.stage_data or {}
-            stage_data["final_docx_path"] = docx_path
-            session.stage_data = stage_data
+            session.stage_data = {**(session.stage_data or {}), "final_docx_path": docx_path}
             await db.commit()
 
             logger.info(
@@ -12,6 +12,8 @@ from app.models import Article
 from app.models.prompt import Prompt, PromptType, ContentType
 from app.models.ai_config import AIConfig, AIConfigType
 from app.core.exceptions import AIServiceException
+from app.models.article_document import ArticleDocument
+from app.services.resource_pools import resource_pools
 
 logger = structlog.get_logger()
 
@@ -38,7 +40,7 @@ class GenerateStage(BaseStage):
             "扩展或精简某个部分",
         ]
 
-    def _normalize_image_prompts(self, raw_prompts: list, paragraph_count: int) -> list[dict]:
+    def _normalize_image_prompts(self, raw_prompts: list, document: ArticleDocument) -> list[dict]:
         """
         规范化 image_prompts 格式
 
@@ -47,7 +49,7 @@ class GenerateStage(BaseStage):
 
         Args:
             raw_prompts: AI 返回的原始 image_prompts
-            paragraph_count: 文章段落数，用于验证位置有效性
+            document: 文章结构，用于验证位置有效性
 
         Returns:
             规范化后的 image_prompts 列表
@@ -73,20 +75,8 @@ class GenerateStage(BaseStage):
                 if not description:
                     continue
 
-                position = item.get("position", "end")
-
                 # 验证并规范化位置
-                if position == "cover" or position == "end":
-                    pass
-                elif isinstance(position, str) and position.startswith("after_paragraph:"):
-                    try:
-                        para_num = int(position.split(":")[1])
-                        if para_num < 1 or para_num > paragraph_count:
-                            position = "end"
-                    except (ValueError, IndexError):
-                        position = "end"
-                else:
-                    position = "end"
+                position = document.normalize_position(item.get("position", "end"))
 
                 normalized.append({
                     "description": description,
@@ -101,13 +91,6 @@ class GenerateStage(BaseStage):
 
         return normalized
 
-    def _count_paragraphs(self, content: str) -> int:
-        """统计文章段落数"""
-        if not content:
-            return 0
-        paragraphs = [p.strip() for p in content.split('\n') if p.strip()]
-        return len(paragraphs)
-
     def _normalize_tags(self, raw_tags: list) -> list[str]:
         """
         规范化标签格式
@@ -190,12 +173,13 @@ class GenerateStage(BaseStage):
         all_messages = [{"role": "system", "content": system_prompt}] + messages
 
         try:
-            response = await client.chat.completions.create(
-                model=config.model,
-                messages=all_messages,
-                temperature=0.7,
-                response_format={"type": "json_object"},
-            )
+            async with resource_pools.llm.acquire():
+                response = await client.chat.completions.create(
+                    model=config.model,
+                    messages=all_messages,
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                )
 
             content = response.choices[0].message.content
             # 清理 markdown 代码块
@@ -262,12 +246,12 @@ class GenerateStage(BaseStage):
         # 更新文章
         article.title = result.get("title", article.title)
         article.content = result.get("content", article.content)
+        article.refresh_structure()
 
         # 规范化 image_prompts 格式
         if "image_prompts" in result:
-            paragraph_count = self._count_paragraphs(article.content)
             article.image_prompts = self._normalize_image_prompts(
-                result["image_prompts"], paragraph_count
+                result["image_prompts"], article.document
             )
 
         # 保存标签
@@ -340,11 +324,11 @@ class GenerateStage(BaseStage):
         # 更新文章
         article.title = result.get("title", "")
         article.content = result.get("content", "")
+        article.refresh_structure()
 
         # 规范化 image_prompts 格式
-        paragraph_count = self._count_paragraphs(article.content)
         article.image_prompts = self._normalize_image_prompts(
-            result.get("image_prompts", []), paragraph_count
+            result.get("image_prompts", []), article.document
         )
 
         # 保存标签
@@ -1,6 +1,8 @@
 """图片生成阶段处理器"""
 
+import asyncio
 import json
+import os
 import re
 from openai import AsyncOpenAI
 import structlog
@@ -9,17 +11,45 @@ from sqlalchemy import select
 
 from app.services.workflow.stages.base import BaseStage, StageResult
 from app.models.workflow_session import WorkflowSession
-from app.models import Article
+from app.models import Article, ArticleStatus
 from app.models.prompt import Prompt, PromptType, ContentType
 from app.models.ai_config import AIConfig, AIConfigType
+from app.core.config import settings
+from app.core.database import AsyncSessionLocal
 from app.core.exceptions import AIServiceException
 from app.services import image_gen
+from app.services.resource_pools import resource_pools
+from app.services.workflow.progress import progress_tracker
 
 logger = structlog.get_logger()
 
 # 最大图片数量限制
 MAX_IMAGES = 5
 
+# 渐进模式下截止后仍在后台生成的任务（持有引用，防止被回收）
+_background_renders: set[asyncio.Task] = set()
+
+
+async def drain_background_renders(timeout: float | None = None):
+    """
+    停机时等待后台插图生成完成，超时（默认 QUEUE_DRAIN_TIMEOUT 秒）后取消剩余任务
+
+    每张图片在独立事务中写入，取消只会丢弃尚未完成的图片。
+    """
+    tasks = list(_background_renders)
+    if not tasks:
+        return
+    if timeout is None:
+        timeout = settings.QUEUE_DRAIN_TIMEOUT
+    logger.info("image_background_renders_draining", count=len(tasks), timeout=timeout)
+    _, pending = await asyncio.wait(tasks, timeout=timeout)
+    if pending:
+        logger.warning("image_background_renders_cancelled", count=len(pending))
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
 class ImageStage(BaseStage):
     """
     图片生成阶段处理器
@@ -68,10 +98,268 @@ class ImageStage(BaseStage):
             raise AIServiceException(f"未配置{content_type_name}图片生成提示词，请在「提示词模板」中添加类型为 IMAGE 的提示词")
         return prompt.content
 
-    def _count_paragraphs(self, content: str) -> int:
-        """统计文章段落数"""
-        paragraphs = [p.strip() for p in content.split('\n') if p.strip()]
-        return len(paragraphs)
+    def _pending_indices(self, article: Article, prompts: list[dict]) -> list[int]:
+        """
+        获取尚未生成的图片序号
+
+        已有图片的描述与当前提示词一致且文件仍存在时视为已完成，
+        批量生成中途中断后重新执行只会补齐缺失的序号。
+        """
+        done = set()
+        for img in article.images or []:
+            idx = img.get("index")
+            if idx is None or idx >= len(prompts):
+                continue
+            if img.get("prompt", "") != prompts[idx].get("description", ""):
+                continue
+            path = img.get("path")
+            if path and os.path.exists(path):
+                done.add(idx)
+        return [i for i in range(len(prompts)) if i not in done]
+
+    def _merge_image(self, article: Article, prompts: list[dict], index: int, result: dict) -> dict:
+        """
+        将单张生成结果合并进 article.images（同序号替换）
+
+        提示词减少后，序号超出当前提示词数量的旧图片一并移除，不再随文章发布。
+        """
+        prompt_item = prompts[index] if index < len(prompts) else {"position": "end", "description": ""}
+        new_image = {
+            "url": result["url"],
+            "path": result["path"],
+            "position": prompt_item.get("position", "end"),
+            "prompt": prompt_item.get("description", ""),
+            "index": index,
+        }
+        images = [
+            img for img in (article.images or [])
+            if img.get("index") != index
+            and (img.get("index") is None or img["index"] < len(prompts))
+        ]
+        images.append(new_image)
+        images.sort(key=lambda img: img.get("index") or 0)
+        article.images = images
+        return new_image
+
+    async def _render_images(
+        self,
+        db: AsyncSession,
+        session: WorkflowSession,
+        article: Article,
+        prompts: list[dict],
+        indices: list[int],
+        progress_range: tuple[int, int] | None = None,
+        deadline: float | None = None,
+    ) -> dict:
+        """
+        按完成顺序逐张生成图片，每张完成后立即写入文章并提交
+
+        Args:
+            db: 数据库会话
+            session: 工作流会话（记录生成进度）
+            article: 文章
+            prompts: 图片提示词列表
+            indices: 需要生成的序号
+            progress_range: 自动模式下进度条的起止百分比
+            deadline: 截止时间（event loop 时钟），超时的图片被跳过
+
+        Returns:
+            dict: {"success_count": int, "errors": list, "skipped": list}
+        """
+        result = {"success_count": 0, "errors": [], "skipped": []}
+        total = len(indices)
+        descriptions = [p.get("description", "") for p in prompts]
+
+        completed = 0
+        async for item in image_gen.iter_generate_images(
+            db, descriptions, str(article.id), indices=indices, deadline=deadline
+        ):
+            completed += 1
+            idx = item["index"]
+            if item.get("success"):
+                self._merge_image(article, prompts, idx, item)
+                result["success_count"] += 1
+            elif item.get("skipped"):
+                result["skipped"].append(idx)
+            else:
+                result["errors"].append({"index": idx, "error": item.get("error", "未知错误")})
+
+            session.stage_data = {
+                **(session.stage_data or {}),
+                "image_progress": {
+                    "completed": completed,
+                    "total": total,
+                    "success": result["success_count"],
+                    "failed": len(result["errors"]),
+                    "skipped": len(result["skipped"]),
+                },
+            }
+            if progress_range:
+                start, end = progress_range
+                progress_tracker.update(session, start + (end - start) * completed // total)
+            await db.commit()
+
+            logger.info(
+                "image_stage_image_persisted",
+                session_id=str(session.id),
+                index=idx,
+                success=item.get("success", False),
+                completed=completed,
+                total=total,
+            )
+
+        result["errors"].sort(key=lambda err: err["index"])
+        result["skipped"].sort()
+        return result
+
+    async def _persist_image(
+        self,
+        article_id: str,
+        prompts: list[dict],
+        index: int,
+        result: dict,
+    ) -> bool:
+        """
+        使用独立会话写入单张图片（供后台生成任务使用），返回是否写入
+
+        文章已不是草稿（发布中、已发布或发布失败）时不再写入：
+        既不改动已发布的内容，也不让发布包指纹变化而触发多余的重建。
+        """
+        async with AsyncSessionLocal() as db:
+            article = await db.get(Article, article_id, with_for_update=True)
+            if not article or article.status != ArticleStatus.DRAFT:
+                return False
+            self._merge_image(article, prompts, index, result)
+            await db.commit()
+            return True
+
+    async def _render_inline(
+        self,
+        config: image_gen.ImageRenderConfig,
+        article_id: str,
+        prompts: list[dict],
+        indices: list[int],
+        outcome: dict,
+        deadline: float | None = None,
+    ):
+        """渐进模式下生成正文插图，不依赖工作流的数据库会话"""
+        descriptions = [p.get("description", "") for p in prompts]
+        async for item in image_gen.iter_render_images(
+            config, descriptions, article_id, indices=indices, deadline=deadline
+        ):
+            idx = item["index"]
+            if item.get("success"):
+                if not await self._persist_image(article_id, prompts, idx, item):
+                    # 文章已进入发布，剩余插图不再需要（退出迭代即取消剩余请求）
+                    logger.info("image_stage_inline_discarded", article_id=article_id, index=idx)
+                    return
+                outcome["success"].append(idx)
+            elif item.get("skipped"):
+                outcome["skipped"].append(idx)
+            else:
+                outcome["errors"].append({"index": idx, "error": item.get("error", "未知错误")})
+
+            logger.info(
+                "image_stage_inline_persisted",
+                article_id=article_id,
+                index=idx,
+                success=item.get("success", False),
+            )
+
+    async def _render_progressive(
+        self,
+        db: AsyncSession,
+        session: WorkflowSession,
+        article: Article,
+        prompts: list[dict],
+        indices: list[int],
+        cutoff: int,
+        background: bool,
+        deadline: float | None = None,
+    ) -> dict:
+        """
+        封面优先的渐进式生图
+
+        同步生成封面；正文插图并发生成，只等待 cutoff 秒，
+        到期后已完成的插图随文章进入后续流程，其余插图按配置在后台继续生成或取消。
+
+        Returns:
+            dict: {"success_count": int, "errors": list, "skipped": list, "background": list}
+        """
+        cover_indices = [i for i in indices if prompts[i].get("position") == "cover"]
+        inline_indices = [i for i in indices if i not in cover_indices]
+
+        result = await self._render_images(
+            db, session, article, prompts, cover_indices,
+            progress_range=(60, 70), deadline=deadline,
+        )
+        result["background"] = []
+        if not inline_indices:
+            return result
+
+        config = await image_gen.get_render_config(db)
+        if not config:
+            result["errors"].extend(
+                {"index": i, "error": "未配置图片生成 API"} for i in inline_indices
+            )
+            return result
+
+        # 后台继续生成时不受阶段预算约束，仅受单次请求超时限制
+        inline_deadline = None if background else deadline
+        outcome = {"success": [], "errors": [], "skipped": []}
+        task = asyncio.create_task(
+            self._render_inline(
+                config, str(article.id), prompts, inline_indices, outcome, inline_deadline
+            )
+        )
+        done, _ = await asyncio.wait({task}, timeout=cutoff)
+
+        if not done:
+            if background:
+                _background_renders.add(task)
+                task.add_done_callback(_background_renders.discard)
+            else:
+                task.cancel()
+
+        finished = set(outcome["success"]) | {e["index"] for e in outcome["errors"]} | set(outcome["skipped"])
+        result["success_count"] += len(outcome["success"])
+        result["errors"].extend(outcome["errors"])
+        result["skipped"].extend(outcome["skipped"])
+        pending = [i for i in inline_indices if i not in finished]
+        if background:
+            result["background"] = pending
+        else:
+            result["skipped"].extend(pending)
+
+        # 插图由独立会话写入，刷新以获取截止前已完成的图片
+        await db.refresh(article)
+        progress_tracker.update(session, 75)
+        session.stage_data = {
+            **(session.stage_data or {}),
+            "image_progress": {
+                "completed": len(cover_indices) + len(finished),
+                "total": len(indices),
+                "success": result["success_count"],
+                "failed": len(result["errors"]),
+                "skipped": len(result["skipped"]),
+                "background": len(result["background"]),
+            },
+        }
+        await db.commit()
+
+        logger.info(
+            "image_stage_progressive_cutoff",
+            session_id=str(session.id),
+            article_id=str(article.id),
+            cutoff=cutoff,
+            cover_count=len(cover_indices),
+            inline_ready=len(outcome["success"]),
+            background_count=len(result["background"]),
+        )
+
+        result["errors"].sort(key=lambda err: err["index"])
+        result["skipped"].sort()
+        return result
 
     async def _generate_image_prompts(
         self,
@@ -101,7 +389,8 @@ class ImageStage(BaseStage):
 
         client = AsyncOpenAI(api_key=config.api_key, base_url=config.api_url or None)
 
-        paragraph_count = self._count_paragraphs(article.content)
+        document = article.document
+        paragraph_count = document.paragraph_count
         user_content = f"""请根据以下文章生成配图描述（文章共 {paragraph_count} 段）：
 
 标题：{article.title}
@@ -117,15 +406,16 @@ class ImageStage(BaseStage):
         )
 
         try:
-            response = await client.chat.completions.create(
-                model=config.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_content},
-                ],
-                temperature=0.7,
-                response_format={"type": "json_object"},
-            )
+            async with resource_pools.llm.acquire():
+                response = await client.chat.completions.create(
+                    model=config.model,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_content},
+                    ],
+                    temperature=0.7,
+                    response_format={"type": "json_object"},
+                )
 
             content = response.choices[0].message.content
             logger.info(
@@ -149,20 +439,8 @@ class ImageStage(BaseStage):
             validated_prompts = []
             for p in prompts[:MAX_IMAGES]:
                 desc = p.get("description", "")
-                pos = p.get("position", "end")
-
                 # 验证位置格式
-                if pos == "cover" or pos == "end":
-                    pass
-                elif pos.startswith("after_paragraph:"):
-                    try:
-                        para_num = int(pos.split(":")[1])
-                        if para_num < 1 or para_num > paragraph_count:
-                            pos = "end"
-                    except:
-                        pos = "end"
-                else:
-                    pos = "end"
+                pos = document.normalize_position(p.get("position", "end"))
 
                 validated_prompts.append({
                     "description": desc,
@@ -200,20 +478,21 @@ class ImageStage(BaseStage):
         client = AsyncOpenAI(api_key=config.api_key, base_url=config.api_url or None)
 
         try:
-            response = await client.chat.completions.create(
-                model=config.model,
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "你是图片描述优化专家。根据用户要求修改图片描述，返回优化后的描述文本（纯文本，不要JSON）。"
-                    },
-                    {
-                        "role": "user",
-                        "content": f"原始描述：{original_prompt}\n\n用户要求：{user_request}\n\n请返回优化后的描述："
-                    },
-                ],
-                temperature=0.7,
-            )
+            async with resource_pools.llm.acquire():
+                response = await client.chat.completions.create(
+                    model=config.model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": "你是图片描述优化专家。根据用户要求修改图片描述，返回优化后的描述文本（纯文本，不要JSON）。"
+                        },
+                        {
+                            "role": "user",
+                            "content": f"原始描述：{original_prompt}\n\n用户要求：{user_request}\n\n请返回优化后的描述："
+                        },
+                    ],
+                    temperature=0.7,
+                )
             return response.choices[0].message.content.strip()
         except Exception as e:
             logger.error("optimize_prompt_error", error=str(e))
@@ -409,10 +688,22 @@ class ImageStage(BaseStage):
                     suggestions=["添加图片描述", "跳过图片生成"],
                 )
 
-            # 提取描述列表
-            descriptions = [p.get("description", "") for p in prompts]
+            indices = self._pending_indices(article, prompts)
+            if not indices:
+                return StageResult(
+                    reply=f"全部 {len(prompts)} 张图片均已生成，无需重复生成。",
+                    can_proceed=True,
+                    article_preview={
+                        "title": article.title,
+                        "content": article.content[:500] + "..." if len(article.content) > 500 else article.content,
+                        "full_content": article.content,
+                        "images": article.images or [],
+                        "image_prompts": article.image_prompts,
+                    },
+                    suggestions=["进入下一阶段", "修改图片描述"],
+                )
 
-            result = await image_gen.generate_images(db, descriptions, str(article.id))
+            result = await self._render_images(db, session, article, prompts, indices)
 
             logger.info(
                 "image_stage_generate_all_result",
@@ -422,21 +713,7 @@ class ImageStage(BaseStage):
             )
 
             if result["success_count"] > 0:
-                # 构建带位置信息的图片列表
-                images = []
-                for img in result["images"]:
-                    idx = img["index"]
-                    prompt_item = prompts[idx] if idx < len(prompts) else {"position": "end", "description": ""}
-                    images.append({
-                        "url": img["url"],
-                        "path": img["path"],
-                        "position": prompt_item.get("position", "end"),
-                        "prompt": prompt_item.get("description", ""),
-                        "index": idx,
-                    })
-
-                article.images = images
-                await db.commit()
+                images = article.images or []
 
                 logger.info(
                     "image_stage_images_saved",
@@ -558,6 +835,13 @@ class ImageStage(BaseStage):
                     suggestions=["移到封面", "移到第3段后", "移到结尾"],
                 )
 
+            if new_position not in ("cover", "end") and article.document.anchor(new_position) is None:
+                return StageResult(
+                    reply=f"文章共有 {article.document.paragraph_count} 段，请指定有效的段落号。",
+                    can_proceed=True,
+                    suggestions=["移到封面", "移到结尾"],
+                )
+
             # 更新位置
             prompts[index]["position"] = new_position
 
@@ -678,8 +962,23 @@ class ImageStage(BaseStage):
         self,
         db: AsyncSession,
         session: WorkflowSession,
+        deadline: float | None = None,
+        progressive: bool = False,
+        cutoff: int = 60,
+        background: bool = True,
     ) -> StageResult:
-        """自动模式执行"""
+        """
+        自动模式执行
+
+        Args:
+            db: 数据库会话
+            session: 工作流会话
+            deadline: 图片阶段截止时间（event loop 时钟），
+                到期仍未完成的图片会被跳过，文章不含这些图片继续后续流程
+            progressive: 是否封面优先（只同步等待封面，正文插图最多等待 cutoff 秒）
+            cutoff: 渐进模式下等待正文插图的时长（秒）
+            background: 渐进模式截止后是否在后台继续生成剩余插图
+        """
         logger.info(
             "image_stage_auto_start",
             session_id=str(session.id),
@@ -728,30 +1027,25 @@ class ImageStage(BaseStage):
                 extra_data={"skipped": True},
             )
 
-        descriptions = [p.get("description", "") for p in prompts]
+        indices = self._pending_indices(article, prompts)
 
         logger.info(
             "image_stage_auto_generate_images",
             session_id=str(session.id),
-            description_count=len(descriptions),
+            description_count=len(prompts),
+            pending_count=len(indices),
         )
 
-        result = await image_gen.generate_images(db, descriptions, str(article.id))
-
-        if result["success_count"] > 0:
-            images = []
-            for img in result["images"]:
-                idx = img["index"]
-                prompt_item = prompts[idx] if idx < len(prompts) else {"position": "end", "description": ""}
-                images.append({
-                    "url": img["url"],
-                    "path": img["path"],
-                    "position": prompt_item.get("position", "end"),
-                    "prompt": prompt_item.get("description", ""),
-                    "index": idx,
-                })
-            article.images = images
-            await db.commit()
+        if progressive:
+            result = await self._render_progressive(
+                db, session, article, prompts, indices,
+                cutoff=cutoff, background=background, deadline=deadline,
+            )
+        else:
+            result = await self._render_images(
+                db, session, article, prompts, indices,
+                progress_range=(60, 75), deadline=deadline,
+            )
 
         logger.info(
             "image_stage_auto_complete",
@@ -759,11 +1053,15 @@ class ImageStage(BaseStage):
             article_id=str(article.id),
             success_count=result["success_count"],
             error_count=len(result["errors"]),
+            skipped_count=len(result["skipped"]),
             image_positions=[img.get("position") for img in (article.images or [])],
         )
 
+        skipped_msg = f"，{len(result['skipped'])} 张因超时跳过" if result["skipped"] else ""
+        if result.get("background"):
+            skipped_msg += f"，{len(result['background'])} 张在后台继续生成"
         return StageResult(
-            reply=f"图片生成阶段已完成，成功生成 {result['success_count']} 张图片。",
+            reply=f"图片生成阶段已完成，成功生成 {result['success_count']} 张图片{skipped_msg}。",
             can_proceed=True,
             article_preview={
                 "title": article.title,
@@ -775,6 +1073,8 @@ class ImageStage(BaseStage):
             extra_data={
                 "generated_count": result["success_count"],
                 "errors": result["errors"],
+                "skipped": result["skipped"],
+                "background": result.get("background", []),
             },
         )
 
@@ -12,6 +12,7 @@ from app.models import Article
 from app.models.prompt import Prompt, PromptType, ContentType
 from app.models.ai_config import AIConfig, AIConfigType
 from app.core.exceptions import AIServiceException
+from app.services.resource_pools import resource_pools
 
 logger = structlog.get_logger()
 
@@ -86,12 +87,13 @@ class OptimizeStage(BaseStage):
         all_messages = [{"role": "system", "content": system_prompt}] + messages
 
         try:
-            response = await client.chat.completions.create(
-                model=config.model,
-                messages=all_messages,
-                temperature=0.8,
-                response_format={"type": "json_object"},
-            )
+            async with resource_pools.llm.acquire():
+                response = await client.chat.completions.create(
+                    model=config.model,
+                    messages=all_messages,
+                    temperature=0.8,
+                    response_format={"type": "json_object"},
+                )
 
             content = response.choices[0].message.content
             # 清理 markdown 代码块
@@ -163,6 +165,7 @@ class OptimizeStage(BaseStage):
         # 更新文章
         article.title = result.get("title", article.title)
         article.content = result.get("content", article.content)
+        article.refresh_structure()
         article.token_usage = (article.token_usage or 0) + token_usage
 
         await db.commit()
@@ -217,6 +220,7 @@ class OptimizeStage(BaseStage):
         # 更新文章
         article.title = result.get("title", article.title)
         article.content = result.get("content", article.content)
+        article.refresh_structure()
         article.token_usage = (article.token_usage or 0) + token_usage
 
         await db.commit()
@@ -0,0 +1,89 @@
+"""
+独立 worker 进程
+
+将调度器、任务执行（LLM 生成、DOCX 渲染、浏览器发布）与 API 进程分离：
+
+    python -m app.worker [--concurrency N] [--no-scheduler]
+
+worker 与 API 之间只通过数据库交互：API 写入定时任务与队列任务，worker 领取执行并回写状态。
+此时 API 进程应设置 SCHEDULER_ENABLED=false、QUEUE_WORKER_ENABLED=false，
+两层可以分别扩容和重启；多个 worker 进程之间通过选主和 SKIP LOCKED 协调。
+"""
+
+import argparse
+import asyncio
+import signal
+import sys
+
+# Windows + Python 3.14 事件循环兼容性修复
+if sys.platform == "win32":
+    asyncio.set_event_loop_policy(asyncio.WindowsProactorEventLoopPolicy())
+
+import structlog
+
+from app.core.config import settings
+from app.core.database import engine
+from app.core.logging import setup_logging
+from app.services.scheduler import scheduler_leader, task_queue
+from app.services.artifact_gc import artifact_gc
+from app.services.docx_render_service import docx_render_service
+from app.services.workflow.stages.image import drain_background_renders
+
+setup_logging()
+
+logger = structlog.get_logger()
+
+
+async def run(concurrency: int, scheduler: bool):
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows 不支持，Ctrl+C 以 KeyboardInterrupt 结束
+            pass
+
+    logger.info("worker_startup", concurrency=concurrency, scheduler=scheduler)
+    if scheduler:
+        await scheduler_leader.start()
+    await task_queue.start(concurrency)
+    await artifact_gc.start()
+
+    try:
+        await stop.wait()
+    finally:
+        await artifact_gc.stop()
+        # 等待执行中的任务到达检查点后放回队列，由其他 worker 续跑
+        await task_queue.stop()
+        await scheduler_leader.stop()
+        # 等待后台插图生成写入，超时后取消
+        await drain_background_renders()
+        docx_render_service.shutdown()
+        await engine.dispose()
+        logger.info("worker_shutdown")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="任务 worker：运行调度器并消费任务队列")
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.WORKER_CONCURRENCY,
+        help="同时执行的队列任务数（默认 WORKER_CONCURRENCY）",
+    )
+    parser.add_argument(
+        "--no-scheduler",
+        action="store_true",
+        help="不参与调度器选主，只消费任务队列",
+    )
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args.concurrency, not args.no_scheduler))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+DOCX 渲染基准：逐 run 设置字体 vs 样式继承
+
+对比两种字体设置方式下原生渲染器的「构建 + 保存」耗时：
+- per-run：每个 run 单独写入字体和字号（旧实现）
+- style：字体和字号只定义在参考模板的样式中，run 继承（当前实现）
+
+用法（在 backend 目录下）：
+    python scripts/bench_docx.py
+    python scripts/bench_docx.py --paragraphs 200 1000 3000 --repeat 3
+"""
+
+import argparse
+import io
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from docx.oxml.ns import qn  # noqa: E402
+
+from app.services.docx_renderer import (  # noqa: E402
+    BODY_FONT,
+    BODY_SIZE,
+    CODE_FONT,
+    HEADING_FONT,
+    INLINE_RE,
+    MarkdownDocxRenderer,
+)
+
+
+class PerRunFontRenderer(MarkdownDocxRenderer):
+    """旧实现：每个 run 单独设置中西文字体和字号"""
+
+    def _add_run(self, para, text: str, font_name: str, size):
+        run = para.add_run(text)
+        if size is not None:
+            run.font.size = size
+        run.font.name = font_name
+        run._element.get_or_add_rPr().get_or_add_rFonts().set(qn("w:eastAsia"), font_name)
+        return run
+
+    def _add_inline(self, para, text: str, font_name: str = BODY_FONT, size=BODY_SIZE):
+        pos = 0
+        for match in INLINE_RE.finditer(text):
+            if match.start() > pos:
+                self._add_run(para, text[pos:match.start()], font_name, size)
+            if match.group("bold") or match.group("bold2"):
+                self._add_run(para, match.group("bold") or match.group("bold2"), font_name, size).bold = True
+            elif match.group("italic"):
+                self._add_run(para, match.group("italic"), font_name, size).italic = True
+            elif match.group("code"):
+                self._add_run(para, match.group("code"), CODE_FONT, size)
+            else:
+                self._add_run(para, match.group("link"), font_name, size)
+            pos = match.end()
+        if pos < len(text):
+            self._add_run(para, text[pos:], font_name, size)
+
+    def _add_heading(self, doc, text: str, level: int):
+        para = doc.add_heading(level=min(level, 9))
+        self._add_inline(para, text, HEADING_FONT, size=None)
+
+
+def make_content(paragraphs: int) -> str:
+    """生成测试正文：每段 4 个行内标记，每 20 段一个小标题"""
+    lines = []
+    for i in range(1, paragraphs + 1):
+        if i % 20 == 1:
+            lines.append(f"## 第{i // 20 + 1}节")
+        lines.append(
+            f"第{i}段正文，包含**粗体文字**、*斜体文字*、`inline_code` 和[一个链接](https://example.com)，"
+            "其余是普通的中文叙述内容，用来模拟头条文章的常见段落长度。"
+        )
+        lines.append("")
+    return "\n".join(lines)
+
+
+def bench(renderer: MarkdownDocxRenderer, content: str, repeat: int) -> float:
+    """构建并保存到内存，返回 repeat 次中的最短耗时（秒）"""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        doc = renderer.render("基准测试", content, {})
+        doc.save(io.BytesIO())
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DOCX 渲染基准：逐 run 设置字体 vs 样式继承")
+    parser.add_argument("--paragraphs", type=int, nargs="+", default=[200, 1000, 3000], help="正文段落数")
+    parser.add_argument("--repeat", type=int, default=3, help="每组重复次数（取最短耗时）")
+    args = parser.parse_args()
+
+    per_run = PerRunFontRenderer()
+    style = MarkdownDocxRenderer()
+    # 预热：生成参考模板、加载 python-docx 默认模板
+    bench(style, make_content(10), 1)
+
+    print(f"{'paragraphs':>10} {'per-run':>10} {'style':>10} {'speedup':>8}")
+    for count in args.paragraphs:
+        content = make_content(count)
+        per_run_seconds = bench(per_run, content, args.repeat)
+        style_seconds = bench(style, content, args.repeat)
+        print(
+            f"{count:>10} {per_run_seconds * 1000:>8.0f}ms {style_seconds * 1000:>8.0f}ms "
+            f"{per_run_seconds / style_seconds:>7.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
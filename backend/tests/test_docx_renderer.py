@@ -0,0 +1,238 @@
+"""
+DOCX 渲染器一致性测试
+
+原生渲染器（默认）与 pypandoc 路径（DOCX_RENDERER=pandoc）对同一篇文章的输出比较：
+正文文本、样式（标题级别、正文字体字号）、行内格式、图片位置。
+
+pandoc 路径用不间断空格占位空行并开启 hard_line_breaks，整个正文会合并为一个段落（以换行分隔），
+因此比较按「行」进行：原生渲染器的每个段落对应 pandoc 段落中的一行。
+正文中的小标题、列表、引用以及 after_paragraph:N（N >= 2）在 pandoc 路径下无法区分，只测试原生渲染器。
+未安装 pandoc 时跳过一致性测试。
+"""
+
+import struct
+import zlib
+
+import pypandoc
+import pytest
+from docx.oxml.ns import qn
+from docx.text.run import Run
+
+from app.core.config import settings
+from app.services.docx_generator import docx_generator
+from app.services.docx_renderer import BODY_FONT, BODY_SIZE, CODE_FONT, HEADING_FONT
+
+try:
+    pypandoc.get_pandoc_version()
+    HAS_PANDOC = True
+except OSError:
+    HAS_PANDOC = False
+
+requires_pandoc = pytest.mark.skipif(not HAS_PANDOC, reason="pandoc 未安装")
+
+TITLE = "测试标题"
+
+CONTENT = (
+    "第一段有**粗体**、*斜体*和`code`。\n"
+    "\n"
+    "第二段带[链接](https://example.com)，以及 __另一种粗体__。\n"
+    "\n"
+    "\n"
+    "第三段纯文本"
+)
+
+
+def _write_png(path) -> str:
+    """写入一张 4x4 的纯色 PNG"""
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data))
+
+    raw = b"".join(b"\x00" + b"\xff\x00\x00" * 4 for _ in range(4))
+    path.write_bytes(
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", 4, 4, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+    return str(path)
+
+
+@pytest.fixture
+def image(tmp_path) -> str:
+    return _write_png(tmp_path / "image.png")
+
+
+def _build(monkeypatch, renderer: str, title: str, content: str, images: list | None = None):
+    monkeypatch.setattr(settings, "DOCX_RENDERER", renderer)
+    return docx_generator._build_document(title, content, images or [])
+
+
+def _has_image(paragraph) -> bool:
+    return bool(paragraph._element.xpath(".//pic:pic"))
+
+
+def _is_code(run) -> bool:
+    """原生渲染器给代码 run 设置等宽字体，pandoc 使用 VerbatimChar 字符样式"""
+    rPr = run._element.rPr
+    style = rPr.find(qn("w:rStyle")) if rPr is not None else None
+    return run.font.name == CODE_FONT or (style is not None and style.get(qn("w:val")) == "VerbatimChar")
+
+
+def _run_format(run) -> tuple:
+    return (bool(run.bold), bool(run.italic), _is_code(run))
+
+
+def _runs(paragraph) -> list[Run]:
+    """段落中的所有 run（包括 pandoc 写在 w:hyperlink 内的链接文字）"""
+    return [Run(r, paragraph) for r in paragraph._element.xpath("./w:r | ./w:hyperlink/w:r")]
+
+
+def _lines(paragraph) -> list[list[tuple]]:
+    """
+    段落按换行拆分为行，每行是合并相邻同格式 run 后的 (文本, 格式) 列表
+
+    空行和只有不间断空格的占位行被丢弃。
+    """
+    lines = [[]]
+    for run in _runs(paragraph):
+        parts = run.text.split("\n")
+        for index, part in enumerate(parts):
+            if index > 0:
+                lines.append([])
+            if not part:
+                continue
+            fmt = _run_format(run)
+            line = lines[-1]
+            if line and line[-1][1] == fmt:
+                line[-1] = (line[-1][0] + part, fmt)
+            else:
+                line.append((part, fmt))
+    return [line for line in lines if "".join(text for text, _ in line).strip()]
+
+
+def _body_lines(doc) -> list[list[tuple]]:
+    """标题之后的所有正文行（不含图片段落）"""
+    result = []
+    for paragraph in doc.paragraphs[1:]:
+        if not _has_image(paragraph):
+            result.extend(_lines(paragraph))
+    return result
+
+
+def _layout(doc) -> list[str]:
+    """文档的行序列：图片段落记为 [image]，文字按行展开"""
+    result = []
+    for paragraph in doc.paragraphs:
+        if _has_image(paragraph):
+            result.append("[image]")
+            continue
+        for line in _lines(paragraph):
+            result.append("".join(text for text, _ in line))
+    return result
+
+
+def _style_chain(style):
+    while style is not None:
+        yield style
+        style = style.base_style
+
+
+def _effective_font(doc, paragraph) -> tuple:
+    """段落通过样式继承得到的 (东亚字体, 字号)，样式未定义时按 Word 的规则回退到 Normal"""
+    style = paragraph.style
+    if style is None or style.style_id not in {s.style_id for s in doc.styles}:
+        style = doc.styles["Normal"]
+    font_name = size = None
+    for item in _style_chain(style):
+        rPr = item.element.rPr
+        rFonts = rPr.find(qn("w:rFonts")) if rPr is not None else None
+        if font_name is None and rFonts is not None:
+            font_name = rFonts.get(qn("w:eastAsia"))
+        if size is None and item.font.size is not None:
+            size = item.font.size
+    return font_name, size
+
+
+@requires_pandoc
+def test_paragraph_text_parity(monkeypatch):
+    native = _build(monkeypatch, "native", TITLE, CONTENT)
+    pandoc = _build(monkeypatch, "pandoc", TITLE, CONTENT)
+
+    assert native.paragraphs[0].text == pandoc.paragraphs[0].text == TITLE
+    native_text = ["".join(t for t, _ in line) for line in _body_lines(native)]
+    pandoc_text = ["".join(t for t, _ in line) for line in _body_lines(pandoc)]
+    assert native_text == pandoc_text == [
+        "第一段有粗体、斜体和code。",
+        "第二段带链接，以及 另一种粗体。",
+        "第三段纯文本",
+    ]
+
+
+@requires_pandoc
+def test_style_parity(monkeypatch):
+    native = _build(monkeypatch, "native", TITLE, CONTENT)
+    pandoc = _build(monkeypatch, "pandoc", TITLE, CONTENT)
+
+    for doc in (native, pandoc):
+        title = doc.paragraphs[0]
+        assert title.style.name == "Heading 1"
+        assert _effective_font(doc, title)[0] == HEADING_FONT
+        for paragraph in doc.paragraphs[1:]:
+            assert _effective_font(doc, paragraph) == (BODY_FONT, BODY_SIZE)
+
+
+@requires_pandoc
+def test_run_formatting_parity(monkeypatch):
+    native = _build(monkeypatch, "native", TITLE, CONTENT)
+    pandoc = _build(monkeypatch, "pandoc", TITLE, CONTENT)
+
+    assert _body_lines(native) == _body_lines(pandoc)
+    first_line = _body_lines(native)[0]
+    assert ("粗体", (True, False, False)) in first_line
+    assert ("斜体", (False, True, False)) in first_line
+    assert ("code", (False, False, True)) in first_line
+
+
+@requires_pandoc
+def test_image_position_parity(monkeypatch, image):
+    images = [
+        {"path": image, "position": "cover"},
+        {"path": image, "position": "after_paragraph:1"},
+        {"path": image, "position": "end"},
+    ]
+    content = "唯一的正文段落"
+    native = _build(monkeypatch, "native", TITLE, content, images)
+    pandoc = _build(monkeypatch, "pandoc", TITLE, content, images)
+
+    expected = [TITLE, "[image]", content, "[image]", "[image]"]
+    assert _layout(native) == _layout(pandoc) == expected
+
+
+def test_native_block_styles(monkeypatch):
+    content = "## 小标题\n- 项目一\n- 项目二\n> 引用\n正文"
+    doc = _build(monkeypatch, "native", TITLE, content)
+
+    styles = [(p.style.name, p.text) for p in doc.paragraphs]
+    assert styles == [
+        ("Heading 1", TITLE),
+        ("Heading 2", "小标题"),
+        ("List Bullet", "项目一"),
+        ("List Bullet", "项目二"),
+        ("Quote", "引用"),
+        ("Normal", "正文"),
+    ]
+    # 字体只定义在样式上，run 不逐个设置
+    assert all(run.font.name is None for p in doc.paragraphs for run in p.runs)
+
+
+def test_native_image_positions(monkeypatch, image):
+    images = [
+        {"path": image, "position": "after_paragraph:2"},
+        {"path": image, "position": "after_paragraph:9"},
+        {"path": image, "position": "end"},
+    ]
+    content = "第一段\n\n## 小标题\n第二段\n第三段"
+    doc = _build(monkeypatch, "native", TITLE, content, images)
+
+    # 标题和空行不计入段落编号；超出段落数的位置与结尾图片一起放在末尾
+    assert _layout(doc) == [TITLE, "第一段", "小标题", "第二段", "[image]", "第三段", "[image]", "[image]"]
@@ -36,6 +36,7 @@ export const accountApi = {
   delete: (id: string) => api.delete(`/accounts/${id}`),
   checkStatus: (id: string) => api.get(`/accounts/${id}/status`),
   refresh: (id: string, cookies: string) => api.post(`/accounts/${id}/refresh`, null, { params: { cookies } }),
+  publishStatus: () => api.get('/accounts/publish-status'),
 }
 
 // 任务相关
@@ -69,6 +70,9 @@ export interface WorkflowConfigData {
   enable_optimize: boolean
   enable_image_gen: boolean
   enable_auto_publish: boolean
+  enable_progressive_image: boolean
+  progressive_image_cutoff: number
+  enable_background_image: boolean
   custom_topic: string
 }
 
@@ -112,6 +116,10 @@ export const workflowApi = {
   getStatus: (sessionId: string) =>
     api.get(`/workflows/sessions/${sessionId}/status`),
 
+  // 订阅会话进度（SSE，供 EventSource 使用）
+  eventsUrl: (sessionId: string) =>
+    `/api/v1/workflows/sessions/${sessionId}/events`,
+
   // 获取会话详情
   getDetail: (sessionId: string) =>
     api.get(`/workflows/sessions/${sessionId}`),
@@ -149,6 +157,8 @@ export interface ScheduledTaskCreate {
   publish_mode?: PublishMode
   publish_batch_size?: number
   publish_order?: 'oldest' | 'newest' | 'random'
+  inventory_target?: number
+  draft_ceiling?: number
   is_active?: boolean
 }
 
@@ -159,14 +169,40 @@ export interface ScheduledTask extends ScheduledTaskCreate {
   next_run_at: string | null
   run_count: number
   last_error: string | null
+  inventory_stats: {
+    low_watermark?: number
+    pops?: number
+    stockouts?: number
+    last_pop_at?: string
+  } | null
   created_at: string
   updated_at: string
 }
 
+export interface InventoryStatus {
+  scheduled_task_id: string
+  name: string
+  content_type: string
+  account_id: string | null
+  target: number
+  ready: number
+  producing: number
+  low_watermark: number | null
+  pops: number
+  stockouts: number
+  last_pop_at: string | null
+}
+
 export interface SchedulerStatus {
   running: boolean
+  paused: boolean
   active_tasks: number
   pending_jobs: number
+  leader_instance_id: string | null
+  leader_heartbeat_at: string | null
+  instance_id: string
+  is_leader: boolean
+  inventory: InventoryStatus[]
 }
 
 export const scheduledTaskApi = {
@@ -192,6 +228,9 @@ export const scheduledTaskApi = {
   // 立即执行
   trigger: (id: string) => api.post(`/scheduled-tasks/${id}/trigger`),
 
+  // 取消排队中和执行中的任务
+  cancel: (id: string) => api.post(`/scheduled-tasks/${id}/cancel`),
+
   // 执行日志
   logs: (id: string, params?: { skip?: number; limit?: number }) =>
     api.get(`/scheduled-tasks/${id}/logs`, { params }),
@@ -212,6 +251,28 @@ export const schedulerApi = {
 export const dashboardApi = {
   // 获取统计数据
   getStats: () => api.get('/dashboard/stats'),
+
+  // 生成与发布吞吐
+  getThroughput: (days = 7) => api.get('/dashboard/throughput', { params: { days } }),
+}
+
+export interface ThroughputDay {
+  date: string
+  generated: number
+  published: number
+  skipped: number
+}
+
+export interface Throughput {
+  days: ThroughputDay[]
+  totals: {
+    generated: number
+    published: number
+    skipped: number
+    backlog_growth: number
+  }
+  ready: Record<string, number>
+  default_ceiling: number
 }
 
 export default api
@@ -63,6 +63,8 @@ export const useWorkflowStore = defineStore('workflow', () => {
   const error = ref<string | null>(null)
   const loading = ref(false)
 
+  // 进度推送连接（不可用时回退为轮询）
+  let eventSource: EventSource | null = null
   // 轮询定时器
   let pollTimer: ReturnType<typeof setInterval> | null = null
 
@@ -264,10 +266,10 @@ export const useWorkflowStore = defineStore('workflow', () => {
     error.value = null
     status.value = 'processing'
 
-    // 先开始轮询状态（这样可以实时看到进度）
-    startPolling()
+    // 先订阅进度推送（这样可以实时看到进度）
+    startStream()
 
-    // 然后发起后台任务（不等待返回，让轮询来跟踪进度）
+    // 然后发起后台任务（不等待返回，由推送或轮询跟踪进度）
     workflowApi.executeAuto(sessionId.value).catch((e: any) => {
       error.value = e.message || '执行失败'
       status.value = 'failed'
@@ -275,6 +277,57 @@ export const useWorkflowStore = defineStore('workflow', () => {
     })
   }
 
+  // 订阅进度推送，浏览器不支持或连接中断时回退为轮询
+  function startStream() {
+    closeStream()
+    if (!sessionId.value) return
+
+    if (typeof EventSource === 'undefined') {
+      startPolling()
+      return
+    }
+
+    const source = new EventSource(workflowApi.eventsUrl(sessionId.value))
+    eventSource = source
+
+    const applyProgress = (e: MessageEvent) => {
+      const data = JSON.parse(e.data)
+      progress.value = data.progress
+      currentStage.value = data.stage as WorkflowStage
+    }
+
+    source.addEventListener('stage', applyProgress)
+    source.addEventListener('progress', applyProgress)
+    source.addEventListener('completed', async (e) => {
+      applyProgress(e as MessageEvent)
+      status.value = 'completed'
+      stopPolling()
+
+      // 获取最终结果
+      await loadSessionDetail()
+    })
+    source.addEventListener('failed', (e) => {
+      const data = JSON.parse((e as MessageEvent).data)
+      status.value = 'failed'
+      error.value = data.error || '执行失败'
+      stopPolling()
+    })
+
+    source.onerror = () => {
+      // 已结束或已切换到其他连接时忽略
+      if (eventSource !== source) return
+      closeStream()
+      startPolling()
+    }
+  }
+
+  function closeStream() {
+    if (eventSource) {
+      eventSource.close()
+      eventSource = null
+    }
+  }
+
   // 开始轮询状态
   function startPolling() {
     if (pollTimer) {
@@ -309,8 +362,9 @@ export const useWorkflowStore = defineStore('workflow', () => {
     }, 1000)  // 每秒轮询一次，实时跟踪进度
   }
 
-  // 停止轮询
+  // 停止跟踪进度（推送与轮询）
   function stopPolling() {
+    closeStream()
     if (pollTimer) {
       clearInterval(pollTimer)
       pollTimer = null